@@ -0,0 +1,194 @@
+"""Admission control for the LLM-backed routes.
+
+Each limiter admits a fixed number of concurrent requests and parks a bounded
+number of others in a FIFO queue. A request that finds the queue full is
+rejected at once with 429; a queued request that does not get a slot before
+its deadline gets 503. Both carry a Retry-After estimate.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Tuple
+from dotenv import load_dotenv
+from metrics import Counter, Gauge, Histogram
+
+load_dotenv()
+
+ADMISSION_ACTIVE = Gauge("aiservice_admission_active", "Requests holding an admission slot.", ["limiter"])
+ADMISSION_QUEUE_DEPTH = Gauge("aiservice_admission_queue_depth", "Requests waiting for an admission slot.", ["limiter"])
+ADMISSION_REJECTED = Counter("aiservice_admission_rejected_total", "Requests shed by admission control.", ["limiter", "reason"])
+ADMISSION_WAIT = Histogram("aiservice_admission_wait_seconds", "Time spent waiting for an admission slot.", ["limiter"])
+
+# name -> (max concurrent, max queued, queue timeout seconds)
+# Override with ADMISSION_<NAME>=concurrency:queue:timeout, e.g. ADMISSION_ANALYZE_RESPONSE=8:32:10
+DEFAULT_LIMITS: Dict[str, Tuple[int, int, float]] = {
+    "resume_rewrite": (2, 8, 30.0),
+    "create_report": (2, 8, 30.0),
+    "create_report_aggregate": (2, 8, 30.0),
+    # Two generations per request
+    "resume_pipeline": (2, 8, 30.0),
+    "generate_questions": (4, 16, 15.0),
+    "analyze_response": (4, 16, 10.0),
+    # One generation per answer, up to OLLAMA_NUM_PARALLEL at a time
+    "analyze_session": (2, 8, 30.0),
+}
+
+
+class Overloaded(Exception):
+    def __init__(self, limiter: str, reason: str, status_code: int, retry_after: int) -> None:
+        super().__init__(f"{limiter}: {reason}")
+        self.limiter = limiter
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float) -> None:
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long a request holds its slot, for Retry-After
+        self._avg_hold = 5.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        backlog = (len(self._waiters) + 1) / self.max_concurrent
+        return max(1, int(round(self._avg_hold * backlog)))
+
+    def _publish(self) -> None:
+        ADMISSION_ACTIVE.set(self.active, limiter=self.name)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), limiter=self.name)
+
+    def _reject(self, reason: str, status_code: int) -> Overloaded:
+        ADMISSION_REJECTED.inc(limiter=self.name, reason=reason)
+        return Overloaded(self.name, reason, status_code, self.retry_after())
+
+    async def acquire(self) -> None:
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self._publish()
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full", 429)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the client went away
+                self.release()
+            else:
+                self._drop(waiter)
+            raise
+        finally:
+            ADMISSION_WAIT.observe(time.perf_counter() - start, limiter=self.name)
+        if not waiter.done():
+            self._drop(waiter)
+            raise self._reject("queue_timeout", 503)
+
+    def _drop(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._publish()
+
+    def release(self) -> None:
+        # Hand the slot straight to the oldest waiter so queued requests keep FIFO order
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._publish()
+                return
+        self.active -= 1
+        self._publish()
+
+    def _record_hold(self, seconds: float) -> None:
+        self._avg_hold = 0.8 * self._avg_hold + 0.2 * seconds
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record_hold(time.perf_counter() - start)
+            self.release()
+
+    async def reserve(self) -> Callable[[], None]:
+        """Acquire a slot that outlives the handler (e.g. a streamed response).
+
+        Returns a callback that releases the slot; calling it more than once is a no-op.
+        """
+        await self.acquire()
+        start = time.perf_counter()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            self._record_hold(time.perf_counter() - start)
+            self.release()
+
+        return release
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+        }
+
+
+def _limits_for(name: str) -> Tuple[int, int, float]:
+    override = os.getenv(f"ADMISSION_{name.upper()}")
+    if override:
+        concurrency, queue, timeout = override.split(":")
+        return int(concurrency), int(queue), float(timeout)
+    return DEFAULT_LIMITS.get(name, (4, 16, 15.0))
+
+
+_limiters: Dict[str, AdmissionLimiter] = {}
+
+
+def get_limiter(name: str) -> AdmissionLimiter:
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = AdmissionLimiter(name, *_limits_for(name))
+        _limiters[name] = limiter
+    return limiter
+
+
+def admit(name: str) -> Callable[[], AsyncIterator[None]]:
+    """FastAPI dependency holding an admission slot of limiter `name` for the request."""
+    limiter = get_limiter(name)
+
+    async def dependency() -> AsyncIterator[None]:
+        async with limiter.slot():
+            yield
+
+    return dependency
+
+
+def admission_status() -> Dict[str, Dict[str, Any]]:
+    return {name: limiter.status() for name, limiter in _limiters.items()}
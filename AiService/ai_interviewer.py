@@ -1,18 +1,21 @@
-from langchain_ollama import OllamaLLM
-from langchain.prompts import PromptTemplate
-from langchain_core.runnables.base import RunnableSequence
 from typing import List, Dict, Optional
-from dotenv import load_dotenv
-import os
-import json
+from collections import Counter
+from cancellation import Cancelled
+from llm_json import LLMJSONError, has_keys, list_of, parse_llm_json, valid_json
+from metrics import stage
+from llm import invoke_chain
+from prompts import INTERVIEW_ANALYSIS, INTERVIEW_QUESTIONS
+from routing import primary_model, routed, routed_chain
+from question_bank import cached_questions, remember_questions, scope_for
 
-load_dotenv()
+def _is_question(item) -> bool:
+    return isinstance(item, dict) and isinstance(item.get("question"), str) and bool(item["question"].strip())
+
+# What a usable generation must contain; anything else gets the fallback and is not cached
+QUESTIONS_SHAPE = list_of(_is_question)
+ANALYSIS_SHAPE = has_keys("overall_score", "content_quality", "structure_clarity", "relevance", "specificity", "confidence_level")
 
 class AIInterviewer:
-    def __init__(self):
-        """Initialize the AI Interviewer with Ollama LLM"""
-        self.model = OllamaLLM(model="llama3.1", base_url=os.getenv("OLLAMA_URL"))
-    
     def generate_questions(self, job_description: str, interview_type: str = "mixed", num_questions: int = 8) -> List[Dict]:
         """
         Generate interview questions based on job description
@@ -25,59 +28,36 @@ class AIInterviewer:
         Returns:
             List of question dictionaries with metadata
         """
-        prompt = PromptTemplate(
-            input_variables=["job_description", "interview_type", "num_questions"],
-            template="""
-            You are an expert HR professional and interview coach. Generate {num_questions} high-quality interview questions for this job description:
-
-            Job Description:
-            {job_description}
-
-            Interview Type: {interview_type}
-
-            For each question, provide:
-            1. The question text
-            2. Question type (behavioral/technical/situational/general)
-            3. Expected competencies/skills being assessed
-            4. Difficulty level (1-5, where 1=easy, 5=expert)
-            5. Suggested response time (in minutes)
-            6. What the interviewer is looking for
-
-            Format your response as a JSON array where each question is an object with these fields:
-            - question: string
-            - type: string
-            - competencies: array of strings
-            - difficulty: integer (1-5)
-            - suggested_time: integer (minutes)
-            - looking_for: string
-
-            Make the questions:
-            - Relevant to the specific role and company
-            - Progressive in difficulty
-            - Mix of question types if interview_type is "mixed"
-            - Professional and fair
-            - Designed to assess both technical and soft skills
-
-            Return only the JSON array, no additional text.
-            """
-        )
+        # Reuse the questions generated for a near-identical job description
+        scope = scope_for(INTERVIEW_QUESTIONS, primary_model("questions"), interview_type, num_questions)
+        with stage("question_bank"):
+            cached, vector = cached_questions(job_description, scope)
+        if cached is not None:
+            return cached
         
-        chain = RunnableSequence(prompt | self.model)
+        with stage("prompt_build"):
+            chain, _, downgraded = routed("questions", INTERVIEW_QUESTIONS)
         
         try:
-            response = chain.invoke({
-                "job_description": job_description,
-                "interview_type": interview_type,
-                "num_questions": num_questions
-            })
+            with stage("llm_call"):
+                response = invoke_chain(chain, {
+                    "job_description": job_description,
+                    "interview_type": interview_type,
+                    "num_questions": num_questions
+                }, accept=valid_json(list, QUESTIONS_SHAPE))
             
-            # Parse the JSON response
-            questions_data = json.loads(response)
+            # Parse the JSON response, recovering it from noisy or truncated output
+            questions_data = parse_llm_json(response, list, INTERVIEW_QUESTIONS, QUESTIONS_SHAPE)
+            if not downgraded:
+                # Banked sets are served in place of the primary model's output
+                remember_questions(vector, scope, questions_data)
             return questions_data
             
-        except json.JSONDecodeError:
+        except LLMJSONError:
             # Fallback if JSON parsing fails
             return self._generate_fallback_questions(job_description, interview_type, num_questions)
+        except Cancelled:
+            raise
         except Exception as e:
             print(f"Error generating questions: {e}")
             return self._generate_fallback_questions(job_description, interview_type, num_questions)
@@ -165,60 +145,26 @@ class AIInterviewer:
         Returns:
             Analysis dictionary with scores and feedback
         """
-        prompt = PromptTemplate(
-            input_variables=["question", "response", "question_type"],
-            template="""
-            You are an expert interview coach and HR professional. Analyze this interview response:
-
-            Question: {question}
-            Question Type: {question_type}
-            Response: {response}
-
-            Provide a comprehensive analysis in JSON format with these fields:
-
-            {{
-                "overall_score": integer (1-10),
-                "content_quality": integer (1-10),
-                "structure_clarity": integer (1-10),
-                "relevance": integer (1-10),
-                "specificity": integer (1-10),
-                "confidence_level": integer (1-10),
-                "strengths": array of strings,
-                "weaknesses": array of strings,
-                "specific_feedback": string,
-                "improvement_suggestions": array of strings,
-                "follow_up_questions": array of strings
-            }}
-
-            Scoring criteria:
-            - Content Quality: How well does the response address the question?
-            - Structure & Clarity: Is the response well-organized and easy to follow?
-            - Relevance: How relevant is the response to the specific question?
-            - Specificity: Does the response include specific examples and details?
-            - Confidence Level: Does the response demonstrate confidence and conviction?
-
-            Provide constructive, actionable feedback that helps the candidate improve.
-
-            Return only the JSON object, no additional text.
-            """
-        )
-        
-        chain = RunnableSequence(prompt | self.model)
+        with stage("prompt_build"):
+            chain = routed_chain("scoring", INTERVIEW_ANALYSIS)
         
         try:
-            response_text = chain.invoke({
-                "question": question,
-                "response": response,
-                "question_type": question_type
-            })
+            with stage("llm_call"):
+                response_text = invoke_chain(chain, {
+                    "question": question,
+                    "response": response,
+                    "question_type": question_type
+                }, accept=valid_json(dict, ANALYSIS_SHAPE))
             
-            # Parse the JSON response
-            analysis = json.loads(response_text)
+            # Parse the JSON response, recovering it from noisy or truncated output
+            analysis = parse_llm_json(response_text, dict, INTERVIEW_ANALYSIS, ANALYSIS_SHAPE)
             return analysis
             
-        except json.JSONDecodeError:
+        except LLMJSONError:
             # Fallback analysis if JSON parsing fails
             return self._generate_fallback_analysis(question, response, question_type)
+        except Cancelled:
+            raise
         except Exception as e:
             print(f"Error analyzing response: {e}")
             return self._generate_fallback_analysis(question, response, question_type)
@@ -259,59 +205,10 @@ class AIInterviewer:
         if not responses:
             return {"error": "No responses provided for analysis"}
         
-        # Calculate average scores
-        total_responses = len(responses)
-        avg_scores = {
-            "overall_score": sum(r.get("overall_score", 0) for r in responses) / total_responses,
-            "content_quality": sum(r.get("content_quality", 0) for r in responses) / total_responses,
-            "structure_clarity": sum(r.get("structure_clarity", 0) for r in responses) / total_responses,
-            "relevance": sum(r.get("relevance", 0) for r in responses) / total_responses,
-            "specificity": sum(r.get("specificity", 0) for r in responses) / total_responses,
-            "confidence_level": sum(r.get("confidence_level", 0) for r in responses) / total_responses
-        }
-        
-        # Aggregate strengths and weaknesses
-        all_strengths = []
-        all_weaknesses = []
-        all_improvements = []
-        
+        builder = ProfileBuilder(self)
         for response in responses:
-            all_strengths.extend(response.get("strengths", []))
-            all_weaknesses.extend(response.get("weaknesses", []))
-            all_improvements.extend(response.get("improvement_suggestions", []))
-        
-        # Remove duplicates and get most common
-        from collections import Counter
-        common_strengths = [item for item, count in Counter(all_strengths).most_common(5)]
-        common_weaknesses = [item for item, count in Counter(all_weaknesses).most_common(5)]
-        common_improvements = [item for item, count in Counter(all_improvements).most_common(5)]
-        
-        # Generate overall assessment
-        overall_score = avg_scores["overall_score"]
-        if overall_score >= 8:
-            performance_level = "Excellent"
-            performance_description = "Outstanding interview performance with strong communication and relevant examples."
-        elif overall_score >= 6:
-            performance_level = "Good"
-            performance_description = "Solid interview performance with room for improvement in specific areas."
-        elif overall_score >= 4:
-            performance_level = "Fair"
-            performance_description = "Basic interview performance with several areas needing development."
-        else:
-            performance_level = "Needs Improvement"
-            performance_description = "Interview performance requires significant improvement and practice."
-        
-        return {
-            "performance_level": performance_level,
-            "performance_description": performance_description,
-            "average_scores": avg_scores,
-            "top_strengths": common_strengths,
-            "key_weaknesses": common_weaknesses,
-            "improvement_areas": common_improvements,
-            "total_questions": total_responses,
-            "recommendations": self._generate_recommendations(avg_scores, common_weaknesses),
-            "next_steps": self._generate_next_steps(performance_level, common_weaknesses)
-        }
+            builder.add(response)
+        return builder.profile()
     
     def _generate_recommendations(self, scores: Dict, weaknesses: List[str]) -> List[str]:
         """Generate personalized recommendations based on scores and weaknesses"""
@@ -362,3 +259,67 @@ class AIInterviewer:
             ]
         
         return next_steps
+
+
+class ProfileBuilder:
+    """Interview profile built up one response analysis at a time.
+
+    profile() returns what AIInterviewer.generate_profile would for the
+    analyses added so far, so a session can report it as analyses complete.
+    """
+    SCORES = ("overall_score", "content_quality", "structure_clarity", "relevance", "specificity", "confidence_level")
+
+    def __init__(self, interviewer: AIInterviewer):
+        self.interviewer = interviewer
+        self.count = 0
+        self.score_totals = {score: 0 for score in self.SCORES}
+        self.strengths = Counter()
+        self.weaknesses = Counter()
+        self.improvements = Counter()
+
+    def add(self, analysis: Dict) -> None:
+        for score in self.SCORES:
+            self.score_totals[score] += analysis.get(score, 0)
+        self.strengths.update(analysis.get("strengths", []))
+        self.weaknesses.update(analysis.get("weaknesses", []))
+        self.improvements.update(analysis.get("improvement_suggestions", []))
+        self.count += 1
+
+    def profile(self) -> Dict:
+        if not self.count:
+            return {"error": "No responses provided for analysis"}
+        
+        # Calculate average scores
+        avg_scores = {score: total / self.count for score, total in self.score_totals.items()}
+        
+        # Most common strengths and weaknesses
+        common_strengths = [item for item, count in self.strengths.most_common(5)]
+        common_weaknesses = [item for item, count in self.weaknesses.most_common(5)]
+        common_improvements = [item for item, count in self.improvements.most_common(5)]
+        
+        # Generate overall assessment
+        overall_score = avg_scores["overall_score"]
+        if overall_score >= 8:
+            performance_level = "Excellent"
+            performance_description = "Outstanding interview performance with strong communication and relevant examples."
+        elif overall_score >= 6:
+            performance_level = "Good"
+            performance_description = "Solid interview performance with room for improvement in specific areas."
+        elif overall_score >= 4:
+            performance_level = "Fair"
+            performance_description = "Basic interview performance with several areas needing development."
+        else:
+            performance_level = "Needs Improvement"
+            performance_description = "Interview performance requires significant improvement and practice."
+        
+        return {
+            "performance_level": performance_level,
+            "performance_description": performance_description,
+            "average_scores": avg_scores,
+            "top_strengths": common_strengths,
+            "key_weaknesses": common_weaknesses,
+            "improvement_areas": common_improvements,
+            "total_questions": self.count,
+            "recommendations": self.interviewer._generate_recommendations(avg_scores, common_weaknesses),
+            "next_steps": self.interviewer._generate_next_steps(performance_level, common_weaknesses)
+        }
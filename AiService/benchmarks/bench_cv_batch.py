@@ -0,0 +1,64 @@
+"""Batch CV analysis throughput: one analyze_cv call per resume vs chunks across processes.
+
+Run from the AiService directory:
+
+    python benchmarks/bench_cv_batch.py [resumes] [chunk_size]
+
+"sequential" analyzes every resume in this process, like N calls to
+/job_matcher/analyze_cv. "process pool" splits the batch into chunks and runs
+job_matcher.analyze_cv_chunk on every core, like /job_matcher/analyze_cv_batch.
+"""
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_matcher import JobMatcher, SKILL_KEYWORDS, analyze_cv_chunk
+
+FILLER = (
+    "delivered", "platform", "customers", "improved", "latency", "team", "reporting", "designed",
+    "migration", "stakeholders", "roadmap", "quarterly", "ownership", "reliability", "mentored",
+)
+PHRASES = (
+    "5+ years of experience", "3 years in the field", "Bachelor in Computer Science",
+    "M.S. in Data Engineering", "AWS Certified Solutions Architect", "Scrum certified",
+)
+
+
+def make_resumes(count: int, words: int = 600) -> list:
+    rng = random.Random(42)
+    vocabulary = FILLER * 4 + SKILL_KEYWORDS + PHRASES
+    return [" ".join(rng.choice(vocabulary) for _ in range(words)) for _ in range(count)]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    resumes = make_resumes(count)
+
+    matcher = JobMatcher()
+    start = time.perf_counter()
+    for resume in resumes:
+        matcher.analyze_cv(resume)
+    sequential = time.perf_counter() - start
+    matcher.close()
+    print(f"sequential       {count:>6} resumes  {sequential * 1000:>8.1f} ms  {sequential / count * 1e6:>8.1f} us/resume")
+
+    workers = os.cpu_count() or 2
+    chunks = [resumes[i:i + chunk_size] for i in range(0, count, chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Start the workers before timing, as the service does after its first batch
+        list(pool.map(analyze_cv_chunk, [[""]] * workers))
+        start = time.perf_counter()
+        list(pool.map(analyze_cv_chunk, chunks))
+        parallel = time.perf_counter() - start
+    print(f"process pool x{workers:<3} {count:>6} resumes  {parallel * 1000:>8.1f} ms  {parallel / count * 1e6:>8.1f} us/resume")
+    print(f"speedup: {sequential / parallel:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Per-call prompt/chain construction overhead: before vs after the prompt registry.
+
+Run from the AiService directory (needs langchain installed, not Ollama):
+
+    python benchmarks/bench_prompts.py [iterations]
+
+"before" parses the PromptTemplate and builds the `prompt | llm` chain on every
+call, the way rewrite_resume, create_report, create_aggregate_report and
+AIInterviewer used to. "after" resolves the chain from prompts.get_chain().
+Both include rendering the prompt, which every call still pays.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.prompts import PromptTemplate
+from langchain_core.runnables.base import RunnableSequence
+
+from llm import get_llm
+from prompts import PROMPTS, get_chain
+
+
+def sample_variables(input_variables) -> dict:
+    return {name: f"sample {name} " * 50 for name in input_variables}
+
+
+def per_call_construction(prompt_id: str, variables: dict) -> None:
+    spec = PROMPTS[prompt_id]
+    prompt = PromptTemplate(input_variables=spec.input_variables, template=spec.template)
+    chain = RunnableSequence(prompt | get_llm())
+    chain.first.invoke(variables).to_string()
+
+
+def registry_lookup(prompt_id: str, variables: dict) -> None:
+    chain = get_chain(prompt_id)
+    chain.first.invoke(variables).to_string()
+
+
+def bench(label: str, func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed / iterations * 1e6
+    print(f"{label:<44} {iterations:>7} iterations  {per_call_us:>10.2f} us/call")
+    return per_call_us
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for prompt_id, spec in PROMPTS.items():
+        variables = sample_variables(spec.input_variables)
+        # First use compiles the registry entry; it is not part of the per-call cost
+        registry_lookup(prompt_id, variables)
+        before = bench(f"{prompt_id} before (build per call)", lambda: per_call_construction(prompt_id, variables), iterations)
+        after = bench(f"{prompt_id} after (registry)", lambda: registry_lookup(prompt_id, variables), iterations)
+        print(f"{prompt_id} speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
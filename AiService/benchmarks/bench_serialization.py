@@ -0,0 +1,104 @@
+"""Response serialization cost: FastAPI's default path vs FastJSONResponse.
+
+Run from the AiService directory:
+
+    python benchmarks/bench_serialization.py [iterations]
+
+Payloads mimic /job_matcher/search_jobs (300 jobs) and
+/footprint_scanner/analyze_github (a profile with raw repo/org/event lists).
+"default" is what FastAPI does with a returned dict: jsonable_encoder, then
+json.dumps. "fast" is responses.dumps on the same content, with dataclasses
+passed as they are. Time per response and peak allocation (tracemalloc) are
+reported for both.
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from footprint_scanner import FootprintScanner
+from responses import dumps, orjson
+
+
+def search_jobs_payload(count: int = 300) -> dict:
+    jobs = [
+        {
+            "title": f"Senior Python Developer {i}",
+            "company": f"Company {i % 40}",
+            "location": ["Berlin, Germany", "Remote", "Tunis, Tunisia", "Dubai, United Arab Emirates"][i % 4],
+            "job_link": f"https://www.linkedin.com/jobs/view/{3900000000 + i}",
+            "posted_date": "2025-01-15",
+            "region_match": i % 3 != 0,
+            "inferred_salary_range": None,
+            "remote_flag": i % 4 == 1,
+            "market_alignment": (i * 20) % 100,
+        }
+        for i in range(count)
+    ]
+    return {"success": True, "jobs": jobs, "total_found": count, "keywords": "python developer",
+            "location": "germany", "region": "europe", "remote_ok": True, "currency": "EUR"}
+
+
+def github_profile() -> "FootprintScanner.GitHubProfile":
+    repos = [
+        {"name": f"repo-{i}", "stars": i * 3, "forks": i, "language": ["Python", "TypeScript", "Go"][i % 3],
+         "description": "A reasonably long repository description " * 2, "updated_at": "2025-01-10T12:00:00Z"}
+        for i in range(100)
+    ]
+    events = [
+        {"type": "PushEvent", "repo": f"user/repo-{i % 100}", "created_at": "2025-01-10T12:00:00Z",
+         "payload": {"commits": [{"sha": f"{i:040x}", "message": "Fix flaky test and refactor parser"}] * 3}}
+        for i in range(90)
+    ]
+    orgs = [{"login": f"org-{i}", "avatar_url": f"https://avatars.githubusercontent.com/u/{i}", "description": None} for i in range(20)]
+    return FootprintScanner.GitHubProfile(
+        username="octocat", name="The Octocat", avatar_url="https://avatars.githubusercontent.com/u/583231",
+        bio="Developer", company="GitHub", location="San Francisco", blog="https://github.blog",
+        public_repos=100, followers=5000, following=10, total_stars=14850, total_forks=4950,
+        languages={"Python": 40, "TypeScript": 35, "Go": 25}, recent_activity=events, orgs=orgs,
+        contribution_streak=42, profile_score=87.5, top_repos=repos[:10], collaboration_score=73.2,
+        code_quality_score=80.0, technical_diversity_score=65.0, innovation_score=70.0,
+        problem_solving_score=75.0, learning_curve_score=60.0, regional_relevance_score=55.0,
+        remote_work_readiness=90.0,
+    )
+
+
+def default_path(content: dict) -> bytes:
+    # Before: routes built plain dicts by hand, FastAPI encoded and dumped them
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def bench(label: str, func, content, iterations: int) -> None:
+    func(content)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(content)
+    per_call_us = (time.perf_counter() - start) / iterations * 1e6
+    tracemalloc.start()
+    body = func(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  {label:<8} {per_call_us:>10.1f} us/response  peak {peak / 1024:>8.1f} KiB  body {len(body) / 1024:>7.1f} KiB")
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'json (orjson not installed)'}")
+    profile = github_profile()
+    cases = [
+        ("search_jobs (300 jobs)", search_jobs_payload(), search_jobs_payload()),
+        ("analyze_github", {"success": True, "github_profile": asdict(profile)}, {"success": True, "github_profile": profile}),
+    ]
+    for name, before, after in cases:
+        print(name)
+        bench("default", default_path, before, iterations)
+        bench("fast", dumps, after, iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Per-request service construction overhead: before vs after the lifespan registry.
+
+Run from the AiService directory:
+
+    python benchmarks/bench_service_registry.py [iterations]
+
+"before" builds JobMatcher/AIInterviewer/FootprintScanner the way routes.py used to
+on every request. "after" resolves them from a ServiceRegistry built once.
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_interviewer import AIInterviewer
+from footprint_scanner import FootprintScanner
+from job_matcher import JobMatcher
+from services import ServiceRegistry, get_footprint_scanner, get_interviewer, get_job_matcher
+
+
+def per_request_construction() -> None:
+    job_matcher = JobMatcher()
+    interviewer = AIInterviewer()
+    scanner = FootprintScanner()
+    # Sessions were dropped when the request finished
+    job_matcher.close()
+    scanner.close()
+
+
+def registry_lookup(request: SimpleNamespace) -> None:
+    get_job_matcher(request)
+    get_interviewer(request)
+    get_footprint_scanner(request)
+
+
+def bench(label: str, func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed / iterations * 1e6
+    print(f"{label:<28} {iterations:>7} iterations  {per_call_us:>10.2f} us/request")
+    return per_call_us
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    registry = ServiceRegistry()
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(services=registry)))
+    try:
+        before = bench("before (construct per call)", per_request_construction, iterations)
+        after = bench("after (registry lookup)", lambda: registry_lookup(request), iterations)
+        print(f"speedup: {before / after:.0f}x")
+    finally:
+        registry.close()
+
+
+if __name__ == "__main__":
+    main()
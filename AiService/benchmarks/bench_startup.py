@@ -0,0 +1,131 @@
+"""Cold-start cost of the service: import time of routes.py and time to first byte.
+
+Run from the AiService directory:
+
+    python benchmarks/bench_startup.py [--repeats N] [--top N] [--json]
+
+"import" runs `python -X importtime -c "import routes"` in a fresh interpreter and
+reports the total plus the most expensive top-level packages. "ttfb" spawns
+`uvicorn routes:app` on a free port and measures the time from spawn until
+GET / answers. Both are repeated and the median is reported.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import time: self [us] | cumulative | imported package
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_imports() -> Tuple[float, Dict[str, float]]:
+    """Seconds to import routes, and the self time spent per top-level package."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import routes"],
+        cwd=SERVICE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing routes failed:\n{proc.stderr[-2000:]}")
+
+    total_us = 0
+    per_package: Dict[str, float] = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        per_package[name.split(".")[0]] += int(self_us) / 1e6
+        if len(indent) == 1:
+            # Top-level imports; their cumulative times add up to the whole import
+            total_us += int(cumulative_us)
+    return total_us / 1e6, dict(per_package)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_ttfb(timeout: float = 60.0) -> float:
+    """Seconds from spawning a single uvicorn worker until GET / returns."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "routes:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVICE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited early:\n{proc.stderr.read().decode(errors='replace')[-2000:]}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    response.read(1)
+                return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"No response from {url} within {timeout}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="number of packages to list")
+    parser.add_argument("--skip-ttfb", action="store_true", help="only measure import time")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    import_totals: List[float] = []
+    package_times: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(args.repeats):
+        total, per_package = measure_imports()
+        import_totals.append(total)
+        for name, seconds in per_package.items():
+            package_times[name].append(seconds)
+    top = sorted(((name, statistics.median(times)) for name, times in package_times.items()), key=lambda item: -item[1])[: args.top]
+
+    ttfb: List[float] = []
+    if not args.skip_ttfb:
+        ttfb = [measure_ttfb() for _ in range(args.repeats)]
+
+    results = {
+        "repeats": args.repeats,
+        "import_routes_seconds": statistics.median(import_totals),
+        "top_packages": [{"package": name, "seconds": round(seconds, 4)} for name, seconds in top],
+        "ttfb_seconds": statistics.median(ttfb) if ttfb else None,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"import routes (median of {args.repeats}): {results['import_routes_seconds'] * 1000:.1f} ms")
+    for name, seconds in top:
+        print(f"  {name:<30} {seconds * 1000:>8.1f} ms")
+    if ttfb:
+        print(f"time to first byte (median of {args.repeats}): {results['ttfb_seconds'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Stand-in for the Ollama HTTP API, for load tests without a GPU or network.
+
+Run from the AiService directory:
+
+    python benchmarks/fake_ollama.py [--port 11435] [--ttft 0.5] [--tokens-per-second 30]
+                                     [--output-tokens 300] [--error-rate 0.0]
+
+then point the service at it with OLLAMA_URL=http://127.0.0.1:11435.
+
+Implements /api/generate and /api/chat (streamed NDJSON or a single JSON
+body), /api/tags, /api/show, /api/ps and /api/version. Responses wait
+--ttft seconds before the first token and then emit --tokens-per-second.
+With --error-rate a share of the requests fail with --error-status, and with
+--stream-error-rate a share of the streams is cut off half way.
+
+Outputs are canned: prompts asking for a JSON array get interview questions,
+prompts asking for a JSON object get a response analysis, everything else
+gets resume-like text. --canned FILE replaces them with a JSON list of
+{"match": "substring of the prompt", "response": "..."} rules (first match
+wins; an empty match is the default).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+QUESTIONS = [
+    {
+        "question": f"Tell me about a time you had to {task}.",
+        "type": kind,
+        "competencies": ["communication", "ownership"],
+        "difficulty": 1 + i % 5,
+        "suggested_time": 3,
+        "looking_for": "A specific example with a measurable outcome",
+    }
+    for i, (task, kind) in enumerate([
+        ("debug a production incident", "behavioral"),
+        ("design a rate limiter", "technical"),
+        ("disagree with a product decision", "situational"),
+        ("learn a new technology quickly", "general"),
+        ("improve the latency of a service", "technical"),
+        ("mentor a junior engineer", "behavioral"),
+        ("handle a missed deadline", "situational"),
+        ("choose between two architectures", "technical"),
+    ])
+]
+
+ANALYSIS = {
+    "overall_score": 7,
+    "content_quality": 7,
+    "structure_clarity": 8,
+    "relevance": 7,
+    "specificity": 6,
+    "confidence_level": 7,
+    "strengths": ["Clear structure", "Relevant example"],
+    "weaknesses": ["Few concrete numbers"],
+    "specific_feedback": "Good use of the STAR format; quantify the result.",
+    "improvement_suggestions": ["Add metrics", "Mention trade-offs"],
+    "follow_up_questions": ["What would you do differently next time?"],
+}
+
+TEXT_WORDS = (
+    "Results-driven software engineer with experience designing, building and operating scalable "
+    "backend services. Led the migration of a monolith to microservices, reducing p95 latency by "
+    "40% and infrastructure cost by 25%. Skilled in Python, FastAPI, PostgreSQL, Docker and "
+    "Kubernetes. Mentored four engineers and introduced code review and CI/CD practices."
+).split()
+
+DEFAULT_RULES = [
+    {"match": "Return only the JSON array", "response": json.dumps(QUESTIONS)},
+    {"match": "Return only the JSON object", "response": json.dumps(ANALYSIS)},
+]
+
+
+class FakeOllamaConfig:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.ttft = args.ttft
+        self.tokens_per_second = args.tokens_per_second
+        self.output_tokens = args.output_tokens
+        self.error_rate = args.error_rate
+        self.error_status = args.error_status
+        self.stream_error_rate = args.stream_error_rate
+        self.model = args.model
+        self.rules: List[Dict[str, str]] = DEFAULT_RULES
+        if args.canned:
+            with open(args.canned, encoding="utf-8") as f:
+                self.rules = json.load(f)
+        self._random = random.Random(args.seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.active = 0
+
+    def roll(self, rate: float) -> bool:
+        with self._lock:
+            return self._random.random() < rate
+
+    def output_for(self, prompt: str) -> str:
+        for rule in self.rules:
+            if rule.get("match", "") in prompt:
+                return rule["response"]
+        return " ".join(TEXT_WORDS[i % len(TEXT_WORDS)] for i in range(self.output_tokens))
+
+
+def _tokens(text: str) -> List[str]:
+    # Word-sized chunks, keeping the separators so the concatenation is the original text
+    tokens, current = [], ""
+    for char in text:
+        current += char
+        if char in " \n":
+            tokens.append(current)
+            current = ""
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    server_version = "FakeOllama/0.1"
+    protocol_version = "HTTP/1.1"
+    config: FakeOllamaConfig
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, data: Any) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        return json.loads(raw or b"{}")
+
+    def do_GET(self) -> None:
+        if self.path == "/":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": self.config.model, "model": self.config.model, "size": 0}]})
+        elif self.path == "/api/ps":
+            self._send_json(200, {"models": [{"name": self.config.model, "model": self.config.model, "size_vram": 0}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        try:
+            payload = self._read_json()
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+        if self.path == "/api/show":
+            self._send_json(200, {"modelfile": "", "parameters": "", "template": "", "details": {"family": "llama"}})
+        elif self.path in ("/api/generate", "/api/chat"):
+            self._generate(payload, chat=self.path == "/api/chat")
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _generate(self, payload: Dict[str, Any], chat: bool) -> None:
+        config = self.config
+        with config._lock:
+            config.requests += 1
+            config.active += 1
+        try:
+            if config.roll(config.error_rate):
+                self._send_json(config.error_status, {"error": "injected failure"})
+                return
+            if chat:
+                prompt = "\n".join(str(m.get("content", "")) for m in payload.get("messages") or [])
+            else:
+                prompt = str(payload.get("prompt", ""))
+            if not prompt and not chat:
+                # Empty prompt = load/keep-alive request
+                self._send_json(200, self._final(payload, "", 0, 0.0, chat))
+                return
+            tokens = _tokens(config.output_for(prompt))
+            started = time.perf_counter()
+            if payload.get("stream", True):
+                self._stream(payload, tokens, started, chat)
+            else:
+                time.sleep(config.ttft + len(tokens) / config.tokens_per_second)
+                self._send_json(200, self._final(payload, "".join(tokens), len(tokens), time.perf_counter() - started, chat))
+        finally:
+            with config._lock:
+                config.active -= 1
+
+    def _chunk(self, payload: Dict[str, Any], text: str, chat: bool) -> Dict[str, Any]:
+        chunk = {"model": payload.get("model", self.config.model), "created_at": _now(), "done": False}
+        if chat:
+            chunk["message"] = {"role": "assistant", "content": text}
+        else:
+            chunk["response"] = text
+        return chunk
+
+    def _final(self, payload: Dict[str, Any], text: str, count: int, elapsed: float, chat: bool) -> Dict[str, Any]:
+        final = self._chunk(payload, text, chat)
+        final.update({
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int(elapsed * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": len(str(payload.get("prompt", ""))) // 4,
+            "prompt_eval_duration": int(self.config.ttft * 1e9),
+            "eval_count": count,
+            "eval_duration": int(max(0.0, elapsed - self.config.ttft) * 1e9),
+        })
+        return final
+
+    def _write_chunk(self, data: Dict[str, Any]) -> None:
+        line = json.dumps(data).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, payload: Dict[str, Any], tokens: List[str], started: float, chat: bool) -> None:
+        config = self.config
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        cut_at = len(tokens) // 2 if config.roll(config.stream_error_rate) else None
+        time.sleep(config.ttft)
+        interval = 1.0 / config.tokens_per_second
+        try:
+            for i, token in enumerate(tokens):
+                if cut_at is not None and i == cut_at:
+                    # Drop the connection mid-stream, like a crashed runner
+                    self.close_connection = True
+                    return
+                self._write_chunk(self._chunk(payload, token, chat))
+                # Sleep until the token's scheduled time so slow writes do not add up
+                delay = started + config.ttft + (i + 1) * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self._write_chunk(self._final(payload, "", len(tokens), time.perf_counter() - started, chat))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away: stop generating, as Ollama does
+            self.close_connection = True
+
+
+def serve(config: FakeOllamaConfig, host: str, port: int) -> ThreadingHTTPServer:
+    handler = type("ConfiguredFakeOllamaHandler", (FakeOllamaHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default="llama3.1")
+    parser.add_argument("--ttft", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=30.0)
+    parser.add_argument("--output-tokens", type=int, default=300, help="length of the default text output")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="share of streams cut off half way")
+    parser.add_argument("--canned", help="JSON file with [{\"match\": ..., \"response\": ...}] rules")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    server = serve(FakeOllamaConfig(args), args.host, args.port)
+    print(f"Fake Ollama listening on http://{args.host}:{server.server_address[1]} "
+          f"(ttft={args.ttft}s, {args.tokens_per_second} tok/s, error rate {args.error_rate})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
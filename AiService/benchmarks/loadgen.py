@@ -0,0 +1,335 @@
+"""Open-loop load generator for the LLM endpoints.
+
+Run from the AiService directory. Against a running service:
+
+    python benchmarks/loadgen.py --base-url http://127.0.0.1:8000 --rps 4 --duration 60
+
+or fully self-contained (CPU only, no network): --spawn starts
+benchmarks/fake_ollama.py and the service (main.py, with --workers)
+pointed at it, runs the load and stops both:
+
+    python benchmarks/loadgen.py --spawn --rps 4 --duration 60 \\
+        --fake-ollama-args "--ttft 0.3 --tokens-per-second 50 --error-rate 0.02"
+
+Requests are sent at a fixed rate (or Poisson arrivals with --poisson),
+rotating through --scenarios, whether or not earlier ones have completed, so
+queueing shows up as latency instead of lower offered load. Per scenario
+it reports p50/p95/p99 latency of successful requests, throughput, the share
+shed by admission control (429/503) and the error rate.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shlex
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Request = Tuple[str, str, Dict[str, str], bytes]
+
+
+def _pdf(text: str) -> bytes:
+    """Smallest valid one-page PDF showing `text`, for the upload endpoints."""
+    lines = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in text.split("\n")]
+    content = "BT /F1 11 Tf 50 780 Td 14 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return out
+
+
+def _resume_text(nonce: str) -> str:
+    return "\n".join([
+        f"Jane Doe ({nonce})",
+        "Senior Software Engineer - 6 years of experience",
+        "Bachelor in Computer Science",
+        "Skills: Python, FastAPI, PostgreSQL, Docker, Kubernetes, AWS",
+        "Led the migration of a monolith to microservices; cut p95 latency by 40%.",
+        "AWS Certified Solutions Architect",
+    ])
+
+
+def _json(path: str, payload: dict) -> Request:
+    return "POST", path, {"Content-Type": "application/json"}, json.dumps(payload).encode("utf-8")
+
+
+def _upload(path: str, nonce: str) -> Request:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"resume.pdf\"\r\n"
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode("latin-1") + _pdf(_resume_text(nonce)) + f"\r\n--{boundary}--\r\n".encode("latin-1")
+    return "POST", path, {"Content-Type": f"multipart/form-data; boundary={boundary}"}, body
+
+
+# name -> builder(nonce) returning (method, path, headers, body)
+SCENARIOS: Dict[str, Callable[[str], Request]] = {
+    "generate_questions": lambda nonce: _json("/ai_interviewer/generate_questions", {
+        "job_description": f"Backend engineer ({nonce}) building Python APIs on Kubernetes",
+        "interview_type": "mixed",
+        "num_questions": 6,
+    }),
+    "analyze_response": lambda nonce: _json("/ai_interviewer/analyze_response", {
+        "question": "Tell me about a production incident you handled.",
+        "response": f"({nonce}) I led the rollback, found the bad migration and added a canary stage.",
+        "question_type": "behavioral",
+    }),
+    "create_report_aggregate": lambda nonce: _json("/create_report/aggregate", {
+        "resume_summary": _resume_text(nonce),
+        "interview_profile": {"overall_score": 7, "strengths": "communication"},
+        "footprints": {"github": {"public_repos": 30, "followers": 120}},
+        "job_market": {"region": "europe", "openings": 42},
+    }),
+    "resume_writer": lambda nonce: _upload("/resume_writer", nonce),
+    "create_report": lambda nonce: _upload("/create_report", nonce),
+    # No LLM involved: a baseline for the service itself
+    "analyze_cv": lambda nonce: _json("/job_matcher/analyze_cv", {"resume_text": _resume_text(nonce)}),
+}
+
+_APP_FAILURE = re.compile(rb'"success"\s*:\s*false')
+
+DEFAULT_SCENARIOS = "generate_questions,analyze_response,create_report_aggregate,resume_writer,create_report"
+
+
+async def _send(base: urlsplit, request: Request, timeout: float) -> Tuple[int, bytes]:
+    """Send one HTTP/1.1 request on a fresh connection and return the status and body."""
+    method, path, headers, body = request
+    host, port = base.hostname, base.port or 80
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        head = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: close", f"Content-Length: {len(body)}"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        # Connection: close, so the body ends at EOF
+        rest = await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1]), rest.partition(b"\r\n\r\n")[2]
+    finally:
+        writer.close()
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.sent = 0
+        self.ok_latencies: List[float] = []
+        self.shed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.statuses: Dict[str, int] = {}
+
+    def record(self, status: Optional[int], latency: float, error: Optional[str] = None) -> None:
+        key = str(status) if status is not None else (error or "error")
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if status is not None and 200 <= status < 300:
+            self.ok_latencies.append(latency)
+        elif status in (429, 503):
+            self.shed += 1
+        else:
+            self.errors += 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def run_load(base_url: str, scenarios: List[str], rps: float, duration: float, poisson: bool,
+                   timeout: float, max_in_flight: int, seed: Optional[int]) -> Tuple[Dict[str, Stats], float]:
+    base = urlsplit(base_url)
+    rng = random.Random(seed)
+    stats = {name: Stats() for name in scenarios}
+    in_flight: set = set()
+
+    async def one(name: str) -> None:
+        request = SCENARIOS[name](uuid.uuid4().hex[:8])
+        start = time.perf_counter()
+        try:
+            status, body = await _send(base, request, timeout)
+            latency = time.perf_counter() - start
+            # Most routes report LLM failures as 200 {"success": false, ...}
+            if status == 200 and _APP_FAILURE.search(body[:256]):
+                stats[name].record(None, latency, "success_false")
+            else:
+                stats[name].record(status, latency)
+        except asyncio.TimeoutError:
+            stats[name].record(None, time.perf_counter() - start, "timeout")
+        except OSError as e:
+            stats[name].record(None, time.perf_counter() - start, type(e).__name__)
+
+    start = time.perf_counter()
+    next_at = start
+    index = 0
+    while next_at - start < duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = scenarios[index % len(scenarios)]
+        index += 1
+        stats[name].sent += 1
+        if len(in_flight) >= max_in_flight:
+            # The client itself is saturated; count it instead of silently lowering the rate
+            stats[name].dropped += 1
+        else:
+            task = asyncio.ensure_future(one(name))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_at += rng.expovariate(rps) if poisson else 1.0 / rps
+    if in_flight:
+        await asyncio.wait(in_flight)
+    return stats, time.perf_counter() - start
+
+
+def summarize(stats: Dict[str, Stats], elapsed: float) -> Dict[str, dict]:
+    summary = {}
+    for name, s in stats.items():
+        latencies = sorted(s.ok_latencies)
+        summary[name] = {
+            "sent": s.sent,
+            "ok": len(latencies),
+            "shed": s.shed,
+            "errors": s.errors,
+            "dropped": s.dropped,
+            "error_rate": round(s.errors / s.sent, 4) if s.sent else 0.0,
+            "shed_rate": round(s.shed / s.sent, 4) if s.sent else 0.0,
+            "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "statuses": s.statuses,
+        }
+    return summary
+
+
+def print_summary(summary: Dict[str, dict], elapsed: float) -> None:
+    def ms(value: Optional[float]) -> str:
+        return f"{value * 1000:.0f}" if value is not None else "-"
+
+    print(f"\nwall time {elapsed:.1f}s")
+    print(f"{'scenario':<26}{'sent':>6}{'ok':>6}{'shed':>6}{'err':>6}{'err%':>7}{'ok/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in summary.items():
+        print(f"{name:<26}{row['sent']:>6}{row['ok']:>6}{row['shed']:>6}{row['errors']:>6}"
+              f"{row['error_rate'] * 100:>6.1f}%{row['throughput_rps']:>8.2f}"
+              f"{ms(row['p50']):>9}{ms(row['p95']):>9}{ms(row['p99']):>9}")
+        if row["errors"] or row["dropped"]:
+            print(f"{'':<26}statuses {row['statuses']}  dropped by client {row['dropped']}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{' '.join(proc.args)} exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def spawn_stack(fake_ollama_args: str, workers: int) -> Tuple[str, List[subprocess.Popen]]:
+    """Start the fake Ollama and the service against it; returns the service URL and processes."""
+    ollama_port, service_port = _free_port(), _free_port()
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(SERVICE_DIR, "benchmarks", "fake_ollama.py"), "--port", str(ollama_port)]
+        + shlex.split(fake_ollama_args),
+        cwd=SERVICE_DIR,
+    )
+    processes = [fake]
+    try:
+        _wait_ready(f"http://127.0.0.1:{ollama_port}/", fake)
+        env = dict(os.environ, OLLAMA_URL=f"http://127.0.0.1:{ollama_port}", AI_SERVICE_HOST="127.0.0.1",
+                   AI_SERVICE_PORT=str(service_port), WEB_CONCURRENCY=str(workers))
+        service = subprocess.Popen([sys.executable, "main.py"], cwd=SERVICE_DIR, env=env)
+        processes.append(service)
+        _wait_ready(f"http://127.0.0.1:{service_port}/", service)
+    except BaseException:
+        stop_stack(processes)
+        raise
+    return f"http://127.0.0.1:{service_port}", processes
+
+
+def stop_stack(processes: List[subprocess.Popen]) -> None:
+    for proc in reversed(processes):
+        proc.terminate()
+    for proc in reversed(processes):
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS, help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--rps", type=float, default=2.0, help="total offered load, requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times instead of a fixed rate")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-request timeout in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--spawn", action="store_true", help="start fake Ollama and the service locally")
+    parser.add_argument("--workers", type=int, default=1, help="service workers with --spawn")
+    parser.add_argument("--fake-ollama-args", default="", help="extra arguments for fake_ollama.py with --spawn")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    processes: List[subprocess.Popen] = []
+    base_url = args.base_url
+    if args.spawn:
+        base_url, processes = spawn_stack(args.fake_ollama_args, args.workers)
+    try:
+        stats, elapsed = asyncio.run(run_load(
+            base_url, scenarios, args.rps, args.duration, args.poisson, args.timeout, args.max_in_flight, args.seed
+        ))
+    finally:
+        stop_stack(processes)
+
+    summary = summarize(stats, elapsed)
+    if args.json:
+        print(json.dumps({"base_url": base_url, "rps": args.rps, "duration": args.duration,
+                          "elapsed": round(elapsed, 3), "scenarios": summary}, indent=2))
+    else:
+        print_summary(summary, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Cooperative cancellation of request work when the client goes away.
+
+cancel_on_disconnect runs a route's work next to a watcher on the ASGI receive
+channel. When the client (browser or NestJS proxy) disconnects, the work is
+cancelled and the request's cancel event is set. The event lives in a context
+variable, so it reaches the executor threads doing the blocking part: LLM
+calls stream and close the Ollama stream once it is set (stopping the
+generation), and the LinkedIn scraper checks it between pages.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Iterator, Optional, TypeVar
+from metrics import Counter, current_endpoint
+
+T = TypeVar("T")
+
+DISCONNECTS = Counter("aiservice_client_disconnects_total", "Requests whose work was cancelled because the client went away.", ["endpoint"])
+
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar("cancel_event", default=None)
+
+
+class Cancelled(Exception):
+    """The work was cancelled because nobody is waiting for its result any more."""
+
+
+class ClientDisconnected(Cancelled):
+    pass
+
+
+def current_cancel() -> Optional[threading.Event]:
+    return _cancel_event.get()
+
+
+@contextmanager
+def bound(event: Optional[threading.Event]) -> Iterator[Optional[threading.Event]]:
+    """Make `event` the cancel event of work started (tasks created, calls submitted) in the block.
+
+    With None the current cancel event, if any, stays in place.
+    """
+    if event is None:
+        yield _cancel_event.get()
+        return
+    token = _cancel_event.set(event)
+    try:
+        yield event
+    finally:
+        _cancel_event.reset(token)
+
+
+def is_cancelled() -> bool:
+    event = _cancel_event.get()
+    return event is not None and event.is_set()
+
+
+def raise_if_cancelled() -> None:
+    if is_cancelled():
+        raise Cancelled("Request cancelled")
+
+
+def cancellable_sleep(seconds: float) -> None:
+    """time.sleep that returns early, raising Cancelled, once the work is cancelled."""
+    event = _cancel_event.get()
+    if event is None:
+        time.sleep(seconds)
+    elif event.wait(seconds):
+        raise Cancelled("Request cancelled")
+
+
+async def _wait_disconnect(receive) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+def _retrieve(task: asyncio.Future) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+async def cancel_on_disconnect(request: Any, work: Awaitable[T]) -> T:
+    """Await `work`, cancelling it and raising ClientDisconnected if the client disconnects first.
+
+    Only for routes whose request body has already been read.
+    """
+    with bound(threading.Event()) as event:
+        task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_disconnect(request.receive))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        event.set()
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if task.done():
+        return task.result()
+    event.set()
+    task.cancel()
+    task.add_done_callback(_retrieve)
+    DISCONNECTS.inc(endpoint=current_endpoint.get())
+    raise ClientDisconnected("Client disconnected")
@@ -0,0 +1,125 @@
+"""Token-bounded map-reduce for long resumes.
+
+A resume longer than RESUME_SINGLE_PASS_TOKENS is not sent to the model in
+one prompt. It is split at its section headings, the sections are packed
+into chunks of at most RESUME_CHUNK_TOKENS, and the chunks are processed
+concurrently on the "llm_map" pool (map). A final step merges the results
+(reduce). At most RESUME_TOKEN_BUDGET tokens of a resume are processed; the
+sections past the budget are dropped, so the number of chunks, and with it
+the worst-case latency, is bounded however long the document is. truncation()
+reports what was dropped so the routes can tell the client.
+
+Tokens are estimated from the character count (LLM_CHARS_PER_TOKEN); the
+estimate only has to be good enough to stay clear of the context size.
+"""
+import math
+import os
+import re
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from dotenv import load_dotenv
+from executors import map_in_pool
+from metrics import stage
+
+load_dotenv()
+
+LLM_CHARS_PER_TOKEN = float(os.getenv("LLM_CHARS_PER_TOKEN") or 4)
+RESUME_SINGLE_PASS_TOKENS = int(os.getenv("RESUME_SINGLE_PASS_TOKENS") or 3000)
+RESUME_CHUNK_TOKENS = int(os.getenv("RESUME_CHUNK_TOKENS") or 1500)
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET") or 12000)
+
+_SECTION_WORDS = {
+    "summary", "profile", "objective", "about", "experience", "employment", "work", "career",
+    "education", "skills", "projects", "certifications", "certificates", "publications",
+    "awards", "achievements", "honors", "languages", "volunteer", "volunteering",
+    "interests", "references", "courses", "training", "activities", "leadership",
+}
+_WORD = re.compile(r"[A-Za-z]+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / LLM_CHARS_PER_TOKEN)
+
+
+def needs_map_reduce(text: str) -> bool:
+    return estimate_tokens(text) > RESUME_SINGLE_PASS_TOKENS
+
+
+def is_heading(line: str) -> bool:
+    line = line.strip().rstrip(":")
+    words = _WORD.findall(line)
+    if not words or len(line) > 40 or len(words) > 4:
+        return False
+    return line.isupper() or words[0].lower() in _SECTION_WORDS
+
+
+def split_sections(text: str) -> List[str]:
+    """Split a resume before each section heading; the text before the first one is its own section."""
+    sections: List[List[str]] = [[]]
+    for line in text.splitlines():
+        if is_heading(line) and any(l.strip() for l in sections[-1]):
+            sections.append([])
+        sections[-1].append(line)
+    return [section for section in ("\n".join(lines).strip() for lines in sections) if section]
+
+
+def _split_long(section: str, max_tokens: int) -> List[str]:
+    """Split a section larger than a chunk at line breaks (or mid-line, for a single huge line)."""
+    max_chars = int(max_tokens * LLM_CHARS_PER_TOKEN)
+    pieces = []
+    for line in section.splitlines():
+        pieces.extend(line[i:i + max_chars] for i in range(0, max(len(line), 1), max_chars))
+    return _pack(pieces, max_tokens, "\n")
+
+
+def _pack(pieces: List[str], max_tokens: int, separator: str) -> List[str]:
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece + separator)
+        if current and size + tokens > max_tokens:
+            chunks.append(separator.join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def chunk_resume(text: str, chunk_tokens: int = RESUME_CHUNK_TOKENS, budget: int = RESUME_TOKEN_BUDGET) -> Tuple[List[str], int]:
+    """Chunks of whole sections within `chunk_tokens` each and `budget` in total, and the tokens dropped."""
+    pieces: List[str] = []
+    for section in split_sections(text):
+        pieces.extend(_split_long(section, chunk_tokens) if estimate_tokens(section) > chunk_tokens else [section])
+    chunks: List[str] = []
+    used = dropped = 0
+    for chunk in _pack(pieces, chunk_tokens, "\n\n"):
+        tokens = estimate_tokens(chunk)
+        if dropped or used + tokens > budget:
+            dropped += tokens
+            continue
+        chunks.append(chunk)
+        used += tokens
+    return chunks, dropped
+
+
+def truncation(text: str) -> Dict[str, Any]:
+    """{"truncated", "dropped_tokens"} for a resume: what map_chunks leaves out past RESUME_TOKEN_BUDGET."""
+    dropped = chunk_resume(text)[1] if needs_map_reduce(text) else 0
+    return {"truncated": dropped > 0, "dropped_tokens": dropped}
+
+
+def map_chunks(text: str, map_chunk: Callable[[str], str]) -> Iterator[str]:
+    """Start map_chunk on every chunk of `text` concurrently; iterate for the results in document order."""
+    chunks, dropped = chunk_resume(text)
+    if dropped:
+        print(f"Resume exceeds RESUME_TOKEN_BUDGET ({RESUME_TOKEN_BUDGET} tokens), ~{dropped} tokens not processed")
+    return map_in_pool("llm_map", map_chunk, chunks)
+
+
+def map_reduce(text: str, map_chunk: Callable[[str], str], reduce: Callable[[List[str]], str]) -> str:
+    with stage("llm_map"):
+        parts = list(map_chunks(text, map_chunk))
+    with stage("llm_reduce"):
+        return reduce(parts)
@@ -0,0 +1,145 @@
+"""Batch CV analysis for /job_matcher/analyze_cv_batch.
+
+Resumes arrive as a JSON array (or {"resumes": [...]}) or as NDJSON, one resume
+per line. Each item is either a string or an object with `resume_text` and an
+optional `id`. Items are grouped into chunks of CV_BATCH_CHUNK_SIZE and each
+full chunk is analyzed in the process pool as soon as it has been read, so
+large uploads use every core and NDJSON parsing overlaps with analysis. A batch
+that fits in one chunk is analyzed in-process. A bad item fails on its own.
+"""
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from fastapi import Request
+from executors import run_cpu, run_process
+from job_matcher import JobMatcher, analyze_cv_chunk
+
+load_dotenv()
+
+CV_BATCH_MAX_ITEMS = int(os.getenv("CV_BATCH_MAX_ITEMS") or 1000)
+CV_BATCH_CHUNK_SIZE = int(os.getenv("CV_BATCH_CHUNK_SIZE") or 25)
+
+# (id, resume text, parse error) for one item of the batch
+BatchItem = Tuple[Optional[Any], Optional[str], Optional[str]]
+
+
+class InvalidBatch(Exception):
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _parse_item(raw: Any) -> BatchItem:
+    if isinstance(raw, str):
+        return None, raw, None
+    if isinstance(raw, dict) and isinstance(raw.get("resume_text"), str):
+        return raw.get("id"), raw["resume_text"], None
+    item_id = raw.get("id") if isinstance(raw, dict) else None
+    return item_id, None, "Item must be a string or an object with a 'resume_text' string"
+
+
+def _parse_line(line: bytes) -> BatchItem:
+    try:
+        return _parse_item(json.loads(line))
+    except ValueError as e:
+        return None, None, f"Invalid JSON line: {e}"
+
+
+def _parse_json_body(body: bytes) -> List[Any]:
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise InvalidBatch(f"Body is not valid JSON: {e}")
+    if isinstance(data, dict):
+        data = data.get("resumes")
+    if not isinstance(data, list):
+        raise InvalidBatch("Expected a JSON array of resumes, an object with a 'resumes' array, or NDJSON")
+    return data
+
+
+async def _iter_items(request: Request) -> AsyncIterator[BatchItem]:
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        buffer = b""
+        async for piece in request.stream():
+            buffer += piece
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _parse_line(line)
+        if buffer.strip():
+            yield _parse_line(buffer)
+        return
+
+    # Large arrays take a while to decode, so keep that off the event loop
+    for raw in await run_cpu(_parse_json_body, await request.body()):
+        yield _parse_item(raw)
+
+
+async def _analyze_chunk(texts: List[str], in_process: Optional[JobMatcher]) -> List[Dict[str, Any]]:
+    try:
+        if in_process is not None:
+            return await run_cpu(in_process.analyze_cv_batch, texts)
+        return await run_process(analyze_cv_chunk, texts)
+    except Exception as e:
+        print(f"CV batch chunk failed: {e}")
+        return [{"success": False, "error": str(e)} for _ in texts]
+
+
+async def analyze_cv_batch(request: Request, job_matcher: JobMatcher) -> Dict[str, Any]:
+    """Analyze every resume in the request body and return one result per item, in order."""
+    results: Dict[int, Dict[str, Any]] = {}
+    ids: Dict[int, Any] = {}
+    chunks: List[Tuple[List[int], asyncio.Task]] = []
+    indices: List[int] = []
+    texts: List[str] = []
+    count = 0
+
+    try:
+        async for item_id, text, error in _iter_items(request):
+            if count >= CV_BATCH_MAX_ITEMS:
+                raise InvalidBatch(f"Batch exceeds the limit of {CV_BATCH_MAX_ITEMS} resumes", status_code=413)
+            index = count
+            count += 1
+            if item_id is not None:
+                ids[index] = item_id
+            if error is not None:
+                results[index] = {"success": False, "error": error}
+                continue
+            indices.append(index)
+            texts.append(text)
+            if len(texts) >= CV_BATCH_CHUNK_SIZE:
+                chunks.append((indices, asyncio.create_task(_analyze_chunk(texts, None))))
+                indices, texts = [], []
+
+        if texts:
+            # A batch that fits in a single chunk is not worth shipping to another process
+            in_process = job_matcher if not chunks else None
+            chunks.append((indices, asyncio.create_task(_analyze_chunk(texts, in_process))))
+
+        for chunk_indices, task in chunks:
+            for index, result in zip(chunk_indices, await task):
+                results[index] = result
+    except BaseException:
+        # Rejected or abandoned batch: drop the chunks still being analyzed
+        for _, task in chunks:
+            task.cancel()
+        raise
+
+    items = []
+    for index in range(count):
+        item: Dict[str, Any] = {"index": index}
+        if index in ids:
+            item["id"] = ids[index]
+        item.update(results[index])
+        items.append(item)
+    succeeded = sum(1 for item in items if item["success"])
+    return {
+        "success": True,
+        "total": count,
+        "succeeded": succeeded,
+        "failed": count - succeeded,
+        "results": items,
+    }
@@ -0,0 +1,214 @@
+import asyncio
+import contextvars
+import functools
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+from dotenv import load_dotenv
+from profiling import track_thread
+from tracing import span
+
+load_dotenv()
+
+T = TypeVar("T")
+
+# Pool sizes. LLM calls mostly wait on Ollama, HTTP calls wait on remote APIs and
+# scraping delays, CPU work (PDF extraction/rendering) should not exceed the core count.
+POOL_SIZES: Dict[str, int] = {
+    "llm": int(os.getenv("LLM_POOL_SIZE") or 4),
+    "http": int(os.getenv("HTTP_POOL_SIZE") or 16),
+    "cpu": int(os.getenv("CPU_POOL_SIZE") or os.cpu_count() or 2),
+    # Background generations submitted through the /jobs API
+    "jobs": int(os.getenv("JOB_WORKERS") or 2),
+    # Concurrent parts of one LLM call (map step over a long resume), submitted from an "llm" thread
+    "llm_map": int(os.getenv("LLM_MAP_POOL_SIZE") or 4),
+    # Pure-Python CPU work that must use more than one core (batch CV analysis)
+    "process": int(os.getenv("PROCESS_POOL_SIZE") or os.cpu_count() or 2),
+}
+
+# Kinds backed by worker processes instead of threads. Calls sent there must be
+# picklable (module-level functions) and do not see the caller's context variables.
+PROCESS_POOLS = {"process"}
+
+_pools: Dict[str, Executor] = {}
+_pools_lock = threading.Lock()
+
+# Recent queue wait per thread pool: (moving average in seconds, time of the last sample)
+QUEUE_WAIT_DECAY = float(os.getenv("QUEUE_WAIT_DECAY") or 30)
+_QUEUE_WAIT_WEIGHT = 0.2
+_queue_wait: Dict[str, Tuple[float, float]] = {}
+
+
+def get_pool(kind: str) -> Executor:
+    """Return the executor for `kind`, creating it on first use."""
+    pool = _pools.get(kind)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(kind)
+        if pool is None:
+            if kind not in POOL_SIZES:
+                raise ValueError(f"Unknown executor kind: {kind}")
+            if kind in PROCESS_POOLS:
+                # spawn, not fork: the parent runs an event loop and thread pools
+                pool = ProcessPoolExecutor(max_workers=max(1, POOL_SIZES[kind]), mp_context=multiprocessing.get_context("spawn"))
+            else:
+                pool = ThreadPoolExecutor(max_workers=max(1, POOL_SIZES[kind]), thread_name_prefix=f"aiservice-{kind}")
+            _pools[kind] = pool
+        return pool
+
+
+async def run_in_pool(kind: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking callable on the named pool and await its result.
+
+    The caller's context variables are copied into the worker thread so that
+    request-scoped state keeps working inside the blocking code, and the thread
+    is sampled while it runs if the request is being profiled.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    if kind in PROCESS_POOLS:
+        pool = get_pool(kind)
+        try:
+            return await loop.run_in_executor(pool, call)
+        except BrokenExecutor:
+            # A worker process died; let the next call start a fresh pool
+            _discard_pool(kind, pool)
+            raise
+    with span(f"executor.{kind}", **{"code.function": getattr(func, "__qualname__", repr(func))}) as handoff:
+        started = None
+        if handoff.recording:
+            def started(wait: float) -> None:
+                handoff.set_attribute("executor.queue_wait_ms", round(wait * 1000, 3))
+
+        # Copied after the span is opened so spans in the worker nest under it
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(get_pool(kind), ctx.run, track_thread(_queued(kind, call, started)))
+
+
+async def run_llm(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run an LLM-bound call (Ollama generation)."""
+    return await run_in_pool("llm", func, *args, **kwargs)
+
+
+async def run_http(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run an outbound-HTTP-bound call (scraping, GitHub, StackExchange, RapidAPI)."""
+    return await run_in_pool("http", func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a CPU-bound call (PDF extraction and rendering)."""
+    return await run_in_pool("cpu", func, *args, **kwargs)
+
+
+async def run_process(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a picklable CPU-bound call in a worker process, off this process's GIL."""
+    return await run_in_pool("process", func, *args, **kwargs)
+
+
+def map_in_pool(kind: str, func: Callable[[Any], T], items: Iterable[Any]) -> Iterator[T]:
+    """Executor.map for blocking code: run `func` over `items` concurrently on the pool, yielding results in order.
+
+    The calls are submitted right away, each with a copy of the caller's
+    context (like run_in_pool). Calls not started yet are cancelled if the
+    caller stops iterating. Never map onto the pool the caller is running on:
+    its threads could all end up waiting.
+    """
+    pool = get_pool(kind)
+    futures = [
+        pool.submit(contextvars.copy_context().run, track_thread(_queued(kind, functools.partial(func, item))))
+        for item in items
+    ]
+    return _results(futures)
+
+
+def _queued(kind: str, call: Callable[[], T], started: Optional[Callable[[float], None]] = None) -> Callable[[], T]:
+    """Wrap `call` to record how long it waited on the pool before starting."""
+    submitted = time.perf_counter()
+
+    def run() -> T:
+        # Time spent queued behind other work on this pool
+        wait = time.perf_counter() - submitted
+        _record_queue_wait(kind, wait)
+        if started is not None:
+            started(wait)
+        return call()
+
+    return run
+
+
+def _record_queue_wait(kind: str, wait: float) -> None:
+    now = time.monotonic()
+    average = queue_wait(kind, now)
+    _queue_wait[kind] = (average + _QUEUE_WAIT_WEIGHT * (wait - average), now)
+
+
+def queue_wait(kind: str, now: Optional[float] = None) -> float:
+    """Recent queue wait on the pool in seconds: a moving average that decays while no call starts."""
+    average, at = _queue_wait.get(kind, (0.0, 0.0))
+    if not average:
+        return 0.0
+    elapsed = (time.monotonic() if now is None else now) - at
+    # An idle pool has no queue; without the decay an old burst would be reported forever
+    return average * math.exp(-elapsed / QUEUE_WAIT_DECAY) if QUEUE_WAIT_DECAY > 0 else average
+
+
+def _results(futures: List[Future]) -> Iterator[Any]:
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _discard_pool(kind: str, pool: Executor) -> None:
+    with _pools_lock:
+        if _pools.get(kind) is pool:
+            del _pools[kind]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Size and backlog of each executor created so far."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for kind, pool in list(_pools.items()):
+        if isinstance(pool, ProcessPoolExecutor):
+            stats[kind] = {
+                "max_workers": pool._max_workers,
+                "processes": len(pool._processes or {}),
+                "pending": len(pool._pending_work_items),
+            }
+            continue
+        stats[kind] = {
+            "max_workers": pool._max_workers,
+            "threads": len(pool._threads),
+            "queued": pool._work_queue.qsize(),
+            "queue_wait_ms": round(queue_wait(kind) * 1000, 1),
+        }
+    return stats
+
+
+def shutdown_pools(wait: bool = True) -> None:
+    """Shut down every executor that has been created."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _reset_after_fork() -> None:
+    # Threads do not survive fork(); a child must build its own pools.
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+    _queue_wait.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
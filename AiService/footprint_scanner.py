@@ -1,10 +1,15 @@
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
 import os
 import re
-import requests
+import threading
 from datetime import datetime, timezone
 from dotenv import load_dotenv
+from metrics import stage
+from tracing import span, set_http_response
+
+if TYPE_CHECKING:
+    import requests
 
 
 load_dotenv()
@@ -49,6 +54,9 @@ class LinkedInProfile:
 class FootprintScanner:
     def __init__(self, rapidapi_key: Optional[str] = None) -> None:
         self.rapidapi_key = rapidapi_key or os.getenv("RAPIDAPI_KEY")
+        # One session per scanner so GitHub/StackExchange/RapidAPI calls reuse connections
+        self._session: Optional["requests.Session"] = None
+        self._session_lock = threading.Lock()
 
         # Minimal regional contexts to keep existing routes working
         self.regional_contexts: Dict[str, Dict[str, Any]] = {
@@ -60,6 +68,22 @@ class FootprintScanner:
             }
         }
 
+    @property
+    def session(self) -> "requests.Session":
+        """HTTP session, created (and requests imported) on first use."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+
+                    self._session = requests.Session()
+        return self._session
+
+    def close(self) -> None:
+        """Release pooled HTTP connections."""
+        if self._session is not None:
+            self._session.close()
+
     # ------------------ Public API: LinkedIn ------------------
     def analyze_linkedin_profile(
         self,
@@ -97,8 +121,12 @@ class FootprintScanner:
         }
         params = {"username": username}
 
-        response = requests.get(RAPIDAPI_ENDPOINT, headers=headers, params=params, timeout=30)
-        response.raise_for_status()
+        with stage("rapidapi_call"), span("rapidapi.profile_details", kind="client", **{
+            "http.request.method": "GET", "url.full": RAPIDAPI_ENDPOINT, "server.address": RAPIDAPI_HOST,
+        }) as call:
+            response = self.session.get(RAPIDAPI_ENDPOINT, headers=headers, params=params, timeout=30)
+            set_http_response(call, response)
+            response.raise_for_status()
         try:
             return response.json()  # type: ignore[return-value]
         except ValueError as exc:
@@ -262,7 +290,11 @@ class FootprintScanner:
             headers["Authorization"] = f"Bearer {token}"
 
         def gh_get(url: str, params: Optional[Dict[str, Any]] = None) -> Any:
-            resp = requests.get(url, headers=headers, params=params, timeout=30)
+            with stage("github_call"), span("github.get", kind="client", **{
+                "http.request.method": "GET", "url.full": url, "server.address": "api.github.com",
+            }) as call:
+                resp = self.session.get(url, headers=headers, params=params, timeout=30)
+                set_http_response(call, resp)
             if resp.status_code == 404:
                 raise ValueError("GitHub user not found")
             if resp.status_code == 403:
@@ -421,7 +453,12 @@ class FootprintScanner:
                 p.update(params)
             if app_key:
                 p["key"] = app_key
-            resp = requests.get(f"{base}{path}", params=p, timeout=30)
+            # url.full leaves out the query string, which carries the app key
+            with stage("stackexchange_call"), span("stackexchange.get", kind="client", **{
+                "http.request.method": "GET", "url.full": f"{base}{path}", "server.address": "api.stackexchange.com",
+            }) as call:
+                resp = self.session.get(f"{base}{path}", params=p, timeout=30)
+                set_http_response(call, resp)
             if resp.status_code < 200 or resp.status_code >= 300:
                 raise RuntimeError(f"StackExchange API {resp.status_code}: {resp.text}")
             try:
@@ -0,0 +1,64 @@
+"""Gunicorn settings for running the AI service with several worker processes.
+
+    gunicorn -c gunicorn_conf.py routes:app
+
+or simply `python main.py` with WEB_CONCURRENCY > 1. The app and the heavy
+third-party modules are imported once in the master and shared copy-on-write
+by the forked workers. `kill -HUP <master>` replaces workers gracefully; since
+the app is preloaded, code changes need a binary upgrade (`USR2` then `QUIT`
+to the old master) or a restart.
+"""
+import gc
+import importlib
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"{os.getenv('AI_SERVICE_HOST') or '127.0.0.1'}:{os.getenv('AI_SERVICE_PORT') or 8000}"
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# LLM generations can take minutes; the timeout only has to catch hung workers
+timeout = int(os.getenv("WORKER_TIMEOUT") or 300)
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT") or 60)
+keepalive = 5
+max_requests = int(os.getenv("MAX_REQUESTS") or 0)
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER") or 0)
+
+# Imported in the master before fork so every worker shares their pages
+PRELOAD_MODULES = [
+    "fitz",
+    "fpdf",
+    "bs4",
+    "requests",
+    "langchain.prompts",
+    "langchain_core.runnables.base",
+    "langchain_ollama",
+]
+
+
+def preload_modules() -> None:
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Preload skipped for {name}: {e}")
+
+
+def when_ready(server):
+    preload_modules()
+    # Keep the collector from touching (and un-sharing) the preloaded objects in workers
+    gc.freeze()
+    server.log.info("AI service master ready, spawning %s workers", server.num_workers)
+
+
+def post_fork(server, worker):
+    server.log.info("Worker spawned (pid: %s)", worker.pid)
+
+
+def child_exit(server, worker):
+    from health import remove_heartbeat
+    remove_heartbeat(worker.pid)
+    server.log.info("Worker exited (pid: %s)", worker.pid)
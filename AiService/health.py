@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from executors import pool_stats
+from metrics import REGISTRY, IN_FLIGHT
+import routing
+import warmup
+
+load_dotenv()
+
+# Every worker process writes a heartbeat file here so any worker can report on all of them
+HEALTH_DIR = os.getenv("AI_SERVICE_HEALTH_DIR") or os.path.join(tempfile.gettempdir(), "aiservice-health")
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL") or 5)
+
+_started_at: Optional[float] = None
+
+
+def mark_started() -> None:
+    """Record the worker start time (called from the app lifespan, i.e. after fork)."""
+    global _started_at
+    _started_at = time.time()
+
+
+def worker_status() -> Dict[str, Any]:
+    """Health snapshot of the current worker process."""
+    now = time.time()
+    started = _started_at or now
+    return {
+        "pid": os.getpid(),
+        "status": "ok",
+        "started_at": started,
+        "uptime_seconds": round(now - started, 1),
+        "heartbeat_at": now,
+        "in_flight": int(sum(value for _, value in IN_FLIGHT.snapshot())),
+        "pools": pool_stats(),
+        "model": warmup.status(),
+        "routing": routing.status(),
+    }
+
+
+def _heartbeat_path(pid: int) -> str:
+    return os.path.join(HEALTH_DIR, f"worker-{pid}.json")
+
+
+def _metrics_path(pid: int) -> str:
+    return os.path.join(HEALTH_DIR, f"metrics-{pid}.json")
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def write_heartbeat() -> None:
+    os.makedirs(HEALTH_DIR, exist_ok=True)
+    pid = os.getpid()
+    _write_json(_heartbeat_path(pid), worker_status())
+    _write_json(_metrics_path(pid), REGISTRY.snapshot())
+
+
+def remove_heartbeat(pid: Optional[int] = None) -> None:
+    pid = pid or os.getpid()
+    for path in (_heartbeat_path(pid), _metrics_path(pid)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+async def heartbeat_loop() -> None:
+    """Refresh this worker's heartbeat file until cancelled."""
+    try:
+        while True:
+            try:
+                write_heartbeat()
+            except OSError as e:
+                print(f"Failed to write heartbeat: {e}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+    finally:
+        remove_heartbeat()
+
+
+def read_worker_statuses() -> List[Dict[str, Any]]:
+    """Heartbeats of all workers sharing HEALTH_DIR, flagging the ones that went quiet."""
+    if not os.path.isdir(HEALTH_DIR):
+        return []
+    now = time.time()
+    statuses = []
+    for name in sorted(os.listdir(HEALTH_DIR)):
+        if not (name.startswith("worker-") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(HEALTH_DIR, name), encoding="utf-8") as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if now - status.get("heartbeat_at", 0) > HEARTBEAT_INTERVAL * 3:
+            status["status"] = "stale"
+        statuses.append(status)
+    return statuses
+
+
+def other_worker_metrics() -> List[Dict[str, Any]]:
+    """Metric snapshots published by the other live workers."""
+    if not os.path.isdir(HEALTH_DIR):
+        return []
+    own = f"metrics-{os.getpid()}.json"
+    cutoff = time.time() - HEARTBEAT_INTERVAL * 3
+    snapshots = []
+    for name in os.listdir(HEALTH_DIR):
+        if not (name.startswith("metrics-") and name.endswith(".json")) or name == own:
+            continue
+        path = os.path.join(HEALTH_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                continue
+            with open(path, encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
@@ -0,0 +1,108 @@
+"""Whole-session answer analysis for /ai_interviewer/analyze_session.
+
+Instead of one /analyze_response round-trip per answer followed by
+/generate_profile, the client sends every question/answer pair at once. The
+answers are analyzed concurrently, at most OLLAMA_NUM_PARALLEL at a time (the
+number of requests Ollama serves in parallel), and each analysis is yielded
+the moment it finishes together with the profile of the answers analyzed so
+far. When the client goes away the remaining generations are cancelled.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from ai_interviewer import AIInterviewer, ProfileBuilder
+from cancellation import bound
+from executors import run_llm
+
+load_dotenv()
+
+# Keep in line with the Ollama server's own OLLAMA_NUM_PARALLEL
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL") or 4)
+INTERVIEW_SESSION_MAX_ANSWERS = int(os.getenv("INTERVIEW_SESSION_MAX_ANSWERS") or 50)
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+class InvalidSession(Exception):
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def check_session(answers: List[Dict[str, Any]]) -> None:
+    if not answers:
+        raise InvalidSession("No answers provided for analysis")
+    if len(answers) > INTERVIEW_SESSION_MAX_ANSWERS:
+        raise InvalidSession(f"Session exceeds the limit of {INTERVIEW_SESSION_MAX_ANSWERS} answers", status_code=413)
+
+
+async def _analyze(
+    interviewer: AIInterviewer, semaphore: asyncio.Semaphore, index: int, answer: Dict[str, Any]
+) -> Tuple[int, Optional[Dict], Optional[str], float]:
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            analysis = await run_llm(
+                interviewer.analyze_response,
+                question=answer["question"],
+                response=answer["response"],
+                question_type=answer.get("question_type", "general"),
+            )
+            return index, analysis, None, time.perf_counter() - start
+        except Exception as e:
+            print(f"Session analysis of answer {index} failed: {e}")
+            return index, None, str(e), time.perf_counter() - start
+
+
+async def analyze_session(
+    interviewer: AIInterviewer,
+    answers: List[Dict[str, Any]],
+    concurrency: int = OLLAMA_NUM_PARALLEL,
+) -> AsyncIterator[Event]:
+    """Yield ("analysis", payload) for every answer as it is analyzed, then ("done", final profile)."""
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    builder = ProfileBuilder(interviewer)
+    failed = []
+    # Set when the stream ends early, so generations still running stop too
+    cancel = threading.Event()
+    with bound(cancel):
+        pending = {
+            asyncio.ensure_future(_analyze(interviewer, semaphore, index, answer))
+            for index, answer in enumerate(answers)
+        }
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, analysis, error, elapsed = task.result()
+                if error is not None:
+                    failed.append(index)
+                else:
+                    builder.add(analysis)
+                payload = {
+                    "index": index,
+                    "question": answers[index]["question"],
+                    "elapsed_seconds": round(elapsed, 3),
+                    "completed": builder.count + len(failed),
+                    "total": len(answers),
+                }
+                if error is not None:
+                    yield "analysis", {**payload, "success": False, "error": error}
+                else:
+                    yield "analysis", {**payload, "success": True, "analysis": analysis, "profile": builder.profile()}
+    finally:
+        cancel.set()
+        for task in pending:
+            task.cancel()
+
+    yield "done", {
+        "done": True,
+        "success": not failed,
+        "failed_answers": sorted(failed),
+        "profile": builder.profile(),
+        "total_seconds": round(time.perf_counter() - start, 3),
+    }
@@ -1,15 +1,74 @@
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
-import requests
-from bs4 import BeautifulSoup
-import time
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
+import threading
 import random
 import json
 import re
 from urllib.parse import quote
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
 from datetime import datetime
+from cancellation import Cancelled, cancellable_sleep, raise_if_cancelled
+from metrics import stage
+from tracing import span, set_http_response
+
+# requests and BeautifulSoup are imported on first use to keep service start-up fast
+if TYPE_CHECKING:
+    import requests
+    from bs4 import BeautifulSoup
+
+
+class _Matcher:
+    """A case-insensitive regex that runs as a lowercase pattern over lowercased text.
+
+    Case-sensitive matching is several times faster than re.IGNORECASE. Match
+    spans index the original text as long as lowercasing kept its length (always
+    true for ASCII); otherwise the IGNORECASE pattern runs on the original text.
+    """
+
+    def __init__(self, pattern: str) -> None:
+        self.lower = re.compile(pattern)
+        self.ignorecase = re.compile(pattern, re.IGNORECASE)
+
+    def finditer(self, text: str, text_lower: str):
+        if len(text_lower) == len(text):
+            return self.lower.finditer(text_lower)
+        return self.ignorecase.finditer(text)
+
+    def search(self, text: str, text_lower: str):
+        if len(text_lower) == len(text):
+            return self.lower.search(text_lower)
+        return self.ignorecase.search(text)
+
+
+# Common technical skills, matched as substrings of the lowercased resume
+SKILL_KEYWORDS = (
+    'python', 'javascript', 'java', 'c++', 'c#', 'php', 'ruby', 'go', 'rust', 'swift', 'kotlin',
+    'react', 'angular', 'vue', 'node.js', 'django', 'flask', 'spring', 'express', 'laravel',
+    'sql', 'mysql', 'postgresql', 'mongodb', 'redis', 'elasticsearch',
+    'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'jenkins', 'git', 'github', 'gitlab',
+    'machine learning', 'ai', 'data science', 'pandas', 'numpy', 'tensorflow', 'pytorch',
+    'html', 'css', 'bootstrap', 'sass', 'webpack', 'gulp',
+    'agile', 'scrum', 'kanban', 'devops', 'ci/cd', 'microservices',
+    'excel', 'power bi', 'tableau', 'salesforce', 'marketing', 'finance', 'accounting',
+    'project management', 'leadership', 'communication', 'analytics', 'strategy'
+)
+
+EXPERIENCE_PATTERNS = (
+    _Matcher(r'(\d+)\+?\s*years?\s*(?:of\s*)?experience'),
+    _Matcher(r'(\d+)\+?\s*years?\s*(?:in\s*)?(?:the\s*)?field'),
+    _Matcher(r'(\d+)\s*to\s*(\d+)\s*years?\s*experience'),
+)
+
+DEGREE_PATTERNS = (
+    _Matcher(r'(bachelor|master|phd|b\.s\.|m\.s\.|ph\.d\.|b\.a\.|m\.a\.)\s*(?:in\s*)?([a-z\s]+)'),
+    _Matcher(r'(computer science|engineering|mathematics|physics|business|economics)'),
+)
+
+# Every certification pattern requires "certifie", so texts without it are skipped
+CERT_PATTERNS = (
+    _Matcher(r'(aws|azure|gcp|google cloud|amazon web services)\s*certified'),
+    _Matcher(r'(pmp|cissp|cisa|cism|itil|agile|scrum)\s*certified?'),
+    _Matcher(r'(microsoft|oracle|cisco|comptia)\s*certified?'),
+)
 
 
 @dataclass
@@ -71,9 +130,22 @@ class ScraperConfig:
 
 class LinkedInJobsScraper:
     def __init__(self):
-        self.session = self._setup_session()
+        self._session: Optional["requests.Session"] = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._setup_session()
+        return self._session
+
+    def _setup_session(self) -> "requests.Session":
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util import Retry
 
-    def _setup_session(self) -> requests.Session:
         session = requests.Session()
         retries = Retry(
             total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]
@@ -81,6 +153,10 @@ class LinkedInJobsScraper:
         session.mount("https://", HTTPAdapter(max_retries=retries))
         return session
 
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+
     def _build_search_url(self, keywords: str, location: str, start: int = 0) -> str:
         params = {
             "keywords": keywords,
@@ -92,7 +168,7 @@ class LinkedInJobsScraper:
     def _clean_job_url(self, url: str) -> str:
         return url.split("?")[0] if "?" in url else url
 
-    def _extract_job_data(self, job_card: BeautifulSoup) -> Optional[JobData]:
+    def _extract_job_data(self, job_card: "BeautifulSoup") -> Optional[JobData]:
         try:
             title = job_card.find("h3", class_="base-search-card__title").text.strip()
             company = job_card.find(
@@ -118,14 +194,22 @@ class LinkedInJobsScraper:
             print(f"Failed to extract job data: {str(e)}")
             return None
 
-    def _fetch_job_page(self, url: str) -> BeautifulSoup:
+    def _fetch_job_page(self, url: str) -> "BeautifulSoup":
+        import requests
+        from bs4 import BeautifulSoup
+
         try:
-            response = self.session.get(url, headers=ScraperConfig.HEADERS)
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f"Failed to fetch data: Status code {response.status_code}"
-                )
-            return BeautifulSoup(response.text, "html.parser")
+            with stage("html_fetch"), span("linkedin.fetch_job_page", kind="client", **{
+                "http.request.method": "GET", "url.full": url, "server.address": "www.linkedin.com",
+            }) as call:
+                response = self.session.get(url, headers=ScraperConfig.HEADERS)
+                set_http_response(call, response)
+                if response.status_code != 200:
+                    raise RuntimeError(
+                        f"Failed to fetch data: Status code {response.status_code}"
+                    )
+            with stage("html_parse"):
+                return BeautifulSoup(response.text, "html.parser")
         except requests.RequestException as e:
             raise RuntimeError(f"Request failed: {str(e)}")
 
@@ -136,24 +220,29 @@ class LinkedInJobsScraper:
         start = 0
 
         while len(all_jobs) < max_jobs:
+            # Nobody waits for the result any more: stop before fetching another page
+            raise_if_cancelled()
             try:
                 url = self._build_search_url(keywords, location, start)
                 soup = self._fetch_job_page(url)
-                job_cards = soup.find_all("div", class_="base-card")
-
-                if not job_cards:
-                    break
-                for card in job_cards:
-                    job_data = self._extract_job_data(card)
-                    if job_data:
-                        all_jobs.append(job_data)
-                        if len(all_jobs) >= max_jobs:
-                            break
+                with stage("html_parse"):
+                    job_cards = soup.find_all("div", class_="base-card")
+
+                    if not job_cards:
+                        break
+                    for card in job_cards:
+                        job_data = self._extract_job_data(card)
+                        if job_data:
+                            all_jobs.append(job_data)
+                            if len(all_jobs) >= max_jobs:
+                                break
                 print(f"Scraped {len(all_jobs)} jobs...")
                 start += ScraperConfig.JOBS_PER_PAGE
-                time.sleep(
+                cancellable_sleep(
                     random.uniform(ScraperConfig.MIN_DELAY, ScraperConfig.MAX_DELAY)
                 )
+            except Cancelled:
+                raise
             except Exception as e:
                 print(f"Scraping error: {str(e)}")
                 break
@@ -172,29 +261,15 @@ class LinkedInJobsScraper:
 class JobMatcher:
     def __init__(self):
         self.scraper = LinkedInJobsScraper()
+
+    def close(self) -> None:
+        self.scraper.close()
     
-    def extract_skills_from_text(self, text: str) -> List[str]:
+    def extract_skills_from_text(self, text: str, text_lower: Optional[str] = None) -> List[str]:
         """Extract skills from resume text"""
-        # Common technical skills
-        skill_keywords = [
-            'python', 'javascript', 'java', 'c++', 'c#', 'php', 'ruby', 'go', 'rust', 'swift', 'kotlin',
-            'react', 'angular', 'vue', 'node.js', 'django', 'flask', 'spring', 'express', 'laravel',
-            'sql', 'mysql', 'postgresql', 'mongodb', 'redis', 'elasticsearch',
-            'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'jenkins', 'git', 'github', 'gitlab',
-            'machine learning', 'ai', 'data science', 'pandas', 'numpy', 'tensorflow', 'pytorch',
-            'html', 'css', 'bootstrap', 'sass', 'webpack', 'gulp',
-            'agile', 'scrum', 'kanban', 'devops', 'ci/cd', 'microservices',
-            'excel', 'power bi', 'tableau', 'salesforce', 'marketing', 'finance', 'accounting',
-            'project management', 'leadership', 'communication', 'analytics', 'strategy'
-        ]
-        
-        text_lower = text.lower()
-        found_skills = []
-        for skill in skill_keywords:
-            if skill in text_lower:
-                found_skills.append(skill)
-        
-        return list(set(found_skills))
+        if text_lower is None:
+            text_lower = text.lower()
+        return list({skill for skill in SKILL_KEYWORDS if skill in text_lower})
     
     def determine_job_categories(self, skills: List[str], experience_years: int, education: List[str]) -> List[str]:
         """Determine job categories based on skills and experience"""
@@ -261,17 +336,20 @@ class JobMatcher:
     
     def analyze_cv(self, resume_text: str) -> Dict[str, Any]:
         """Analyze CV and extract all relevant information"""
+        # Lowercase once; every extractor matches against the lowercased text
+        text_lower = resume_text.lower()
+
         # Extract skills
-        skills = self.extract_skills_from_text(resume_text)
+        skills = self.extract_skills_from_text(resume_text, text_lower)
         
         # Extract experience years
-        experience_years = self._extract_experience_years(resume_text)
+        experience_years = self._extract_experience_years(resume_text, text_lower)
         
         # Extract education
-        education = self._extract_education(resume_text)
+        education = self._extract_education(resume_text, text_lower)
         
         # Extract certifications
-        certifications = self._extract_certifications(resume_text)
+        certifications = self._extract_certifications(resume_text, text_lower)
         
         # Determine job categories
         categories = self.determine_job_categories(skills, experience_years, education)
@@ -288,57 +366,53 @@ class JobMatcher:
             "job_keywords": job_keywords,
             "suggested_roles": self._get_suggested_roles(categories, experience_years)
         }
+
+    def analyze_cv_batch(self, resume_texts: List[str]) -> List[Dict[str, Any]]:
+        """Analyze many CVs; a failing CV is reported in its own entry instead of failing the batch"""
+        results = []
+        for resume_text in resume_texts:
+            try:
+                results.append({"success": True, "analysis": self.analyze_cv(resume_text)})
+            except Exception as e:
+                results.append({"success": False, "error": str(e)})
+        return results
     
-    def _extract_experience_years(self, text: str) -> int:
+    def _extract_experience_years(self, text: str, text_lower: Optional[str] = None) -> int:
         """Extract years of experience from resume text"""
-        patterns = [
-            r'(\d+)\+?\s*years?\s*(?:of\s*)?experience',
-            r'(\d+)\+?\s*years?\s*(?:in\s*)?(?:the\s*)?field',
-            r'(\d+)\s*to\s*(\d+)\s*years?\s*experience'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                if isinstance(matches[0], tuple):
-                    return int(matches[0][0])
-                else:
-                    return int(matches[0])
+        if text_lower is None:
+            text_lower = text.lower()
+        if "year" in text_lower:
+            for pattern in EXPERIENCE_PATTERNS:
+                match = pattern.search(text, text_lower)
+                if match:
+                    return int(match.group(1))
         
         return 2  # Default to 2 years if not found
     
-    def _extract_education(self, text: str) -> List[str]:
+    def _extract_education(self, text: str, text_lower: Optional[str] = None) -> List[str]:
         """Extract education information from resume text"""
+        if text_lower is None:
+            text_lower = text.lower()
         education = []
         
-        degree_patterns = [
-            r'(Bachelor|Master|PhD|B\.S\.|M\.S\.|Ph\.D\.|B\.A\.|M\.A\.)\s*(?:in\s*)?([A-Za-z\s]+)',
-            r'(Computer Science|Engineering|Mathematics|Physics|Business|Economics)',
-        ]
-        
-        for pattern in degree_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    education.append(f"{match[0]} {match[1]}")
-                else:
-                    education.append(match)
+        for pattern in DEGREE_PATTERNS:
+            for match in pattern.finditer(text, text_lower):
+                # Slice the original text so degrees keep their casing
+                groups = [text[match.start(i):match.end(i)] for i in range(1, match.re.groups + 1)]
+                education.append(f"{groups[0]} {groups[1]}" if len(groups) > 1 else groups[0])
         
         return list(set(education)) if education else ["Bachelor's Degree"]
     
-    def _extract_certifications(self, text: str) -> List[str]:
+    def _extract_certifications(self, text: str, text_lower: Optional[str] = None) -> List[str]:
         """Extract certifications from resume text"""
+        if text_lower is None:
+            text_lower = text.lower()
+        if "certifie" not in text_lower:
+            return []
         certifications = []
         
-        cert_patterns = [
-            r'(AWS|Azure|GCP|Google Cloud|Amazon Web Services)\s*[Cc]ertified',
-            r'(PMP|CISSP|CISA|CISM|ITIL|Agile|Scrum)\s*[Cc]ertified?',
-            r'(Microsoft|Oracle|Cisco|CompTIA)\s*[Cc]ertified?',
-        ]
-        
-        for pattern in cert_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            certifications.extend(matches)
+        for pattern in CERT_PATTERNS:
+            certifications.extend(text[match.start(1):match.end(1)] for match in pattern.finditer(text, text_lower))
         
         return list(set(certifications))
     
@@ -369,6 +443,15 @@ class JobMatcher:
         return suggested_roles[:5]  # Return top 5 roles
 
 
+def analyze_cv_chunk(resume_texts: List[str]) -> List[Dict[str, Any]]:
+    """Entry point for analyzing a slice of a CV batch in a worker process."""
+    matcher = JobMatcher()
+    try:
+        return matcher.analyze_cv_batch(resume_texts)
+    finally:
+        matcher.close()
+
+
 def main():
     params = {
         "keywords": "Data Scientist OR Data Analyst OR Machine Learning Engineer",
@@ -0,0 +1,229 @@
+"""Background jobs for long-running generations, persisted in a local SQLite file.
+
+A submit endpoint stores a queued job and hands it to the "jobs" executor; the
+client polls the status endpoint and fetches the result when it is done.
+Finished jobs expire after JOB_TTL_SECONDS, and a job still queued or running
+JOB_UNFINISHED_TTL_SECONDS after it was submitted expires too, so rows a
+worker never finished cannot pile up. A job's state only moves forward
+(queued, running, then done or failed): a late complete() or fail() never
+overwrites a finished job. With several worker processes the
+store is shared, so the queue position counts jobs queued by every worker.
+Each worker holds at most JOB_MAX_QUEUED jobs (with their uploads) waiting
+for a thread; further submits get 429 with a Retry-After estimate, like
+admission control.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import Any, Callable, Dict, Optional, Tuple
+from dotenv import load_dotenv
+from admission import ADMISSION_REJECTED, Overloaded
+from executors import POOL_SIZES, get_pool
+
+load_dotenv()
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.db")
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS") or 3600)
+JOB_UNFINISHED_TTL_SECONDS = int(os.getenv("JOB_UNFINISHED_TTL_SECONDS") or 86400)
+# Jobs waiting for a "jobs" thread in this worker; each keeps its input in memory
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED") or 32)
+
+# A job returns (media_type, body) so PDFs and JSON documents can be stored alike
+JobResult = Tuple[str, bytes]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner_pid INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL,
+    error TEXT,
+    media_type TEXT,
+    result BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_seq ON jobs (status, seq);
+CREATE INDEX IF NOT EXISTS idx_jobs_expires_at ON jobs (expires_at);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # Signal 0 is not a probe on Windows; leave those jobs to expiry
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """SQLite-backed job records. Every method blocks on the database; the routes call them through run_cpu."""
+
+    def __init__(
+        self, path: str = JOB_DB_PATH, ttl_seconds: int = JOB_TTL_SECONDS, unfinished_ttl_seconds: int = JOB_UNFINISHED_TTL_SECONDS
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.unfinished_ttl_seconds = unfinished_ttl_seconds
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, kind: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, owner_pid, created_at, expires_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, os.getpid(), now, now + self.unfinished_ttl_seconds),
+            )
+        return job_id
+
+    def mark_running(self, job_id: str) -> bool:
+        """Move a queued job to running; False if it is no longer queued (failed or expired meanwhile)."""
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'", (time.time(), job_id)
+            ).rowcount == 1
+
+    def complete(self, job_id: str, media_type: str, body: bytes) -> bool:
+        """Store the result of a running job; False if it is no longer running."""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, expires_at = ?, media_type = ?, result = ? "
+                "WHERE id = ? AND status = 'running'",
+                (now, now + self.ttl_seconds, media_type, sqlite3.Binary(body), job_id),
+            ).rowcount == 1
+
+    def fail(self, job_id: str, error: str) -> bool:
+        """Fail a queued or running job; False if it already finished."""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, expires_at = ?, error = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (now, now + self.ttl_seconds, error, job_id),
+            ).rowcount == 1
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT seq, id, kind, status, created_at, started_at, finished_at, expires_at, error FROM jobs "
+                "WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            status = dict(row)
+            seq = status.pop("seq")
+            status["job_id"] = status.pop("id")
+            status["queue_position"] = None
+            if status["status"] == "queued":
+                ahead = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND seq < ?", (seq,)).fetchone()[0]
+                status["queue_position"] = ahead + 1
+            return status
+
+    def result(self, job_id: str) -> Optional[JobResult]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT media_type, result FROM jobs WHERE id = ? AND status = 'done' AND expires_at > ?",
+                (job_id, time.time()),
+            ).fetchone()
+        return (row["media_type"], bytes(row["result"])) if row else None
+
+    def purge_expired(self) -> int:
+        with closing(self._connect()) as conn, conn:
+            now = time.time()
+            # Rows created before unfinished jobs had an expiry are bounded by their age
+            return conn.execute(
+                "DELETE FROM jobs WHERE expires_at <= ? OR (expires_at IS NULL AND created_at <= ?)",
+                (now, now - self.unfinished_ttl_seconds),
+            ).rowcount
+
+    def fail_orphaned(self, only_pid: Optional[int] = None) -> int:
+        """Fail unfinished jobs whose worker process is gone (or, with `only_pid`, that worker's jobs)."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT id, owner_pid FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        orphaned = [
+            row["id"] for row in rows
+            if (row["owner_pid"] == only_pid if only_pid is not None else not _pid_alive(row["owner_pid"]))
+        ]
+        return sum(self.fail(job_id, "Job interrupted: the worker running it stopped") for job_id in orphaned)
+
+
+class JobManager:
+    """Submits jobs to the bounded "jobs" executor and records their outcome in the store."""
+
+    def __init__(self, store: JobStore, max_queued: int = JOB_MAX_QUEUED) -> None:
+        self.store = store
+        self.max_queued = max(0, max_queued)
+        self.queued = 0
+        self._lock = threading.Lock()
+        # Moving average of a job's run time, for Retry-After
+        self._avg_run = 30.0
+        self.store.fail_orphaned()
+        self.store.purge_expired()
+
+    def retry_after(self) -> int:
+        backlog = (self.queued + 1) / max(1, POOL_SIZES["jobs"])
+        return max(1, int(math.ceil(self._avg_run * backlog)))
+
+    def submit(self, kind: str, func: Callable[..., JobResult], *args: Any) -> Dict[str, Any]:
+        """Queue func(*args) as a job and return its status; blocks on SQLite, so call it from an executor."""
+        with self._lock:
+            if self.queued >= self.max_queued:
+                ADMISSION_REJECTED.inc(limiter="jobs", reason="queue_full")
+                raise Overloaded("jobs", "queue_full", 429, self.retry_after())
+            self.queued += 1
+        try:
+            self.store.purge_expired()
+            job_id = self.store.create(kind)
+            get_pool("jobs").submit(self._run, job_id, func, args)
+        except BaseException:
+            self._dequeued()
+            raise
+        return self.store.status(job_id)
+
+    def _dequeued(self) -> None:
+        with self._lock:
+            self.queued -= 1
+
+    def _run(self, job_id: str, func: Callable[..., JobResult], args: Tuple[Any, ...]) -> None:
+        self._dequeued()
+        if not self.store.mark_running(job_id):
+            # Failed by close() or expired while it waited for a thread
+            return
+        start = time.perf_counter()
+        try:
+            media_type, body = func(*args)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.store.fail(job_id, str(e))
+            return
+        finally:
+            self._avg_run = 0.8 * self._avg_run + 0.2 * (time.perf_counter() - start)
+        self.store.complete(job_id, media_type, body)
+
+    def close(self) -> None:
+        # Queued work of this process is dropped with the executor at shutdown
+        self.store.fail_orphaned(only_pid=os.getpid())
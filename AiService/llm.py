@@ -0,0 +1,318 @@
+"""Shared Ollama client for every module that calls the LLM.
+
+get_llm() returns one OllamaLLM per model (and request timeout) and process.
+Its HTTP client keeps a pool of keep-alive connections to Ollama
+(OLLAMA_MAX_CONNECTIONS, OLLAMA_KEEPALIVE_CONNECTIONS) with the timeouts
+configured here, and generation
+options (temperature, num_predict, num_ctx, ...) can be set per call:
+get_llm(temperature=0.2) binds them to the shared client instead of creating
+a new one.
+
+invoke_chain/stream_chain retry calls that failed before Ollama produced any
+output (connection refused or dropped, 429/502/503/504), OLLAMA_RETRIES times
+with exponential backoff.
+"""
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional, Tuple, Union
+from dotenv import load_dotenv
+from cancellation import cancellable_sleep, current_cancel, raise_if_cancelled
+from tracing import span
+import llm_cache
+
+if TYPE_CHECKING:
+    from langchain_ollama import OllamaEmbeddings, OllamaLLM
+
+load_dotenv()
+
+OLLAMA_URL = os.getenv("OLLAMA_URL")
+DEFAULT_MODEL = os.getenv("OLLAMA_MODEL") or "llama3.1"
+# How long Ollama keeps the model loaded after each request (Ollama's own default is 5m)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE") or "30m"
+
+# HTTP client: generations can take minutes, connecting should not
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT") or 300)
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT") or 5)
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS") or 32)
+OLLAMA_KEEPALIVE_CONNECTIONS = int(os.getenv("OLLAMA_KEEPALIVE_CONNECTIONS") or 16)
+OLLAMA_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY") or 60)
+OLLAMA_RETRIES = int(os.getenv("OLLAMA_RETRIES") or 2)
+OLLAMA_RETRY_BACKOFF = float(os.getenv("OLLAMA_RETRY_BACKOFF") or 0.5)
+
+# Generation options accepted per call, with their type
+OPTION_TYPES: Dict[str, Callable[[str], Any]] = {
+    "temperature": float,
+    "num_predict": int,
+    "num_ctx": int,
+    "top_p": float,
+    "top_k": int,
+    "repeat_penalty": float,
+    "seed": int,
+}
+# Service-wide defaults, e.g. OLLAMA_NUM_CTX=8192 (unset = Ollama's model defaults)
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    name: cast(os.environ[f"OLLAMA_{name.upper()}"])
+    for name, cast in OPTION_TYPES.items()
+    if os.getenv(f"OLLAMA_{name.upper()}")
+}
+
+_RETRY_STATUSES = {429, 502, 503, 504}
+
+_models: Dict[Tuple[str, Optional[float]], "OllamaLLM"] = {}
+_embeddings: Dict[Tuple[str, Optional[float]], "OllamaEmbeddings"] = {}
+_models_lock = threading.Lock()
+
+
+def _client_kwargs(timeout: Optional[float] = None) -> Dict[str, Any]:
+    import httpx
+
+    return {
+        "timeout": httpx.Timeout(timeout or OLLAMA_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=OLLAMA_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def get_llm(
+    model: str = DEFAULT_MODEL,
+    format: Union[str, Dict[str, Any], None] = None,
+    timeout: Optional[float] = None,
+    **options: Any,
+) -> Any:
+    """Return the process-wide Ollama client for `model`, creating it on first use.
+
+    Keyword arguments are generation options for the calls made through the
+    returned runnable; they are merged over DEFAULT_OPTIONS and share the
+    model's client. `format` constrains the output to JSON ("json") or to a
+    JSON schema (a dict). `timeout` replaces OLLAMA_TIMEOUT; each distinct
+    timeout gets its own client. langchain_ollama is only imported here, so
+    importing the service stays cheap until the first LLM call.
+    """
+    unknown = set(options) - set(OPTION_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown Ollama options: {', '.join(sorted(unknown))}")
+    key = (model, timeout)
+    llm = _models.get(key)
+    if llm is None:
+        with _models_lock:
+            llm = _models.get(key)
+            if llm is None:
+                from langchain_ollama import OllamaLLM
+
+                llm = OllamaLLM(
+                    model=model,
+                    base_url=OLLAMA_URL,
+                    keep_alive=OLLAMA_KEEP_ALIVE,
+                    client_kwargs=_client_kwargs(timeout),
+                    **DEFAULT_OPTIONS,
+                )
+                _models[key] = llm
+    if format:
+        llm = llm.bind(format=format)
+    if options:
+        # Bound options replace the instance's, so the defaults are merged in
+        return llm.bind(options={**DEFAULT_OPTIONS, **options})
+    return llm
+
+
+_token_counter_class = None
+
+
+def get_embeddings(model: str, timeout: Optional[float] = None) -> "OllamaEmbeddings":
+    """Return the process-wide Ollama embeddings client for `model`, creating it on first use.
+
+    It uses the same connection limits as the generation clients; `timeout`
+    replaces OLLAMA_TIMEOUT.
+    """
+    key = (model, timeout)
+    embeddings = _embeddings.get(key)
+    if embeddings is None:
+        with _models_lock:
+            embeddings = _embeddings.get(key)
+            if embeddings is None:
+                from langchain_ollama import OllamaEmbeddings
+
+                embeddings = OllamaEmbeddings(model=model, base_url=OLLAMA_URL, client_kwargs=_client_kwargs(timeout))
+                _embeddings[key] = embeddings
+    return embeddings
+
+
+def _token_counter(call: Any) -> Any:
+    """LangChain callback copying Ollama's token counts onto the span `call`."""
+    global _token_counter_class
+    if _token_counter_class is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class TokenCounter(BaseCallbackHandler):
+            def __init__(self, call: Any) -> None:
+                self.call = call
+
+            def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+                generations = response.generations[0] if response.generations else []
+                info = (generations[0].generation_info or {}) if generations else {}
+                self.call.set_attribute("gen_ai.usage.input_tokens", info.get("prompt_eval_count"))
+                self.call.set_attribute("gen_ai.usage.output_tokens", info.get("eval_count"))
+
+        _token_counter_class = TokenCounter
+    return _token_counter_class(call)
+
+
+def _unbound(llm: Any) -> Any:
+    # get_llm(format, **options) returns RunnableBindings around the model
+    while hasattr(llm, "bound"):
+        llm = llm.bound
+    return llm
+
+
+def _bindings(llm: Any) -> Dict[str, Any]:
+    """Keyword arguments bound to the model by get_llm, innermost first."""
+    kwargs: Dict[str, Any] = {}
+    while hasattr(llm, "bound"):
+        kwargs = {**getattr(llm, "kwargs", {}), **kwargs}
+        llm = llm.bound
+    return kwargs
+
+
+def _model_name(chain: Any) -> Optional[str]:
+    return getattr(_unbound(getattr(chain, "last", chain)), "model", None)
+
+
+def _should_retry(error: Exception, attempt: int) -> bool:
+    if attempt >= OLLAMA_RETRIES:
+        return False
+    if getattr(error, "status_code", None) in _RETRY_STATUSES:
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    # Failures before the request reached Ollama or before it answered
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError))
+
+
+def _backoff(call: Any, attempt: int, error: Exception) -> None:
+    delay = OLLAMA_RETRY_BACKOFF * (2 ** (attempt - 1))
+    print(f"Ollama call failed ({type(error).__name__}: {error}), retry {attempt}/{OLLAMA_RETRIES} in {delay:.1f}s")
+    call.set_attribute("gen_ai.retries", attempt)
+    cancellable_sleep(delay)
+
+
+def _cacheable(chain: Any, variables: Dict[str, Any]) -> Optional[Tuple[str, str, Any, str]]:
+    """(cache key, model name, model runnable, rendered prompt) for a `prompt | llm` chain, else None."""
+    # Only deterministic generations are valid to replay
+    if not llm_cache.LLM_CACHE_DETERMINISTIC or llm_cache.get_cache() is None:
+        return None
+    steps = getattr(chain, "steps", None)
+    if not steps or len(steps) != 2:
+        return None
+    prompt, llm = steps
+    bindings = _bindings(llm)
+    model = getattr(_unbound(llm), "model", None)
+    if model is None:
+        return None
+    options = dict(bindings.get("options") or DEFAULT_OPTIONS)
+    output_format = bindings.get("format")
+    options.update(temperature=0.0, seed=llm_cache.LLM_CACHE_SEED)
+    # Rebound on the same client, which keeps the chain's timeout
+    llm = _unbound(llm).bind(**{**bindings, "options": options})
+    text = prompt.invoke(variables).to_string()
+    # Chains from the prompt registry are named after their versioned prompt id
+    key = llm_cache.cache_key(model, {**options, "format": output_format}, text, getattr(chain, "name", None))
+    return key, model, llm, text
+
+
+def invoke_chain(chain: Any, variables: Dict[str, Any], accept: Optional[Callable[[str], bool]] = None) -> Any:
+    """chain.invoke(variables), traced with the model and token counts, retrying transient failures.
+
+    Within a cancellable request the chain is streamed instead, so that a
+    cancellation closes the Ollama stream and stops the generation. Results
+    of `prompt | llm` chains go through the LLM response cache (llm_cache);
+    with `accept`, only text it returns True for is cached, and a cached
+    entry it rejects is discarded and generated again.
+    """
+    cacheable = _cacheable(chain, variables)
+    if cacheable is None:
+        return _invoke(chain, variables)
+    key, model, llm, prompt = cacheable
+    cached = llm_cache.lookup(key)
+    if cached is not None:
+        if accept is None or accept(cached):
+            return cached
+        llm_cache.discard(key)
+    result = _invoke(llm, prompt)
+    if isinstance(result, str) and (accept is None or accept(result)):
+        llm_cache.store(key, model, result)
+    return result
+
+
+def _invoke(chain: Any, variables: Any) -> Any:
+    cancel = current_cancel()
+    if cancel is not None:
+        result = "".join(stream_chain(chain, variables, cancel))
+        raise_if_cancelled()
+        return result
+    with span("llm.invoke", kind="client", **{"gen_ai.system": "ollama", "gen_ai.request.model": _model_name(chain)}) as call:
+        config = {"callbacks": [_token_counter(call)]} if call.recording else None
+        attempt = 0
+        while True:
+            try:
+                result = chain.invoke(variables, config=config)
+                break
+            except Exception as e:
+                if not _should_retry(e, attempt):
+                    raise
+                attempt += 1
+                _backoff(call, attempt, e)
+        if isinstance(result, str):
+            call.set_attribute("gen_ai.response.chars", len(result))
+        return result
+
+
+def stream_chain(chain: Any, variables: Dict[str, Any], cancel: Optional[threading.Event] = None) -> Iterator[str]:
+    """Yield the chain's output chunk by chunk as Ollama generates it.
+
+    Once `cancel` (by default the request's cancel event) is set the underlying
+    HTTP stream is closed, which makes Ollama stop generating. A failure is
+    only retried while nothing has been yielded yet.
+    """
+    if cancel is None:
+        cancel = current_cancel()
+    with span("llm.stream", kind="client", **{"gen_ai.system": "ollama", "gen_ai.request.model": _model_name(chain)}) as call:
+        config = {"callbacks": [_token_counter(call)]} if call.recording else None
+        chunks = 0
+        attempt = 0
+        try:
+            while True:
+                stream = chain.stream(variables, config=config)
+                try:
+                    for chunk in stream:
+                        if cancel is not None and cancel.is_set():
+                            call.set_attribute("gen_ai.cancelled", True)
+                            return
+                        chunks += 1
+                        yield chunk
+                    return
+                except Exception as e:
+                    if chunks or not _should_retry(e, attempt):
+                        raise
+                    attempt += 1
+                    _backoff(call, attempt, e)
+                finally:
+                    stream.close()
+        finally:
+            call.set_attribute("gen_ai.response.chunks", chunks)
+
+
+def _reset_after_fork() -> None:
+    # HTTP clients must not be shared across fork(); children build their own
+    global _models_lock
+    _models.clear()
+    _embeddings.clear()
+    _models_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,259 @@
+"""Content-addressed cache of LLM generations.
+
+Generations are keyed by model + generation options + prompt id + the
+rendered prompt, so the same resume or job description is only generated
+once. Lookups go to an in-process LRU first and then to a zlib-compressed
+SQLite file shared by the workers on this host. The file is bounded by
+LLM_CACHE_MAX_BYTES (least recently used entries are evicted) and entries
+expire after LLM_CACHE_TTL_SECONDS.
+
+A request sent with `X-LLM-Cache: bypass` (or `Cache-Control: no-cache`)
+skips the lookup and stores the fresh generation; the outcome is reported in
+the `X-LLM-Cache` response header. Cached calls decode greedily with a fixed
+seed (LLM_CACHE_DETERMINISTIC, on by default), so a cached answer is the
+answer the model would give again; with LLM_CACHE_DETERMINISTIC=0 sampled
+generations are not cached at all.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from metrics import Counter
+
+load_dotenv()
+
+LLM_CACHE_ENABLED = (os.getenv("LLM_CACHE_ENABLED") or "1").lower() not in ("0", "false", "no")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.db")
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS") or 256)
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES") or 256 * 1024 * 1024)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS") or 7 * 24 * 3600)
+LLM_CACHE_DETERMINISTIC = (os.getenv("LLM_CACHE_DETERMINISTIC") or "1").lower() not in ("0", "false", "no")
+LLM_CACHE_SEED = int(os.getenv("LLM_CACHE_SEED") or 42)
+# The file size is checked every this many stores
+_EVICT_EVERY = 32
+
+CACHE_LOOKUPS = Counter("aiservice_llm_cache_total", "LLM cache lookups by outcome (memory_hit, disk_hit, miss, bypass).", ["result"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache (accessed_at);
+"""
+
+# Per request: whether to skip lookups, and the outcomes for the response header
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+_outcomes: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("llm_cache_outcomes", default=None)
+
+
+def cache_key(model: str, options: Dict[str, Any], prompt: str, prompt_id: Optional[str] = None) -> str:
+    payload = json.dumps([model, options, prompt_id, prompt], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        memory_items: int = LLM_CACHE_MEMORY_ITEMS,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.path = path
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stores = 0
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str) -> Tuple[Optional[str], str]:
+        """Cached text for `key` and the tier it came from ("memory", "disk" or "miss")."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    return entry[1], "memory"
+                del self._memory[key]
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+            if row is None:
+                return None, "miss"
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        text = zlib.decompress(row[0]).decode("utf-8")
+        self._remember(key, row[1], text)
+        return text, "disk"
+
+    def put(self, key: str, model: str, text: str) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        self._remember(key, expires_at, text)
+        value = zlib.compress(text.encode("utf-8"), 6)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, value, size, created_at, accessed_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, sqlite3.Binary(value), len(value), now, now, expires_at),
+            )
+        with self._lock:
+            self._stores += 1
+            evict = self._stores % _EVICT_EVERY == 1
+        if evict:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def _remember(self, key: str, expires_at: float, text: str) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, text)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used ones until the file is under 90% of max_bytes."""
+        with closing(self._connect()) as conn, conn:
+            removed = conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            excess = total - int(self.max_bytes * 0.9)
+            if total <= self.max_bytes or excess <= 0:
+                return removed
+            keys = []
+            for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at"):
+                keys.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", keys)
+        return removed + len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        with self._lock:
+            memory_entries = len(self._memory)
+        return {"memory_entries": memory_entries, "disk_entries": entries, "disk_bytes": size, "max_bytes": self.max_bytes}
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[LLMCache]:
+    """The process-wide cache, or None when caching is disabled."""
+    global _cache, LLM_CACHE_ENABLED
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = LLMCache()
+                except sqlite3.Error as e:
+                    print(f"LLM cache disabled, cannot open {LLM_CACHE_PATH}: {e}")
+                    LLM_CACHE_ENABLED = False
+                    return None
+    return _cache
+
+
+def _record(outcome: str) -> None:
+    CACHE_LOOKUPS.inc(result=outcome)
+    outcomes = _outcomes.get()
+    if outcomes is not None:
+        outcomes.append(outcome)
+
+
+def bypassed() -> bool:
+    """Whether the current request asked for fresh generations."""
+    return _bypass.get()
+
+
+def lookup(key: str) -> Optional[str]:
+    cache = get_cache()
+    if cache is None:
+        return None
+    if _bypass.get():
+        _record("bypass")
+        return None
+    try:
+        text, tier = cache.get(key)
+    except sqlite3.Error as e:
+        print(f"LLM cache lookup failed: {e}")
+        return None
+    _record(f"{tier}_hit" if text is not None else "miss")
+    return text
+
+
+def store(key: str, model: str, text: str) -> None:
+    cache = get_cache()
+    if cache is None:
+        return
+    try:
+        cache.put(key, model, text)
+    except sqlite3.Error as e:
+        print(f"LLM cache store failed: {e}")
+
+
+def discard(key: str) -> None:
+    """Drop an entry the caller found unusable, so it is not replayed."""
+    cache = get_cache()
+    if cache is None:
+        return
+    try:
+        cache.delete(key)
+    except sqlite3.Error as e:
+        print(f"LLM cache discard failed: {e}")
+
+
+class LLMCacheMiddleware:
+    """ASGI middleware applying the per-request bypass header and reporting cache outcomes."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not LLM_CACHE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        bypass = headers.get(b"x-llm-cache", b"").lower() == b"bypass" or b"no-cache" in headers.get(b"cache-control", b"").lower()
+        outcomes: List[str] = []
+        tokens = (_bypass.set(bypass), _outcomes.set(outcomes))
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start" and outcomes:
+                # "hit" only if every generation of the request came from the cache
+                summary = "bypass" if bypass else ("hit" if all(o.endswith("_hit") for o in outcomes) else "miss")
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-llm-cache", summary.encode("ascii"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _outcomes.reset(tokens[1])
+            _bypass.reset(tokens[0])
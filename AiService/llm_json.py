@@ -0,0 +1,216 @@
+"""Recovering JSON from model output.
+
+Even with Ollama's structured output the text can arrive wrapped in a
+preamble or a Markdown fence, or cut off by num_predict. parse_llm_json()
+tries a plain json.loads first, then looks for the expected array/object
+inside the text, and finally repairs a truncated value by cutting it back to
+the last complete element and closing the open brackets; trailing commas
+before a closing bracket are dropped. A `shape` predicate rejects values of
+the right type but the wrong content (`[8]` for a question list), and the
+search moves on to the next candidate. Every attempt is counted in
+aiservice_llm_json_parse_total{prompt,result}, so the parse failure rate of
+each prompt is visible.
+"""
+import json
+from typing import Any, Callable, List, Optional, Tuple, Type
+from metrics import Counter
+
+JSON_PARSE = Counter(
+    "aiservice_llm_json_parse_total",
+    "Parses of JSON model output by result (ok, extracted, repaired, failed).",
+    ["prompt", "result"],
+)
+
+_CLOSERS = {"[": "]", "{": "}"}
+
+
+class LLMJSONError(ValueError):
+    """The model output contains no usable JSON value of the expected type."""
+
+
+class JSONScanner:
+    """Incremental scan of JSON text, tracking where it could be cut and closed.
+
+    feed() can be called with each streamed chunk. cut_points are (end, open
+    brackets) pairs after which the text so far is a complete prefix: right
+    after a closed element or a string inside an array, or before a comma
+    separating two elements.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.stack: List[str] = []
+        self.cut_points: List[Tuple[int, Tuple[str, ...]]] = []
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> None:
+        offset = len(self.text)
+        self.text += chunk
+        if self.complete:
+            return
+        for i, char in enumerate(chunk, offset):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self.stack and self.stack[-1] == "[":
+                        # A whole string element (inside an object it may be a key)
+                        self.cut_points.append((i + 1, tuple(self.stack)))
+            elif char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self.stack.append(char)
+            elif char in "]}":
+                if not self.stack:
+                    return
+                self.stack.pop()
+                self.cut_points.append((i + 1, tuple(self.stack)))
+                if not self.stack:
+                    return
+            elif char == ",":
+                self.cut_points.append((i, tuple(self.stack)))
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.cut_points) and not self.cut_points[-1][1]
+
+    def repaired(self) -> Optional[Any]:
+        """The longest complete prefix with its brackets closed, or None.
+
+        Cuts between top-level elements are tried first, so a truncated array
+        keeps its whole elements rather than a partial last one.
+        """
+        for end, stack in sorted(self.cut_points, key=lambda cut: (len(cut[1]) == 1, cut[0]), reverse=True):
+            candidate = self.text[:end] + "".join(_CLOSERS[bracket] for bracket in reversed(stack))
+            try:
+                return json.loads(candidate)
+            except ValueError:
+                continue
+        return None
+
+
+def _strip_fence(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+
+def _drop_trailing_commas(text: str) -> str:
+    """Remove commas (outside strings) that directly precede a closing bracket: `[1, 2,]` -> `[1, 2]`."""
+    out: List[str] = []
+    in_string = escape = False
+    pending = None
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == ",":
+            if pending is not None:
+                out.append(pending)
+            pending = ","
+            continue
+        elif char in " \t\r\n" and pending is not None:
+            pending += char
+            continue
+        elif char in "]}" and pending is not None:
+            # Keep the whitespace, drop the comma
+            out.append(pending[1:])
+            pending = None
+        elif char == '"':
+            in_string = True
+        if pending is not None:
+            out.append(pending)
+            pending = None
+        out.append(char)
+    if pending is not None:
+        out.append(pending)
+    return "".join(out)
+
+
+def _matches(value: Any, expect: Type, shape: Optional[Callable[[Any], bool]] = None) -> Any:
+    # JSON mode tends to wrap an array in an object: {"questions": [...]}
+    if expect is list and isinstance(value, dict) and len(value) == 1:
+        inner = next(iter(value.values()))
+        if isinstance(inner, list):
+            value = inner
+    if not isinstance(value, expect) or (shape is not None and not shape(value)):
+        return None
+    return value
+
+
+def extract_json(text: str, expect: Type = dict, shape: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, str]:
+    """Return (value, how) for the first `expect` (list or dict) in `text` that satisfies `shape`.
+
+    how is "ok", "extracted" or "repaired".
+    """
+    text = _strip_fence(text or "")
+    try:
+        value = _matches(json.loads(text), expect, shape)
+        if value is not None:
+            return value, "ok"
+    except ValueError:
+        pass
+    text = _drop_trailing_commas(text)
+    opener = "[" if expect is list else "{"
+    decoder = json.JSONDecoder()
+    start = text.find(opener)
+    while start != -1:
+        try:
+            value = _matches(decoder.raw_decode(text, start)[0], expect, shape)
+            if value is not None:
+                return value, "extracted"
+        except ValueError:
+            scanner = JSONScanner()
+            scanner.feed(text[start:])
+            if not scanner.complete:
+                # Ran out of text: the value was truncated
+                value = _matches(scanner.repaired(), expect, shape)
+                if value is not None:
+                    return value, "repaired"
+        start = text.find(opener, start + 1)
+    raise LLMJSONError(f"No JSON {expect.__name__} of the expected shape found in model output")
+
+
+def list_of(item: Callable[[Any], bool]) -> Callable[[Any], bool]:
+    """Shape of a non-empty list whose every element satisfies `item`."""
+    return lambda value: bool(value) and all(item(element) for element in value)
+
+
+def has_keys(*keys: str) -> Callable[[Any], bool]:
+    """Shape of an object with every one of `keys`."""
+    return lambda value: isinstance(value, dict) and all(key in value for key in keys)
+
+
+def valid_json(expect: Type = dict, shape: Optional[Callable[[Any], bool]] = None) -> Callable[[str], bool]:
+    """Predicate for invoke_chain(accept=...): whether the text holds a usable `expect`, so unusable output is not cached."""
+
+    def accept(text: str) -> bool:
+        try:
+            extract_json(text, expect, shape)
+        except LLMJSONError:
+            return False
+        return True
+
+    return accept
+
+
+def parse_llm_json(text: str, expect: Type = dict, prompt: str = "", shape: Optional[Callable[[Any], bool]] = None) -> Any:
+    """extract_json(text, expect, shape)[0], counting the outcome for `prompt`; raises LLMJSONError."""
+    try:
+        value, how = extract_json(text, expect, shape)
+    except LLMJSONError:
+        JSON_PARSE.inc(prompt=prompt, result="failed")
+        raise
+    JSON_PARSE.inc(prompt=prompt, result=how)
+    return value
@@ -1,5 +1,41 @@
+import os
 import uvicorn
+from dotenv import load_dotenv
 from routes import app
 
+load_dotenv()
+
+HOST = os.getenv("AI_SERVICE_HOST") or "127.0.0.1"
+PORT = int(os.getenv("AI_SERVICE_PORT") or 8000)
+WORKERS = int(os.getenv("WEB_CONCURRENCY") or 1)
+
+
+def run_gunicorn() -> None:
+	"""Prefork server: the app is loaded once here and shared by the forked workers."""
+	from gunicorn.app.base import BaseApplication
+	import gunicorn_conf
+
+	class AiServiceApplication(BaseApplication):
+		def load_config(self):
+			for key in dir(gunicorn_conf):
+				if key in self.cfg.settings:
+					self.cfg.set(key, getattr(gunicorn_conf, key))
+			self.cfg.set("bind", f"{HOST}:{PORT}")
+			self.cfg.set("workers", WORKERS)
+
+		def load(self):
+			return app
+
+	AiServiceApplication().run()
+
+
 if __name__ == "__main__":
-	uvicorn.run(app, host="127.0.0.1", port=8000)
+	if WORKERS > 1:
+		try:
+			run_gunicorn()
+		except ImportError as e:
+			# No gunicorn (e.g. on Windows): uvicorn workers re-import the app instead of forking
+			print(f"WARNING: gunicorn unavailable ({e}); starting {WORKERS} uvicorn workers without preload or gc.freeze(), each with its own copy of the app")
+			uvicorn.run("routes:app", host=HOST, port=PORT, workers=WORKERS)
+	else:
+		uvicorn.run(app, host=HOST, port=PORT)
@@ -0,0 +1,231 @@
+"""In-process latency/error metrics rendered in the Prometheus text format.
+
+Each worker keeps its own series. Workers periodically dump a snapshot next to
+their heartbeat file (see health.py) and /metrics merges the snapshots of all
+live workers, so a scrape through the shared port sees the whole service.
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Endpoint (route template) of the request being served; copied into executor threads
+current_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("current_endpoint", default="none")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, Any] = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> List[Tuple[LabelValues, Any]]:
+        with self._lock:
+            return [(key, _copy(value)) for key, value in self._values.items()]
+
+
+def _copy(value: Any) -> Any:
+    return {"buckets": list(value["buckets"]), "sum": value["sum"], "count": value["count"]} if isinstance(value, dict) else value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def snapshot(self) -> Dict[str, List[List[Any]]]:
+        """JSON-serializable copy of every series, used to share metrics between workers."""
+        return {name: [[list(key), value] for key, value in metric.snapshot()] for name, metric in self._metrics.items()}
+
+    def render(self, other_snapshots: Iterable[Dict[str, List[List[Any]]]] = ()) -> str:
+        """Prometheus text exposition of this process merged with other workers' snapshots."""
+        merged: Dict[str, Dict[LabelValues, Any]] = {name: dict(metric.snapshot()) for name, metric in self._metrics.items()}
+        for snap in other_snapshots:
+            for name, series in snap.items():
+                if name not in merged:
+                    continue
+                target = merged[name]
+                for key, value in series:
+                    key = tuple(key)
+                    if key not in target:
+                        target[key] = _copy(value)
+                    elif isinstance(value, dict):
+                        current = target[key]
+                        current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                        current["sum"] += value["sum"]
+                        current["count"] += value["count"]
+                    else:
+                        target[key] += value
+
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(merged[name].items()):
+                labels = dict(zip(metric.labelnames, key))
+                if metric.kind == "histogram":
+                    for bound, count in zip(metric.buckets, value["buckets"]):
+                        lines.append(f"{name}_bucket{_labels(labels, le=_number(bound))} {count}")
+                    lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {value['count']}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(value['sum'])}")
+                    lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str], **extra: str) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items.items()) + "}"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = Histogram(
+    "aiservice_request_duration_seconds", "End-to-end request latency per endpoint.", ["method", "endpoint", "status"]
+)
+STAGE_LATENCY = Histogram(
+    "aiservice_stage_duration_seconds", "Latency of one processing stage within a request.", ["endpoint", "stage"]
+)
+IN_FLIGHT = Gauge("aiservice_requests_in_flight", "Requests currently being served per endpoint.", ["endpoint"])
+ERRORS = Counter(
+    "aiservice_errors_total", "Failed requests (stage=request) and failed stages per endpoint.", ["endpoint", "stage"]
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block of work as `name` for the current endpoint, counting it as an error if it raises."""
+    endpoint = current_endpoint.get()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        ERRORS.inc(endpoint=endpoint, stage=name)
+        raise
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, stage=name)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-endpoint latency, in-flight requests and failures."""
+
+    def __init__(self, app, routes: Optional[list] = None) -> None:
+        self.app = app
+        self.routes = routes if routes is not None else []
+
+    def _endpoint(self, scope) -> str:
+        from starlette.routing import Match
+
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        # Unknown paths are folded together to keep label cardinality bounded
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self._endpoint(scope)
+        token = current_endpoint.set(endpoint)
+        status = {"code": 500}
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(endpoint=endpoint)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            status["code"] = 500
+            raise
+        finally:
+            IN_FLIGHT.dec(endpoint=endpoint)
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method=scope["method"], endpoint=endpoint, status=status["code"])
+            if status["code"] >= 500:
+                ERRORS.inc(endpoint=endpoint, stage="request")
+            current_endpoint.reset(token)
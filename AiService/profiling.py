@@ -0,0 +1,266 @@
+"""Opt-in profiling of a single request.
+
+With ADMIN_TOKEN set, a request carrying `X-Profile-Token: <ADMIN_TOKEN>` is
+profiled: a sampler thread records the Python stacks of the executor threads
+doing the request's blocking work (LLM calls, outbound HTTP, PDF processing)
+every PROFILE_INTERVAL seconds, and tracemalloc tracks the peak memory while
+the request runs. The profile is written to PROFILE_DIR, its id is returned in
+the `X-Profile-Id` response header, and it can be fetched from
+/admin/profiles/{id} with `X-Admin-Token: <ADMIN_TOKEN>`.
+
+One request per worker is profiled at a time (tracemalloc is process-wide);
+others carrying the header get `X-Profile-Status: busy`. Without the header
+the cost is a header lookup per request and a context variable read per
+executor call.
+"""
+import contextvars
+import hmac
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from dotenv import load_dotenv
+from fastapi import Header, HTTPException
+from metrics import current_endpoint
+
+load_dotenv()
+
+T = TypeVar("T")
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or ""
+PROFILE_DIR = os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "aiservice-profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL") or 0.005)
+# Only the newest profiles are kept
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP") or 50)
+
+_MAX_DEPTH = 128
+_TOP = 30
+_PROFILE_ID = re.compile(r"^[0-9A-Za-z-]{1,64}$")
+
+_active: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("active_profile", default=None)
+_busy = threading.Lock()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """Sampling profile of the threads working for one request."""
+
+    def __init__(self, method: str, path: str, endpoint: str) -> None:
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.status: Optional[int] = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._threads: Dict[int, int] = {}
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="aiservice-profiler", daemon=True)
+        self._started_tracemalloc = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self.created_at = time.time()
+        self._start = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._sampler.join()
+        wall = time.perf_counter() - self._start
+        current, peak = tracemalloc.get_traced_memory()
+        allocations = tracemalloc.take_snapshot().statistics("lineno")[:_TOP]
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        return self._report(wall, current, peak, allocations)
+
+    def track(self, func: Callable[[], T]) -> Callable[[], T]:
+        """Wrap an executor call so its thread is sampled while it runs."""
+        def tracked() -> T:
+            tid = threading.get_ident()
+            with self._threads_lock:
+                self._threads[tid] = self._threads.get(tid, 0) + 1
+            try:
+                return func()
+            finally:
+                with self._threads_lock:
+                    if self._threads[tid] == 1:
+                        del self._threads[tid]
+                    else:
+                        self._threads[tid] -= 1
+        return tracked
+
+    def _sample(self) -> None:
+        while not self._stop.wait(PROFILE_INTERVAL):
+            with self._threads_lock:
+                threads = list(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for tid in threads:
+                frame = frames.get(tid)
+                names: List[str] = []
+                while frame is not None and len(names) < _MAX_DEPTH:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                if names:
+                    self.stacks[";".join(reversed(names))] += 1
+                    self.samples += 1
+
+    def _report(self, wall: float, current: int, peak: int, allocations: list) -> Dict[str, Any]:
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            names = stack.split(";")
+            own[names[-1]] += count
+            for name in set(names):
+                total[name] += count
+        return {
+            "id": self.id,
+            "created_at": self.created_at,
+            "method": self.method,
+            "path": self.path,
+            "endpoint": self.endpoint,
+            "status": self.status,
+            "wall_seconds": round(wall, 6),
+            "interval_seconds": PROFILE_INTERVAL,
+            "samples": self.samples,
+            # Samples of executor threads only; time spent awaiting on the event loop is wall minus this
+            "sampled_seconds": round(self.samples * PROFILE_INTERVAL, 6),
+            "memory": {
+                "peak_bytes": peak,
+                "end_bytes": current,
+                "top_allocations": [
+                    {"location": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count} for stat in allocations
+                ],
+            },
+            "top_self": [{"function": name, "samples": count} for name, count in own.most_common(_TOP)],
+            "top_total": [{"function": name, "samples": count} for name, count in total.most_common(_TOP)],
+            # Collapsed stacks, the input format of flamegraph.pl and speedscope
+            "folded": "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()),
+        }
+
+
+def track_thread(func: Callable[[], T]) -> Callable[[], T]:
+    """Return `func` wrapped for sampling if the calling request is being profiled."""
+    profile = _active.get()
+    return func if profile is None else profile.track(func)
+
+
+def _token_matches(value: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and value is not None and hmac.compare_digest(value.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Dependency guarding the admin endpoints; they do not exist without ADMIN_TOKEN."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not _token_matches(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def _profile_path(profile_id: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.json")
+
+
+def save_profile(report: Dict[str, Any]) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    tmp_path = f"{_profile_path(report['id'])}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    os.replace(tmp_path, _profile_path(report["id"]))
+    names = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in names[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else []:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass
+
+
+def load_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(_profile_path(profile_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Summaries of the stored profiles, newest first (from any worker on this host)."""
+    try:
+        names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)
+    except OSError:
+        return []
+    summaries = []
+    for name in names:
+        report = load_profile(name[:-len(".json")])
+        if report is not None:
+            summary = {key: report.get(key) for key in ("id", "created_at", "method", "path", "endpoint", "status", "wall_seconds", "samples")}
+            summary["peak_bytes"] = report.get("memory", {}).get("peak_bytes")
+            summaries.append(summary)
+    return summaries
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that carry a valid X-Profile-Token header."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not ADMIN_TOKEN or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = next((value for name, value in scope["headers"] if name == b"x-profile-token"), None)
+        if token is None or not _token_matches(token.decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+        if not _busy.acquire(blocking=False):
+            await self.app(scope, receive, _with_headers(send, [(b"x-profile-status", b"busy")]))
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], current_endpoint.get())
+        extra = [(b"x-profile-id", profile.id.encode("ascii")), (b"x-profile-status", b"recorded")]
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+            await _with_headers(send, extra)(message)
+
+        context_token = _active.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _active.reset(context_token)
+            try:
+                save_profile(profile.stop())
+            except Exception as e:
+                print(f"Could not save profile {profile.id}: {e}")
+            finally:
+                _busy.release()
+
+
+def _with_headers(send, headers: list):
+    async def send_with_headers(message) -> None:
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": list(message.get("headers", [])) + headers}
+        await send(message)
+    return send_with_headers
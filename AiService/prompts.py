@@ -0,0 +1,324 @@
+"""Registry of the prompts the service sends to the LLM.
+
+Each prompt is registered once under a versioned id such as
+"resume.rewrite@1". get_chain() parses the template and builds its
+`prompt | llm` chain the first time it is asked for and reuses it afterwards,
+instead of rebuilding both on every call. The id is the chain's name and part
+of the LLM cache key, so changing a template means registering a new version,
+which also retires its cached generations. Prompts registered with a JSON
+schema get Ollama's constrained output (see LLM_STRUCTURED_OUTPUT).
+"""
+import os
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+from dotenv import load_dotenv
+from llm import DEFAULT_MODEL, get_llm
+
+load_dotenv()
+
+# How prompts with an output schema constrain the model: "schema" (Ollama
+# structured outputs, needs Ollama >= 0.5), "json" (any JSON) or "off"
+LLM_STRUCTURED_OUTPUT = (os.getenv("LLM_STRUCTURED_OUTPUT") or "schema").lower()
+
+
+class Prompt(NamedTuple):
+    id: str
+    input_variables: List[str]
+    template: str
+    # JSON schema of the expected output, for Ollama's structured output
+    schema: Optional[Dict[str, Any]] = None
+
+
+PROMPTS: Dict[str, Prompt] = {}
+
+
+def register(name: str, version: int, input_variables: List[str], template: str, schema: Optional[Dict[str, Any]] = None) -> str:
+    """Add a prompt to the registry and return its id."""
+    prompt_id = f"{name}@{version}"
+    if prompt_id in PROMPTS:
+        raise ValueError(f"Prompt {prompt_id} is already registered")
+    PROMPTS[prompt_id] = Prompt(prompt_id, input_variables, template, schema)
+    return prompt_id
+
+
+def output_format(prompt_id: str) -> Union[str, Dict[str, Any], None]:
+    """Ollama `format` for the prompt under LLM_STRUCTURED_OUTPUT."""
+    schema = PROMPTS[prompt_id].schema
+    if schema is None or LLM_STRUCTURED_OUTPUT == "off":
+        return None
+    return schema if LLM_STRUCTURED_OUTPUT == "schema" else "json"
+
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+QUESTIONS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "question": {"type": "string"},
+            "type": {"type": "string"},
+            "competencies": _STRING_LIST,
+            "difficulty": {"type": "integer"},
+            "suggested_time": {"type": "integer"},
+            "looking_for": {"type": "string"},
+        },
+        "required": ["question", "type", "competencies", "difficulty", "suggested_time", "looking_for"],
+    },
+}
+
+_SCORES = ["overall_score", "content_quality", "structure_clarity", "relevance", "specificity", "confidence_level"]
+_FEEDBACK_LISTS = ["strengths", "weaknesses", "improvement_suggestions", "follow_up_questions"]
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **{score: {"type": "integer"} for score in _SCORES},
+        **{name: _STRING_LIST for name in _FEEDBACK_LISTS},
+        "specific_feedback": {"type": "string"},
+    },
+    "required": _SCORES + _FEEDBACK_LISTS + ["specific_feedback"],
+}
+
+
+RESUME_REWRITE = register("resume.rewrite", 1, ["resume_text"], """
+You are an expert career coach and professional resume writer specialized in creating resumes optimized for both humans and Applicant Tracking Systems (ATS). Your task is to rewrite the following resume text to:
+
+Improve clarity, professionalism, and impact.
+
+Highlight quantifiable achievements, skills, and results (whenever possible).
+
+Use strong action verbs and concise phrasing.
+
+Tailor the wording to maximize relevance for job applications in [insert industry/role, e.g., “AI/ML Engineering” or “Data Science”].
+
+Ensure the tone is confident but not exaggerated.
+
+Maintain consistent tense (past for completed roles, present for current role).
+
+Avoid filler words, passive voice, and vague terms.
+
+Make the text ATS-friendly by naturally including relevant keywords.
+
+Here is the text to rewrite: {resume_text}
+
+Output requirements:
+- Return ONLY the polished, professional version of the resume text.
+- Do NOT include any explanations, lists, or sections like "Key improvements made".
+- Do NOT add commentary or headings. Output must be the resume content only.
+""")
+
+RESUME_REPORT = register("resume.report", 1, ["resume_text"], """
+        You are a highly skilled career strategist and personal development expert. Your task is to analyze the provided resume and generate a concise, strategic summary that guides the individual's career planning and professional growth. This summary should be insightful, empathetic, and highly actionable.
+
+        Structure your analysis with three distinct sections, using the following headings:
+
+        ### Strengths
+        Highlight the individual's core competencies, unique value proposition, and significant achievements. Identify transferable skills and quantifiable successes that can be leveraged for future roles.
+
+        ### Areas for Growth
+        Identify key skills, knowledge, or experiences that are missing or could be developed to advance their career. These should be framed as opportunities rather than weaknesses, aligning with their stated or implied career goals.
+
+        ### Actionable Recommendations
+        Provide a clear, step-by-step plan. Offer specific and practical advice, such as a list of relevant certifications, technical skills to learn, networking strategies, or types of projects to pursue. Ensure these recommendations directly address the identified areas for growth and help the individual achieve their career aspirations.
+
+        ---
+
+        Resume:
+        {resume_text}
+
+        Strategic Summary:
+		""")
+
+# Map step of create_report for resumes too long for one prompt (see chunking)
+RESUME_NOTES = register("resume.notes", 1, ["resume_text"], """
+You are a career strategist preparing notes for a career development report. Below is one part of a longer resume.
+
+Summarize this part as concise bullet points: roles and responsibilities, skills and technologies, quantifiable achievements, education and certifications. Keep names, numbers and dates. Do not assess or give advice yet.
+
+Resume part:
+{resume_text}
+
+Notes:
+""")
+
+# Map step of rewrite_resume for resumes too long for one prompt (see chunking)
+RESUME_REWRITE_SECTION = register("resume.rewrite_section", 1, ["resume_text"], """
+You are an expert career coach and professional resume writer specialized in creating resumes optimized for both humans and Applicant Tracking Systems (ATS). Below is one part of a longer resume; the other parts are rewritten separately and joined with yours in document order.
+
+Rewrite this part to improve clarity, professionalism, and impact: highlight quantifiable achievements, skills, and results, use strong action verbs and concise phrasing, keep a confident but not exaggerated tone, keep tense consistent (past for completed roles, present for the current role), avoid filler words, passive voice, and vague terms, and include relevant keywords naturally.
+
+Keep the section headings of this part as they are, in the same order. Do NOT add headings, a summary, a title, or contact details that are not in this part, and do NOT drop any role, date, or qualification.
+
+Resume part:
+{resume_text}
+
+Output requirements:
+- Return ONLY the rewritten text of this part.
+- Do NOT include any explanations or commentary.
+""")
+
+AGGREGATE_REPORT = register("report.aggregate", 1, ["resume_summary", "interview_profile", "github", "linkedin", "stackoverflow", "job_market"], """
+You are an expert career strategist. Create a concise, action-oriented Career Insights Report synthesizing the provided sources. Use clear headings, short paragraphs, and bullet points. Avoid fluff.
+
+Include these sections:
+
+### Snapshot
+- One-paragraph overview of candidate strengths and target roles.
+
+### Public Footprint Highlights
+- Summarize notable contributions/activities across GitHub, LinkedIn, StackOverflow.
+
+### Strengths
+- Concrete skills, achievements, and differentiators.
+
+### Areas for Growth
+- Gaps to close for target roles. Keep constructive and specific.
+
+### Job Market Readiness (Region-aware)
+- Brief on role-market fit and region considerations from job data.
+
+### Action Plan (next 30-60 days)
+- 5–8 specific, high-impact actions (learning, projects, networking, certifications).
+
+---
+Resume summary:
+{resume_summary}
+
+Interview profile:
+{interview_profile}
+
+GitHub:
+{github}
+
+LinkedIn:
+{linkedin}
+
+StackOverflow:
+{stackoverflow}
+
+Job market:
+{job_market}
+
+Report:
+""")
+
+INTERVIEW_QUESTIONS = register("interview.questions", 1, ["job_description", "interview_type", "num_questions"], """
+            You are an expert HR professional and interview coach. Generate {num_questions} high-quality interview questions for this job description:
+
+            Job Description:
+            {job_description}
+
+            Interview Type: {interview_type}
+
+            For each question, provide:
+            1. The question text
+            2. Question type (behavioral/technical/situational/general)
+            3. Expected competencies/skills being assessed
+            4. Difficulty level (1-5, where 1=easy, 5=expert)
+            5. Suggested response time (in minutes)
+            6. What the interviewer is looking for
+
+            Format your response as a JSON array where each question is an object with these fields:
+            - question: string
+            - type: string
+            - competencies: array of strings
+            - difficulty: integer (1-5)
+            - suggested_time: integer (minutes)
+            - looking_for: string
+
+            Make the questions:
+            - Relevant to the specific role and company
+            - Progressive in difficulty
+            - Mix of question types if interview_type is "mixed"
+            - Professional and fair
+            - Designed to assess both technical and soft skills
+
+            Return only the JSON array, no additional text.
+            """, schema=QUESTIONS_SCHEMA)
+
+INTERVIEW_ANALYSIS = register("interview.analysis", 1, ["question", "response", "question_type"], """
+            You are an expert interview coach and HR professional. Analyze this interview response:
+
+            Question: {question}
+            Question Type: {question_type}
+            Response: {response}
+
+            Provide a comprehensive analysis in JSON format with these fields:
+
+            {{
+                "overall_score": integer (1-10),
+                "content_quality": integer (1-10),
+                "structure_clarity": integer (1-10),
+                "relevance": integer (1-10),
+                "specificity": integer (1-10),
+                "confidence_level": integer (1-10),
+                "strengths": array of strings,
+                "weaknesses": array of strings,
+                "specific_feedback": string,
+                "improvement_suggestions": array of strings,
+                "follow_up_questions": array of strings
+            }}
+
+            Scoring criteria:
+            - Content Quality: How well does the response address the question?
+            - Structure & Clarity: Is the response well-organized and easy to follow?
+            - Relevance: How relevant is the response to the specific question?
+            - Specificity: Does the response include specific examples and details?
+            - Confidence Level: Does the response demonstrate confidence and conviction?
+
+            Provide constructive, actionable feedback that helps the candidate improve.
+
+            Return only the JSON object, no additional text.
+            """, schema=ANALYSIS_SCHEMA)
+
+
+_templates: Dict[str, Any] = {}
+_chains: Dict[Tuple[str, str, Optional[float], Tuple[Tuple[str, Any], ...]], Any] = {}
+_lock = threading.Lock()
+
+
+def get_template(prompt_id: str) -> Any:
+    """The parsed PromptTemplate for `prompt_id`, built on first use."""
+    template = _templates.get(prompt_id)
+    if template is None:
+        from langchain.prompts import PromptTemplate
+
+        spec = PROMPTS[prompt_id]
+        with _lock:
+            template = _templates.get(prompt_id)
+            if template is None:
+                template = PromptTemplate(input_variables=spec.input_variables, template=spec.template)
+                _templates[prompt_id] = template
+    return template
+
+
+def get_chain(prompt_id: str, model: str = DEFAULT_MODEL, timeout: Optional[float] = None, **options: Any) -> Any:
+    """The `prompt | llm` chain for `prompt_id` on `model`, built on first use and named after the prompt.
+
+    `timeout` and the keyword arguments (generation options) are as for get_llm.
+    """
+    key = (prompt_id, model, timeout, tuple(sorted(options.items())))
+    chain = _chains.get(key)
+    if chain is None:
+        from langchain_core.runnables.base import RunnableSequence
+
+        template = get_template(prompt_id)
+        with _lock:
+            chain = _chains.get(key)
+            if chain is None:
+                llm = get_llm(model, format=output_format(prompt_id), timeout=timeout, **options)
+                chain = RunnableSequence(template, llm, name=prompt_id)
+                _chains[key] = chain
+    return chain
+
+
+def _reset_after_fork() -> None:
+    # Chains hold the parent's Ollama client, which llm drops after fork
+    global _lock
+    _chains.clear()
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
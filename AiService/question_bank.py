@@ -0,0 +1,283 @@
+"""Semantic cache of generated interview questions.
+
+Job descriptions reaching /ai_interviewer/generate_questions are often near
+duplicates (a reposted role, different whitespace), which an exact-match
+cache misses. Here each job description is embedded and the generated
+question set is stored with its vector in a SQLite file next to the service.
+A lookup takes the top-k most similar stored descriptions for the same
+interview type and question count (cosine similarity, one NumPy
+matrix-vector product) and returns the best set at or above
+QUESTION_BANK_THRESHOLD; a miss falls through to generation.
+
+Embeddings come from a local hashing vectorizer by default (no model call),
+or from Ollama's embeddings API with
+QUESTION_BANK_EMBEDDER=ollama. Entries are tagged with the embedder, the
+prompt id and the model, so changing any of them never mixes incompatible
+vectors or stale question sets; sets generated on a downgraded model (see
+routing) are not stored. Requests sent with `X-LLM-Cache: bypass` skip the lookup, and
+their fresh question set replaces the stored ones it would have matched.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+import llm_cache
+from llm import get_embeddings
+from metrics import Counter, stage
+from tracing import span
+
+load_dotenv()
+
+QUESTION_BANK_ENABLED = (os.getenv("QUESTION_BANK_ENABLED") or "1").lower() not in ("0", "false", "no")
+QUESTION_BANK_PATH = os.getenv("QUESTION_BANK_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "question_bank.db")
+# "hashing" (local, default) or "ollama" (QUESTION_BANK_EMBED_MODEL through the Ollama embeddings API)
+QUESTION_BANK_EMBEDDER = (os.getenv("QUESTION_BANK_EMBEDDER") or "hashing").lower()
+QUESTION_BANK_EMBED_MODEL = os.getenv("QUESTION_BANK_EMBED_MODEL") or "nomic-embed-text"
+# Seconds per embeddings request; a lookup sits in front of every question generation
+QUESTION_BANK_EMBED_TIMEOUT = float(os.getenv("QUESTION_BANK_EMBED_TIMEOUT") or 10)
+# Every worker keeps up to QUESTION_BANK_MAX_ENTRIES x this many float32s in memory (20 MB at the defaults)
+QUESTION_BANK_DIMENSIONS = int(os.getenv("QUESTION_BANK_DIMENSIONS") or 1024)
+QUESTION_BANK_THRESHOLD = float(os.getenv("QUESTION_BANK_THRESHOLD") or 0.9)
+QUESTION_BANK_TOP_K = int(os.getenv("QUESTION_BANK_TOP_K") or 5)
+QUESTION_BANK_MAX_ENTRIES = int(os.getenv("QUESTION_BANK_MAX_ENTRIES") or 5000)
+
+QUESTION_BANK_LOOKUPS = Counter("aiservice_question_bank_total", "Question bank lookups by result (hit, miss).", ["result"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS question_bank (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    embedder TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    questions TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_question_bank_embedder ON question_bank (embedder, id);
+"""
+
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+
+class HashingEmbedder:
+    """Word unigrams and bigrams hashed into a fixed-size, L2-normalized vector."""
+
+    def __init__(self, dimensions: int = QUESTION_BANK_DIMENSIONS) -> None:
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def embed(self, text: str) -> Any:
+        import numpy as np
+
+        words = _TOKEN.findall(text.lower())
+        counts: Dict[str, int] = {}
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            counts[feature] = counts.get(feature, 0) + 1
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, count in counts.items():
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            # The sign bit keeps colliding features from only ever adding up
+            sign = 1.0 if digest >> 63 else -1.0
+            vector[digest % self.dimensions] += sign * (1.0 + math.log(count))
+        return _normalized(vector)
+
+
+class OllamaEmbedder:
+    """Embeddings from the Ollama embeddings API, with their own request timeout."""
+
+    def __init__(self, model: str = QUESTION_BANK_EMBED_MODEL, timeout: float = QUESTION_BANK_EMBED_TIMEOUT) -> None:
+        self.model = model
+        self.timeout = timeout
+        self.name = f"ollama-{model}"
+
+    def embed(self, text: str) -> Any:
+        import numpy as np
+
+        with stage("embedding"), span("llm.embed", kind="client", **{"gen_ai.system": "ollama", "gen_ai.request.model": self.model}):
+            vector = get_embeddings(self.model, self.timeout).embed_query(text)
+        return _normalized(np.asarray(vector, dtype=np.float32))
+
+
+def _normalized(vector: Any) -> Any:
+    import numpy as np
+
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def make_embedder(kind: str = QUESTION_BANK_EMBEDDER) -> Any:
+    if kind == "ollama":
+        return OllamaEmbedder()
+    if kind == "hashing":
+        return HashingEmbedder()
+    raise ValueError(f"Unknown QUESTION_BANK_EMBEDDER: {kind}")
+
+
+class QuestionBank:
+    def __init__(self, path: str = QUESTION_BANK_PATH, embedder: Any = None, max_entries: int = QUESTION_BANK_MAX_ENTRIES) -> None:
+        self.path = path
+        self.embedder = embedder or make_embedder()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # In-memory index of this embedder's newest rows: a ring of up to max_entries
+        # slots (id, scope, vector), allocated as it fills, the oldest overwritten first
+        self._ids: Any = None
+        self._scopes: List[str] = []
+        self._matrix: Any = None
+        self._count = 0
+        self._next = 0
+        self._last_id = 0
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _refresh(self, conn: sqlite3.Connection) -> None:
+        """Load rows added since the last refresh (possibly by other workers); call with the lock held."""
+        import numpy as np
+
+        rows = conn.execute(
+            "SELECT id, scope, vector FROM question_bank WHERE embedder = ? AND id > ? ORDER BY id",
+            (self.embedder.name, self._last_id),
+        ).fetchall()
+        if not rows:
+            return
+        self._last_id = rows[-1][0]
+        rows = rows[-self.max_entries:]
+        # float32 blobs; the width is the embedder's (not known up front for Ollama models)
+        self._reserve(min(self.max_entries, self._count + len(rows)), len(rows[0][2]) // 4)
+        capacity = len(self._ids)
+        for row_id, scope, vector in rows:
+            if self._next == capacity:
+                # Full (capacity is max_entries by now): overwrite the oldest slot
+                self._next = 0
+            self._matrix[self._next] = np.frombuffer(vector, dtype=np.float32)
+            self._ids[self._next] = row_id
+            self._scopes[self._next] = scope
+            self._next += 1
+            self._count = max(self._count, self._next)
+
+    def _reserve(self, rows: int, dimensions: int) -> None:
+        """Grow the index to hold `rows` slots, doubling so inserts do not copy it each time."""
+        import numpy as np
+
+        capacity = 0 if self._ids is None else len(self._ids)
+        if rows <= capacity:
+            return
+        capacity = min(self.max_entries, max(rows, capacity * 2, 64))
+        matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+        ids = np.zeros(capacity, dtype=np.int64)
+        if self._count:
+            matrix[:self._count] = self._matrix[:self._count]
+            ids[:self._count] = self._ids[:self._count]
+        self._matrix, self._ids = matrix, ids
+        self._scopes.extend([""] * (capacity - len(self._scopes)))
+
+    def search(self, vector: Any, scope: str, k: int = QUESTION_BANK_TOP_K) -> List[Tuple[float, int]]:
+        """The k most similar stored entries of `scope` as (similarity, id), best first."""
+        import numpy as np
+
+        with self._lock:
+            with closing(self._connect()) as conn:
+                self._refresh(conn)
+            if not self._count:
+                return []
+            in_scope = np.fromiter((s == scope for s in self._scopes[:self._count]), dtype=bool, count=self._count)
+            k = min(k, int(in_scope.sum()))
+            if k <= 0:
+                return []
+            scores = np.where(in_scope, self._matrix[:self._count] @ vector, -np.inf)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), int(self._ids[i])) for i in top]
+
+    def lookup(self, vector: Any, scope: str, threshold: float = QUESTION_BANK_THRESHOLD) -> Optional[List[Dict]]:
+        """The question set of the most similar entry of `scope` at or above `threshold`, or None."""
+        for similarity, row_id in self.search(vector, scope):
+            if similarity < threshold:
+                break
+            with closing(self._connect()) as conn:
+                row = conn.execute("SELECT questions FROM question_bank WHERE id = ?", (row_id,)).fetchone()
+            # Another worker may have evicted it since
+            if row is not None:
+                return json.loads(row[0])
+        return None
+
+    def store(self, vector: Any, scope: str, questions: List[Dict], replace: bool = False) -> None:
+        """Add a question set; with `replace`, first delete the entries a lookup of `vector` would return."""
+        stale = []
+        if replace:
+            stale = [(row_id,) for similarity, row_id in self.search(vector, scope) if similarity >= QUESTION_BANK_THRESHOLD]
+        with closing(self._connect()) as conn, conn:
+            # Deleted rows stay in the in-memory index until overwritten; lookup skips them
+            conn.executemany("DELETE FROM question_bank WHERE id = ?", stale)
+            conn.execute(
+                "INSERT INTO question_bank (embedder, scope, vector, questions, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.embedder.name, scope, vector.astype("float32").tobytes(), json.dumps(questions), time.time()),
+            )
+            # Oldest entries go first once the bank is full
+            conn.execute(
+                "DELETE FROM question_bank WHERE embedder = ? AND id <= "
+                "(SELECT id FROM question_bank WHERE embedder = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.embedder.name, self.embedder.name, self.max_entries),
+            )
+
+
+_bank: Optional[QuestionBank] = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank() -> Optional[QuestionBank]:
+    """The process-wide question bank, or None when it is disabled or cannot be opened."""
+    global _bank, QUESTION_BANK_ENABLED
+    if not QUESTION_BANK_ENABLED:
+        return None
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                try:
+                    _bank = QuestionBank()
+                except (sqlite3.Error, ImportError, ValueError) as e:
+                    print(f"Question bank disabled: {e}")
+                    QUESTION_BANK_ENABLED = False
+                    return None
+    return _bank
+
+
+def scope_for(prompt_id: str, model: str, interview_type: str, num_questions: int) -> str:
+    """Only question sets generated by the same prompt and model for the same request shape are interchangeable."""
+    return f"{prompt_id}|{model}|{interview_type.strip().lower()}|{num_questions}"
+
+
+def cached_questions(job_description: str, scope: str) -> Tuple[Optional[List[Dict]], Any]:
+    """Questions for a job description similar to `job_description`, and its vector (None if not embedded)."""
+    bank = get_question_bank()
+    if bank is None:
+        return None, None
+    try:
+        vector = bank.embedder.embed(job_description)
+        # A bypass still embeds, so remember_questions can replace the stored match
+        questions = None if llm_cache.bypassed() else bank.lookup(vector, scope)
+    except Exception as e:
+        print(f"Question bank lookup failed: {e}")
+        return None, None
+    QUESTION_BANK_LOOKUPS.inc(result="hit" if questions is not None else "miss")
+    return questions, vector
+
+
+def remember_questions(vector: Any, scope: str, questions: List[Dict]) -> None:
+    bank = get_question_bank()
+    if bank is None or vector is None:
+        return
+    try:
+        bank.store(vector, scope, questions, replace=llm_cache.bypassed())
+    except sqlite3.Error as e:
+        print(f"Question bank store failed: {e}")
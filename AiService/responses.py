@@ -0,0 +1,53 @@
+"""Fast JSON responses for the routes returning large payloads.
+
+Routes return a FastJSONResponse directly instead of a dict, which skips
+FastAPI's jsonable_encoder pass over every nested value. orjson serializes
+dataclasses, datetimes and dicts natively, so dataclass results (GitHub and
+StackOverflow profiles) are passed through as they are. Without orjson the
+response falls back to the standard json module.
+"""
+import dataclasses
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Mapping, Optional
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Types neither encoder handles on its own."""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict") and callable(obj.dict):
+        return obj.dict()
+    # Only reached by the json fallback; orjson handles these natively
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def pick(obj: Any, fields: Iterable[str], rename: Optional[Mapping[str, str]] = None) -> dict:
+    """Public subset of a dataclass as a dict, optionally renaming attributes."""
+    rename = rename or {}
+    return {rename.get(name, name): getattr(obj, name) for name in fields}
@@ -0,0 +1,109 @@
+"""One-upload resume pipeline: extract once, fan out, stream each result.
+
+The PDF text is extracted a single time; the rewrite, the strategic report and
+the CV analysis then run concurrently (two generations on the "llm" pool, the
+analysis on the "cpu" pool), and the rewritten PDF is rendered as soon as the
+rewrite is ready. Every stage is yielded as an event the moment it finishes,
+so wall time is about the slowest stage rather than the sum of all of them.
+
+rewrite_pdf/report_pdf are also used by the single-purpose routes; they
+coalesce identical uploads through the single-flight groups.
+"""
+import asyncio
+import base64
+import time
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional, Tuple
+from chunking import truncation
+from create_report import create_report
+from executors import run_cpu, run_llm
+from job_matcher import JobMatcher
+from resume_rewriter import create_pdf_from_text, extract_text_from_pdf, rewrite_resume
+from singleflight import content_hash, get_group
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+async def rewrite_pdf(pdf_bytes: bytes, resume_text: Optional[str] = None) -> Dict[str, Any]:
+    """{"rewritten_resume", "truncated", "dropped_tokens"} for an uploaded PDF, shared with identical in-flight uploads."""
+    async def rewrite() -> Dict[str, Any]:
+        text = resume_text if resume_text is not None else await run_cpu(extract_text_from_pdf, pdf_bytes)
+        return {"rewritten_resume": await run_llm(rewrite_resume, text), **truncation(text)}
+    return await get_group("resume_rewrite").do(content_hash(pdf_bytes), rewrite)
+
+
+async def report_pdf(pdf_bytes: bytes, resume_text: Optional[str] = None) -> Dict[str, Any]:
+    """{"report", "truncated", "dropped_tokens"} for an uploaded PDF, shared with identical in-flight uploads."""
+    async def report() -> Dict[str, Any]:
+        text = resume_text if resume_text is not None else await run_cpu(extract_text_from_pdf, pdf_bytes)
+        return {"report": await run_llm(create_report, text), **truncation(text)}
+    return await get_group("create_report").do(content_hash(pdf_bytes), report)
+
+
+async def _timed(name: str, work: Awaitable[Any]) -> Tuple[str, Any, Optional[str], float]:
+    start = time.perf_counter()
+    try:
+        return name, await work, None, time.perf_counter() - start
+    except Exception as e:
+        print(f"Resume pipeline stage {name} failed: {e}")
+        return name, None, str(e), time.perf_counter() - start
+
+
+def _result_payload(name: str, result: Any) -> Dict[str, Any]:
+    if name in ("rewrite", "report"):
+        return result
+    if name == "analysis":
+        return {"analysis": result}
+    # pdf
+    return {"media_type": "application/pdf", "pdf_base64": base64.b64encode(result).decode("ascii")}
+
+
+async def run_pipeline(
+    pdf_bytes: bytes,
+    job_matcher: JobMatcher,
+    render_pdf: bool = False,
+    template_id: str = "ats",
+) -> AsyncIterator[Event]:
+    """Yield ("stage", payload) for every stage as it completes, then ("done", summary)."""
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+    failed = []
+
+    try:
+        resume_text = await run_cpu(extract_text_from_pdf, pdf_bytes)
+    except Exception as e:
+        yield "stage", {"stage": "extract", "success": False, "error": str(e)}
+        yield "done", {"done": True, "success": False, "failed_stages": ["extract"]}
+        return
+    timings["extract"] = time.perf_counter() - start
+    yield "stage", {"stage": "extract", "success": True, "characters": len(resume_text), "elapsed_seconds": round(timings["extract"], 3)}
+
+    pending = {
+        asyncio.ensure_future(_timed("rewrite", rewrite_pdf(pdf_bytes, resume_text))),
+        asyncio.ensure_future(_timed("report", report_pdf(pdf_bytes, resume_text))),
+        asyncio.ensure_future(_timed("analysis", run_cpu(job_matcher.analyze_cv, resume_text))),
+    }
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name, result, error, elapsed = task.result()
+                timings[name] = elapsed
+                if error is not None:
+                    failed.append(name)
+                    yield "stage", {"stage": name, "success": False, "error": error, "elapsed_seconds": round(elapsed, 3)}
+                    continue
+                if name == "rewrite" and render_pdf:
+                    pending.add(asyncio.ensure_future(_timed("pdf", run_cpu(create_pdf_from_text, result["rewritten_resume"], template_id))))
+                yield "stage", {"stage": name, "success": True, "elapsed_seconds": round(elapsed, 3), **_result_payload(name, result)}
+    finally:
+        # Client gone or stream closed early: stop waiting on the remaining stages
+        for task in pending:
+            task.cancel()
+
+    yield "done", {
+        "done": True,
+        "success": not failed,
+        "failed_stages": failed,
+        "stage_seconds": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "total_seconds": round(time.perf_counter() - start, 3),
+    }
@@ -1,71 +1,101 @@
-from langchain_ollama import OllamaLLM
-from langchain.prompts import PromptTemplate
-from langchain_core.runnables.base import RunnableSequence
-from typing import Union
+import threading
+from typing import Iterator, List, Optional, Union
 from io import BytesIO
-from dotenv import load_dotenv
-import fitz
-import os
-from fpdf import FPDF
+from metrics import stage
+from cancellation import bound
+from chunking import is_heading, map_chunks, map_reduce, needs_map_reduce
+from llm import invoke_chain, stream_chain
+from prompts import RESUME_REWRITE, RESUME_REWRITE_SECTION
+from routing import routed_chain
 
-load_dotenv()  # Load environment variables from .env file
-OLLAMA_URL = os.getenv("OLLAMA_URL")
-
-# Initialize the Ollama LLM
-model = OllamaLLM(model="llama3.1", base_url=OLLAMA_URL)
+# PyMuPDF and FPDF are imported inside the functions that use them so
+# that importing this module (and starting the service) stays fast.
 
 def extract_text_from_pdf(pdf_path: Union[str, bytes]) -> str:
     """Extract Text from a PDF file."""
-    text = ""
-    if isinstance(pdf_path, str):
-        doc = fitz.open(pdf_path)
-    else:
-        doc = fitz.open(stream=BytesIO(pdf_path), filetype="pdf")
-    
-    try:
-        for page in doc:
-            text += page.get_text()
-    finally:
-        doc.close()
-    return text
+    import fitz
 
-def rewrite_resume(resume_text: str) -> str:
-    """Rewrite the resume text and improve its quality."""
-    prompt = PromptTemplate(
-        input_variables=["resume_text"],
-        template=
-"""
-You are an expert career coach and professional resume writer specialized in creating resumes optimized for both humans and Applicant Tracking Systems (ATS). Your task is to rewrite the following resume text to:
-
-Improve clarity, professionalism, and impact.
+    text = ""
+    with stage("pdf_extract"):
+        if isinstance(pdf_path, str):
+            doc = fitz.open(pdf_path)
+        else:
+            doc = fitz.open(stream=BytesIO(pdf_path), filetype="pdf")
 
-Highlight quantifiable achievements, skills, and results (whenever possible).
+        try:
+            for page in doc:
+                text += page.get_text()
+        finally:
+            doc.close()
+    return text
 
-Use strong action verbs and concise phrasing.
+def _rewrite_chain(prompt_id: str = RESUME_REWRITE):
+    with stage("prompt_build"):
+        return routed_chain("rewrite", prompt_id)
 
-Tailor the wording to maximize relevance for job applications in [insert industry/role, e.g., “AI/ML Engineering” or “Data Science”].
+def _rewrite_text(resume_text: str) -> str:
+    chain = _rewrite_chain()
+    with stage("llm_call"):
+        rewritten_resume = invoke_chain(chain, {"resume_text": resume_text})
+    return rewritten_resume
 
-Ensure the tone is confident but not exaggerated.
+def _rewrite_section(section_text: str) -> str:
+    chain = _rewrite_chain(RESUME_REWRITE_SECTION)
+    with stage("llm_call"):
+        return invoke_chain(chain, {"resume_text": section_text}).strip()
 
-Maintain consistent tense (past for completed roles, present for current role).
+def _heading_key(line: str) -> str:
+    return line.strip().strip("#*:").strip().lower()
 
-Avoid filler words, passive voice, and vague terms.
+def _merge_sections(parts: List[str]) -> str:
+    """Join rewritten parts in document order.
 
-Make the text ATS-friendly by naturally including relevant keywords.
+    A section split across chunks is rewritten in two calls; a heading the model
+    repeats at the start of the second part is dropped so it appears once.
+    """
+    merged: List[str] = []
+    last_heading = None
+    for part in parts:
+        lines = part.splitlines()
+        first = next((i for i, line in enumerate(lines) if line.strip()), None)
+        if first is not None and is_heading(lines[first]) and _heading_key(lines[first]) == last_heading:
+            lines = lines[first + 1:]
+        for line in lines:
+            if is_heading(line):
+                last_heading = _heading_key(line)
+        text = "\n".join(lines).strip()
+        if text:
+            merged.append(text)
+    return "\n\n".join(merged)
 
-Here is the text to rewrite: {resume_text}
+def rewrite_resume(resume_text: str) -> str:
+    """Rewrite the resume text and improve its quality."""
+    if needs_map_reduce(resume_text):
+        # Long resume: rewrite its sections concurrently and merge them in order
+        return map_reduce(resume_text, _rewrite_section, _merge_sections)
+    return _rewrite_text(resume_text)
 
-Output requirements:
-- Return ONLY the polished, professional version of the resume text.
-- Do NOT include any explanations, lists, or sections like "Key improvements made".
-- Do NOT add commentary or headings. Output must be the resume content only.
-""")
-    chain = RunnableSequence(prompt | model)
-    rewritten_resume = chain.invoke({"resume_text": resume_text})
-    return rewritten_resume
+def stream_rewrite_resume(resume_text: str, cancel: Optional[threading.Event] = None) -> Iterator[str]:
+    """Rewrite the resume text, yielding the new text as it is generated."""
+    if needs_map_reduce(resume_text):
+        # Sections are rewritten concurrently and each is yielded once it and those before it are done
+        with bound(cancel):
+            parts = map_chunks(resume_text, _rewrite_section)
+        done: List[str] = []
+        for part in parts:
+            # Yield only what this part adds to the merged text
+            before = _merge_sections(done)
+            done.append(part)
+            merged = _merge_sections(done)
+            yield merged[len(before):]
+        return
+    chain = _rewrite_chain()
+    yield from stream_chain(chain, {"resume_text": resume_text}, cancel)
 
 def create_pdf_from_text(text: str, template_id: str = "ats") -> bytes:
     """Create a professional PDF file from the given text using a template."""
+    from fpdf import FPDF
+
     def sanitize_text(s: str) -> str:
         # Replace common unicode punctuation with ASCII equivalents
         replacements = {
@@ -252,8 +282,9 @@ def create_pdf_from_text(text: str, template_id: str = "ats") -> bytes:
         
         return pdf.output(dest='S')
     
-    text = sanitize_text(text)
-    pdf_data = create_professional_pdf(text)
+    with stage("pdf_render"):
+        text = sanitize_text(text)
+        pdf_data = create_professional_pdf(text)
     
     # fpdf may return a 'str' in some versions; convert to bytes
     if isinstance(pdf_data, str):
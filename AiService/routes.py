@@ -1,16 +1,59 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import Response
+from fastapi import FastAPI, UploadFile, File, Depends, Request
+from fastapi.responses import Response, PlainTextResponse, JSONResponse
+import asyncio
 import json
-from resume_rewriter import rewrite_resume, extract_text_from_pdf, create_pdf_from_text  
-from create_report import create_report, create_aggregate_report 
+import os
+from dataclasses import asdict
+from resume_rewriter import rewrite_resume, stream_rewrite_resume, extract_text_from_pdf, create_pdf_from_text  
+from create_report import create_report, stream_report, create_aggregate_report 
 from ai_interviewer import AIInterviewer
-from job_matcher import LinkedInJobsScraper, JobMatcher, CandidateProfile, JobOpportunity
+from job_matcher import JobMatcher, CandidateProfile, JobData
 from footprint_scanner import FootprintScanner
+from executors import run_llm, run_http, run_cpu
+from chunking import truncation
+from services import lifespan, get_job_matcher, get_interviewer, get_footprint_scanner, get_job_manager
+from jobs import JobManager, JobResult
+from admission import Overloaded, admit, admission_status, get_limiter
+from streaming import TokenStream, check_stream_format, stream_response, event_response
+from resume_pipeline import rewrite_pdf, report_pdf, run_pipeline
+from cv_batch import InvalidBatch, analyze_cv_batch as analyze_cv_batch_request
+from interview_session import InvalidSession, analyze_session as analyze_session_events, check_session
+from responses import FastJSONResponse, pick
+from singleflight import get_group, fingerprint
+import health
+import warmup
+from metrics import MetricsMiddleware, REGISTRY
+from profiling import ProfilingMiddleware, require_admin, list_profiles, load_profile
+from tracing import TracingMiddleware
+from llm_cache import LLMCacheMiddleware
+from cancellation import Cancelled, cancel_on_disconnect
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Tuple, Any
 from datetime import datetime
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# Added first so they run inside MetricsMiddleware and see the matched endpoint
+app.add_middleware(LLMCacheMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "success": False,
+            "error": str(exc),
+            "message": "Service is at capacity, retry later"
+        },
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(Cancelled)
+async def cancelled_handler(request: Request, exc: Cancelled):
+    # The client is gone; 499 (client closed request) only shows up in logs and metrics
+    return Response(status_code=499)
 
 # Pydantic models for request/response
 class JobDescriptionRequest(BaseModel):
@@ -26,6 +69,9 @@ class ResponseAnalysisRequest(BaseModel):
 class InterviewSession(BaseModel):
     responses: List[Dict]
 
+class SessionAnalysisRequest(BaseModel):
+    answers: List[ResponseAnalysisRequest]
+
 # Job Matcher models
 class CandidateProfileRequest(BaseModel):
     name: str
@@ -75,45 +121,199 @@ def main():
         "message": "Welcome to the CS Challenge API. Available endpoints: /resume_writer, /create_report, /job_matcher, /ai_interviewer"
     }
 
-@app.post("/resume_writer")
+@app.get("/health")
+def worker_health():
+    """Health of the worker process that served this request"""
+    return health.worker_status()
+
+@app.get("/health/workers")
+def all_workers_health():
+    """Last heartbeat of every worker process behind this port"""
+    workers = health.read_worker_statuses()
+    return {
+        "workers": workers,
+        "total_workers": len(workers),
+        "healthy_workers": sum(1 for w in workers if w.get("status") == "ok"),
+        "ready_workers": sum(1 for w in workers if w.get("status") == "ok" and (w.get("model") or {}).get("ready"))
+    }
+
+@app.get("/ready")
+def readiness():
+    """Readiness probe: 200 once this worker has the model warm, 503 while it loads or Ollama is unreachable"""
+    status = warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content={"pid": os.getpid(), **status})
+
+@app.get("/admission")
+def admission_queues():
+    """Active requests and queue depth of every admission limiter in this worker"""
+    return {"pid": os.getpid(), "limiters": admission_status()}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Latency histograms, in-flight gauges and error counters in Prometheus text format"""
+    return PlainTextResponse(
+        REGISTRY.render(health.other_worker_metrics()),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+def admin_profiles():
+    """Stored request profiles, newest first"""
+    return {"success": True, "profiles": list_profiles()}
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def admin_profile(profile_id: str, format: str = "json"):
+    """One request profile; format=folded returns the collapsed stacks for flamegraph tools"""
+    profile = load_profile(profile_id)
+    if profile is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "Unknown profile", "profile_id": profile_id})
+    if format == "folded":
+        return PlainTextResponse(profile["folded"] + "\n")
+    return FastJSONResponse({"success": True, "profile": profile})
+
+@app.post("/resume_writer", dependencies=[Depends(admit("resume_rewrite"))])
 async def resume_writer(file: UploadFile = File(...)):
     pdf_bytes = await file.read()
-    resume_text = extract_text_from_pdf(pdf_bytes)
-    rewritten = rewrite_resume(resume_text)
-    return {"rewritten_resume": rewritten}
+    return await rewrite_pdf(pdf_bytes)
 
-@app.post("/resume_writer/pdf")
+@app.post("/resume_writer/pdf", dependencies=[Depends(admit("resume_rewrite"))])
 async def resume_writer_pdf(file: UploadFile = File(...), templateId: str = "ats"):
     pdf_bytes = await file.read()
-    resume_text = extract_text_from_pdf(pdf_bytes)
-    rewritten = rewrite_resume(resume_text)
-    pdf_out = create_pdf_from_text(rewritten, templateId)
+    rewritten = await rewrite_pdf(pdf_bytes)
+    pdf_out = await run_cpu(create_pdf_from_text, rewritten["rewritten_resume"], templateId)
     return Response(content=pdf_out, media_type="application/pdf", headers={
-        "Content-Disposition": "attachment; filename=enhanced_resume.pdf"
+        "Content-Disposition": "attachment; filename=enhanced_resume.pdf",
+        # Tokens of the resume past RESUME_TOKEN_BUDGET that were not rewritten
+        "X-Resume-Dropped-Tokens": str(rewritten["dropped_tokens"]),
     })
 
 @app.post("/resume_writer/pdf-from-text")
 async def resume_writer_pdf_from_text(payload: ResumePdfFromTextRequest):
-    pdf_out = create_pdf_from_text(payload.rewritten_resume, payload.templateId)
+    pdf_out = await run_cpu(create_pdf_from_text, payload.rewritten_resume, payload.templateId)
     return Response(content=pdf_out, media_type="application/pdf", headers={
         "Content-Disposition": "attachment; filename=enhanced_resume.pdf"
     })
 
-@app.post("/create_report")
+@app.post("/create_report", dependencies=[Depends(admit("create_report"))])
 async def create_report_route(file: UploadFile = File(...)):
     pdf_bytes = await file.read()
-    resume_text = extract_text_from_pdf(pdf_bytes)
-    report = create_report(resume_text)
-    return {"report": report}
+    return await report_pdf(pdf_bytes)
+
+# Streaming variants: tokens are forwarded as Ollama produces them (format=ndjson or sse).
+# The admission slot is held until the generation ends, not just until the handler returns.
+async def _stream_from_pdf(file: UploadFile, limiter: str, generate, fmt: str):
+    check_stream_format(fmt)
+    release = await get_limiter(limiter).reserve()
+    try:
+        pdf_bytes = await file.read()
+        resume_text = await run_cpu(extract_text_from_pdf, pdf_bytes)
+        stream = TokenStream(generate, resume_text, on_close=release)
+    except BaseException:
+        release()
+        raise
+    return stream_response(stream, fmt, done=truncation(resume_text))
+
+@app.post("/resume_writer/stream")
+async def resume_writer_stream(file: UploadFile = File(...), format: str = "ndjson"):
+    """Stream the rewritten resume token by token"""
+    return await _stream_from_pdf(file, "resume_rewrite", stream_rewrite_resume, format)
+
+@app.post("/create_report/stream")
+async def create_report_stream(file: UploadFile = File(...), format: str = "ndjson"):
+    """Stream the career report token by token"""
+    return await _stream_from_pdf(file, "create_report", stream_report, format)
+
+@app.post("/resume_pipeline")
+async def resume_pipeline(
+    file: UploadFile = File(...),
+    render_pdf: bool = False,
+    templateId: str = "ats",
+    format: str = "ndjson",
+    job_matcher: JobMatcher = Depends(get_job_matcher)
+):
+    """Extract the resume once, then rewrite, report and analyze it concurrently, streaming each result"""
+    check_stream_format(format)
+    release = await get_limiter("resume_pipeline").reserve()
+    try:
+        pdf_bytes = await file.read()
+    except BaseException:
+        release()
+        raise
+    return event_response(run_pipeline(pdf_bytes, job_matcher, render_pdf, templateId), format, on_close=release)
 
-@app.post("/create_report/aggregate")
+@app.post("/create_report/aggregate", dependencies=[Depends(admit("create_report_aggregate"))])
 async def create_aggregate_report_route(payload: Dict[str, Any]):
     try:
-        report = create_aggregate_report(payload)
+        report = await run_llm(create_aggregate_report, payload)
         return {"success": True, "report": report}
     except Exception as e:
         return {"success": False, "error": str(e), "message": "Failed to create aggregate report"}
 
+# Background job variants of the long-running LLM endpoints: submit, poll, fetch result
+def _resume_pdf_job(pdf_bytes: bytes, template_id: str) -> JobResult:
+    resume_text = extract_text_from_pdf(pdf_bytes)
+    rewritten = rewrite_resume(resume_text)
+    return "application/pdf", create_pdf_from_text(rewritten, template_id)
+
+def _report_job(pdf_bytes: bytes) -> JobResult:
+    resume_text = extract_text_from_pdf(pdf_bytes)
+    report = create_report(resume_text)
+    return "application/json", json.dumps({"report": report, **truncation(resume_text)}).encode("utf-8")
+
+def _aggregate_report_job(payload: Dict[str, Any]) -> JobResult:
+    report = create_aggregate_report(payload)
+    return "application/json", json.dumps({"success": True, "report": report}).encode("utf-8")
+
+def _job_accepted(status: Dict[str, Any]) -> JSONResponse:
+    job_id = status["job_id"]
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        **status,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result"
+    })
+
+@app.post("/jobs/resume_writer/pdf")
+async def submit_resume_pdf_job(file: UploadFile = File(...), templateId: str = "ats", jobs: JobManager = Depends(get_job_manager)):
+    """Queue /resume_writer/pdf and return a job id right away"""
+    pdf_bytes = await file.read()
+    return _job_accepted(await run_cpu(jobs.submit, "resume_writer_pdf", _resume_pdf_job, pdf_bytes, templateId))
+
+@app.post("/jobs/create_report")
+async def submit_report_job(file: UploadFile = File(...), jobs: JobManager = Depends(get_job_manager)):
+    """Queue /create_report and return a job id right away"""
+    pdf_bytes = await file.read()
+    return _job_accepted(await run_cpu(jobs.submit, "create_report", _report_job, pdf_bytes))
+
+@app.post("/jobs/create_report/aggregate")
+async def submit_aggregate_report_job(payload: Dict[str, Any], jobs: JobManager = Depends(get_job_manager)):
+    """Queue /create_report/aggregate and return a job id right away"""
+    return _job_accepted(await run_cpu(jobs.submit, "create_report_aggregate", _aggregate_report_job, payload))
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    """Job state (queued/running/done/failed) and its position in the queue"""
+    status = await run_cpu(jobs.store.status, job_id)
+    if status is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "Unknown or expired job", "job_id": job_id})
+    return {"success": True, **status}
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    """Result of a finished job, in the same format as the synchronous endpoint"""
+    status = await run_cpu(jobs.store.status, job_id)
+    if status is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "Unknown or expired job", "job_id": job_id})
+    if status["status"] == "failed":
+        return {"success": False, "error": status["error"], "message": "Job failed", "job_id": job_id}
+    result = await run_cpu(jobs.store.result, job_id) if status["status"] == "done" else None
+    if result is None:
+        # Not finished yet: keep polling
+        return JSONResponse(status_code=202, content={"success": True, **status})
+    media_type, body = result
+    headers = {"Content-Disposition": "attachment; filename=enhanced_resume.pdf"} if media_type == "application/pdf" else None
+    return Response(content=body, media_type=media_type, headers=headers)
+
 # Job Matcher endpoints - Commented out as classes don't exist
 # @app.post("/job_matcher/analyze_profile")
 # async def analyze_candidate_profile(profile_data: CandidateProfileRequest):
@@ -179,10 +379,9 @@ async def create_aggregate_report_route(payload: Dict[str, Any]):
 #     # Commented out as classes don't exist
 
 @app.post("/job_matcher/analyze_cv")
-async def analyze_cv(request: CVAnalysisRequest):
+async def analyze_cv(request: CVAnalysisRequest, job_matcher: JobMatcher = Depends(get_job_matcher)):
     """Analyze CV and extract skills, determine job categories, and generate keywords"""
     try:
-        job_matcher = JobMatcher()
         analysis = job_matcher.analyze_cv(request.resume_text)
         
         return {
@@ -196,20 +395,32 @@ async def analyze_cv(request: CVAnalysisRequest):
             "message": "Failed to analyze CV"
         }
 
+@app.post("/job_matcher/analyze_cv_batch")
+async def analyze_cv_batch(request: Request, job_matcher: JobMatcher = Depends(get_job_matcher)):
+    """Analyze many CVs at once (JSON array or NDJSON body); failures are reported per item"""
+    try:
+        return FastJSONResponse(await analyze_cv_batch_request(request, job_matcher))
+    except InvalidBatch as e:
+        return JSONResponse(status_code=e.status_code, content={
+            "success": False,
+            "error": str(e),
+            "message": "Failed to analyze CV batch"
+        })
+
 @app.post("/job_matcher/search_jobs")
 async def search_jobs_with_params(
+    request: Request,
     keywords: str,
     location: str = "",
     max_jobs: int = 50,
     region: str = "",
     remote_ok: bool = False,
-    currency: str = ""
+    currency: str = "",
+    job_matcher: JobMatcher = Depends(get_job_matcher)
 ):
     """Search for jobs using keywords, location, and optional regional preferences."""
     try:
-        from job_matcher import LinkedInJobsScraper, JobMatcher, CandidateProfile, JobOpportunity
-        
-        scraper = LinkedInJobsScraper()
+        scraper = job_matcher.scraper
         # Normalize incoming location/region (support common country codes/aliases)
         def normalize_term(term: str) -> str:
             if not term:
@@ -306,8 +517,18 @@ async def search_jobs_with_params(
         else:
             search_location = region or ""
 
-        # Single scrape call using one location term
-        jobs = scraper.scrape_jobs(keywords, search_location, max_jobs)
+        # Single scrape call using one location term; identical concurrent searches share it.
+        # The scrape stops between pages once every client waiting for it has disconnected.
+        search_key = fingerprint(" ".join(keywords.lower().split()), search_location.strip().lower(), max_jobs)
+        search_group = get_group(
+            "search_jobs",
+            encode=lambda scraped: [asdict(job) for job in scraped],
+            decode=lambda rows: [JobData(**row) for row in rows],
+        )
+        jobs = await cancel_on_disconnect(request, search_group.do(
+            search_key,
+            lambda: run_http(scraper.scrape_jobs, keywords, search_location, max_jobs)
+        ))
         
         # Convert JobData objects to dictionaries
         job_list = []
@@ -394,7 +615,7 @@ async def search_jobs_with_params(
             -x["market_alignment"]
         ))
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "jobs": job_list,
             "total_found": len(job_list),
@@ -403,7 +624,9 @@ async def search_jobs_with_params(
             "region": region,
             "remote_ok": remote_ok,
             "currency": currency
-        }
+        })
+    except Cancelled:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -440,21 +663,24 @@ def job_matcher_info():
     }
 
 # AI Interviewer endpoints
-@app.post("/ai_interviewer/generate_questions")
-async def generate_questions(request: JobDescriptionRequest):
+@app.post("/ai_interviewer/generate_questions", dependencies=[Depends(admit("generate_questions"))])
+async def generate_questions(request: JobDescriptionRequest, http_request: Request, interviewer: AIInterviewer = Depends(get_interviewer)):
     """Generate interview questions based on job description"""
     try:
-        interviewer = AIInterviewer()
-        questions = interviewer.generate_questions(
+        # Stops the generation if the client gives up
+        questions = await cancel_on_disconnect(http_request, run_llm(
+            interviewer.generate_questions,
             job_description=request.job_description,
             interview_type=request.interview_type,
             num_questions=request.num_questions
-        )
+        ))
         return {
             "success": True,
             "questions": questions,
             "total_questions": len(questions)
         }
+    except Cancelled:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -462,12 +688,12 @@ async def generate_questions(request: JobDescriptionRequest):
             "message": "Failed to generate questions"
         }
 
-@app.post("/ai_interviewer/analyze_response")
-async def analyze_response(request: ResponseAnalysisRequest):
+@app.post("/ai_interviewer/analyze_response", dependencies=[Depends(admit("analyze_response"))])
+async def analyze_response(request: ResponseAnalysisRequest, interviewer: AIInterviewer = Depends(get_interviewer)):
     """Analyze a single interview response"""
     try:
-        interviewer = AIInterviewer()
-        analysis = interviewer.analyze_response(
+        analysis = await run_llm(
+            interviewer.analyze_response,
             question=request.question,
             response=request.response,
             question_type=request.question_type
@@ -483,11 +709,30 @@ async def analyze_response(request: ResponseAnalysisRequest):
             "message": "Failed to analyze response"
         }
 
+@app.post("/ai_interviewer/analyze_session")
+async def analyze_session(
+    session: SessionAnalysisRequest,
+    format: str = "ndjson",
+    interviewer: AIInterviewer = Depends(get_interviewer)
+):
+    """Analyze every answer of an interview concurrently, streaming each analysis with the profile so far"""
+    check_stream_format(format)
+    answers = [{"question": a.question, "response": a.response, "question_type": a.question_type} for a in session.answers]
+    try:
+        check_session(answers)
+    except InvalidSession as e:
+        return JSONResponse(status_code=e.status_code, content={
+            "success": False,
+            "error": str(e),
+            "message": "Failed to analyze session"
+        })
+    release = await get_limiter("analyze_session").reserve()
+    return event_response(analyze_session_events(interviewer, answers), format, on_close=release)
+
 @app.post("/ai_interviewer/generate_profile")
-async def generate_profile(session: InterviewSession):
+async def generate_profile(session: InterviewSession, interviewer: AIInterviewer = Depends(get_interviewer)):
     """Generate comprehensive interview profile from all responses"""
     try:
-        interviewer = AIInterviewer()
         profile = interviewer.generate_profile(session.responses)
         return {
             "success": True,
@@ -515,54 +760,30 @@ def ai_interviewer_info():
         "endpoints": [
             "/ai_interviewer/generate_questions",
             "/ai_interviewer/analyze_response", 
+            "/ai_interviewer/analyze_session",
             "/ai_interviewer/generate_profile"
         ]
     }
 
 # Footprint Scanner endpoints
 @app.post("/footprint_scanner/analyze_github")
-async def analyze_github_profile(username: str, target_role: str = "Software Developer", region: str = "Global"):
+async def analyze_github_profile(
+    username: str,
+    target_role: str = "Software Developer",
+    region: str = "Global",
+    scanner: FootprintScanner = Depends(get_footprint_scanner),
+):
     """Analyze GitHub profile and contributions with enhanced AI analysis"""
     try:
-        scanner = FootprintScanner()
-        github_profile = scanner.analyze_github_profile(
+        github_profile = await run_http(
+            scanner.analyze_github_profile,
             username=username,
             target_role=target_role,
             region=region
         )
         
-        return {
-            "success": True,
-            "github_profile": {
-                "name": github_profile.name,
-                "avatar_url": github_profile.avatar_url,
-                "bio": github_profile.bio,
-                "company": github_profile.company,
-                "location": github_profile.location,
-                "blog": github_profile.blog,
-                "username": github_profile.username,
-                "public_repos": github_profile.public_repos,
-                "followers": github_profile.followers,
-                "following": github_profile.following,
-                "total_stars": github_profile.total_stars,
-                "total_forks": github_profile.total_forks,
-                "languages": github_profile.languages,
-                "recent_activity": github_profile.recent_activity,
-                "orgs": github_profile.orgs,
-                "contribution_streak": github_profile.contribution_streak,
-                "profile_score": github_profile.profile_score,
-                "top_repos": github_profile.top_repos,
-                "collaboration_score": github_profile.collaboration_score,
-                # Enhanced metrics
-                "code_quality_score": github_profile.code_quality_score,
-                "technical_diversity_score": github_profile.technical_diversity_score,
-                "innovation_score": github_profile.innovation_score,
-                "problem_solving_score": github_profile.problem_solving_score,
-                "learning_curve_score": github_profile.learning_curve_score,
-                "regional_relevance_score": github_profile.regional_relevance_score,
-                "remote_work_readiness": github_profile.remote_work_readiness
-            }
-        }
+        # Every GitHubProfile field is public; orjson serializes the dataclass as is
+        return FastJSONResponse({"success": True, "github_profile": github_profile})
     except Exception as e:
         return {
             "success": False,
@@ -570,6 +791,14 @@ async def analyze_github_profile(username: str, target_role: str = "Software Dev
             "message": "Failed to analyze GitHub profile"
         }
 
+# LinkedInProfile fields exposed by /footprint_scanner/analyze_linkedin (the internal scores stay private)
+LINKEDIN_PROFILE_FIELDS = (
+    "profile_url", "connections", "endorsements", "recent_posts",
+    # Contribution-focused fields
+    "full_name", "headline", "about", "industry", "follower_count", "experience", "education",
+    "certifications", "skills_list", "profile_picture", "city", "country",
+)
+
 @app.post("/footprint_scanner/analyze_linkedin")
 async def analyze_linkedin_profile(
     request: Optional[Dict[str, Any]] = None,
@@ -577,13 +806,13 @@ async def analyze_linkedin_profile(
     target_role: str = "Professional",
     region: str = "Global",
     username: Optional[str] = None,
+    scanner: FootprintScanner = Depends(get_footprint_scanner),
 ):
     """Analyze LinkedIn profile and network with enhanced AI analysis.
 
     Accepts either a JSON body (with keys `profile_url`, `target_role`, `region`) or query parameters.
     """
     try:
-        scanner = FootprintScanner()
         # prefer explicit query params, otherwise fall back to JSON body
         url = profile_url or (request.get("profile_url") if request else None)
         user = username or (request.get("username") if request else None)
@@ -594,35 +823,18 @@ async def analyze_linkedin_profile(
                 "message": "username or profile_url is required"
             }
 
-        linkedin_profile = scanner.analyze_linkedin_profile(
+        linkedin_profile = await run_http(
+            scanner.analyze_linkedin_profile,
             profile_url=url,
             target_role=(request.get("target_role") if request and request.get("target_role") else target_role),
             region=(request.get("region") if request and request.get("region") else region),
             username=user,
         )
         
-        return {
+        return FastJSONResponse({
             "success": True,
-            "linkedin_profile": {
-                "profile_url": linkedin_profile.profile_url,
-                "connections": linkedin_profile.connections,
-                "endorsements": linkedin_profile.endorsements,
-                "recent_posts": linkedin_profile.recent_posts,
-                # Contribution-focused fields
-                "full_name": linkedin_profile.full_name,
-                "headline": linkedin_profile.headline,
-                "about": linkedin_profile.about,
-                "industry": linkedin_profile.industry,
-                "follower_count": linkedin_profile.follower_count,
-                "experience": linkedin_profile.experience,
-                "education": linkedin_profile.education,
-                "certifications": linkedin_profile.certifications,
-                "skills": linkedin_profile.skills_list,
-                "profile_picture": linkedin_profile.profile_picture,
-                "city": linkedin_profile.city,
-                "country": linkedin_profile.country
-            }
-        }
+            "linkedin_profile": pick(linkedin_profile, LINKEDIN_PROFILE_FIELDS, rename={"skills_list": "skills"})
+        })
     except Exception as e:
         return {
             "success": False,
@@ -631,38 +843,21 @@ async def analyze_linkedin_profile(
         }
 
 @app.post("/footprint_scanner/analyze_stackoverflow")
-async def analyze_stackoverflow_profile(user_id: str, target_role: str = "Developer", region: str = "Global"):
+async def analyze_stackoverflow_profile(
+    user_id: str,
+    target_role: str = "Developer",
+    region: str = "Global",
+    scanner: FootprintScanner = Depends(get_footprint_scanner),
+):
     """Analyze StackOverflow profile and contributions (contribution-centric, no scores)."""
     try:
-        scanner = FootprintScanner()
-        so_profile = scanner.analyze_stackoverflow_profile(
+        so_profile = await run_http(
+            scanner.analyze_stackoverflow_profile,
             user_id=user_id,
             target_role=target_role,
             region=region
         )
-        return {
-            "success": True,
-            "stackoverflow_profile": {
-                "user_id": so_profile.user_id,
-                "display_name": so_profile.display_name,
-                "reputation": so_profile.reputation,
-                "badge_counts": so_profile.badge_counts,
-                "profile_image": so_profile.profile_image,
-                "location": so_profile.location,
-                "website_url": so_profile.website_url,
-                "about_me": so_profile.about_me,
-                "view_count": so_profile.view_count,
-                "creation_date": so_profile.creation_date,
-                "last_access_date": so_profile.last_access_date,
-                "answers": so_profile.answers,
-                "questions": so_profile.questions,
-                "accepted_answer_rate": so_profile.accepted_answer_rate,
-                "top_tags": so_profile.top_tags,
-                "top_question_tags": so_profile.top_question_tags,
-                "recent_questions": so_profile.recent_questions,
-                "recent_answers": so_profile.recent_answers,
-            }
-        }
+        return FastJSONResponse({"success": True, "stackoverflow_profile": so_profile})
     except Exception as e:
         return {
             "success": False,
@@ -671,11 +866,11 @@ async def analyze_stackoverflow_profile(user_id: str, target_role: str = "Develo
         }
 
 @app.post("/footprint_scanner/comprehensive_analysis")
-async def comprehensive_profile_analysis(request: ProfileAnalysisRequest):
+async def comprehensive_profile_analysis(request: ProfileAnalysisRequest, scanner: FootprintScanner = Depends(get_footprint_scanner)):
     """Perform comprehensive analysis across all platforms with AI integration"""
     try:
-        scanner = FootprintScanner()
-        analysis = scanner.comprehensive_profile_analysis(
+        analysis = await run_http(
+            scanner.comprehensive_profile_analysis,
             github_username=request.github_username,
             linkedin_url=request.linkedin_url,
             stackoverflow_id=request.stackoverflow_id,
@@ -708,10 +903,9 @@ async def comprehensive_profile_analysis(request: ProfileAnalysisRequest):
         }
 
 @app.post("/footprint_scanner/regional_insights")
-async def get_regional_insights(request: RegionalInsightsRequest):
+async def get_regional_insights(request: RegionalInsightsRequest, scanner: FootprintScanner = Depends(get_footprint_scanner)):
     """Get regional market insights and cultural context"""
     try:
-        scanner = FootprintScanner()
         region = request.region.lower()
         
         # Get regional context
@@ -781,34 +975,36 @@ async def get_regional_insights(request: RegionalInsightsRequest):
         }
 
 @app.post("/footprint_scanner/skill_analysis")
-async def analyze_skills(request: Dict[str, Any]):
+async def analyze_skills(request: Dict[str, Any], scanner: FootprintScanner = Depends(get_footprint_scanner)):
     """Analyze skills across platforms and provide gap analysis"""
     try:
-        scanner = FootprintScanner()
-        
-        # Get profiles
-        profiles = {}
+        # Get profiles (the platforms are independent, so fetch them concurrently)
+        lookups = {}
         if request.get("github_username"):
-            profiles["github"] = scanner.analyze_github_profile(
-                request["github_username"], 
+            lookups["github"] = run_http(
+                scanner.analyze_github_profile,
+                request["github_username"],
                 request.get("target_role", "Software Developer"),
                 request.get("region", "Global")
             )
-        
+
         if request.get("linkedin_url"):
-            profiles["linkedin"] = scanner.analyze_linkedin_profile(
+            lookups["linkedin"] = run_http(
+                scanner.analyze_linkedin_profile,
                 request["linkedin_url"],
                 request.get("target_role", "Professional"),
                 request.get("region", "Global")
             )
-        
+
         if request.get("stackoverflow_id"):
-            profiles["stackoverflow"] = scanner.analyze_stackoverflow_profile(
+            lookups["stackoverflow"] = run_http(
+                scanner.analyze_stackoverflow_profile,
                 request["stackoverflow_id"],
                 request.get("target_role", "Developer"),
                 request.get("region", "Global")
             )
-        
+        profiles = dict(zip(lookups.keys(), await asyncio.gather(*lookups.values())))
+
         # Extract skills from profiles
         all_skills = set()
         platform_skills = {}
@@ -886,13 +1082,12 @@ async def analyze_skills(request: Dict[str, Any]):
         }
 
 @app.post("/footprint_scanner/career_roadmap")
-async def generate_career_roadmap(request: Dict[str, Any]):
+async def generate_career_roadmap(request: Dict[str, Any], scanner: FootprintScanner = Depends(get_footprint_scanner)):
     """Generate personalized career development roadmap"""
     try:
-        scanner = FootprintScanner()
-        
         # Get comprehensive analysis
-        analysis = scanner.comprehensive_profile_analysis(
+        analysis = await run_http(
+            scanner.comprehensive_profile_analysis,
             github_username=request.get("github_username"),
             linkedin_url=request.get("linkedin_url"),
             stackoverflow_id=request.get("stackoverflow_id"),
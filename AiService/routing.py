@@ -0,0 +1,139 @@
+"""Model routing by task.
+
+Each task the service sends to the LLM (rewriting a resume, a report, a
+question list, scoring one answer, ...) is routed to a model tier with its own
+generation options and request timeout, instead of every call going to
+OLLAMA_MODEL. Tiers name models: "large" is OLLAMA_MODEL, "small" is
+OLLAMA_SMALL_MODEL (the same model unless set), and OLLAMA_TIER_<NAME> adds
+more.
+
+Every route also has a queue-latency SLO. When calls recently waited longer
+than that for a thread of the LLM pools (executors.queue_wait), the task is
+downgraded to its fallback tier until the queue drains. Routes are
+overridden per task with ROUTE_<TASK>, e.g.
+ROUTE_SCORING=tier=small,timeout=60,slo=2,num_predict=768.
+"""
+import os
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from dotenv import load_dotenv
+from executors import queue_wait
+from llm import DEFAULT_MODEL, OPTION_TYPES
+from metrics import Counter
+from prompts import get_chain
+
+load_dotenv()
+
+MODEL_TIERS: Dict[str, str] = {
+    "large": DEFAULT_MODEL,
+    "small": os.getenv("OLLAMA_SMALL_MODEL") or DEFAULT_MODEL,
+    **{
+        name[len("OLLAMA_TIER_"):].lower(): model
+        for name, model in os.environ.items()
+        if name.startswith("OLLAMA_TIER_") and model
+    },
+}
+
+# Pools whose queue wait counts against the SLOs
+QUEUE_POOLS = ("llm", "llm_map")
+
+LLM_ROUTED = Counter("aiservice_llm_route_total", "LLM calls by task and model tier.", ["task", "tier", "downgraded"])
+
+
+class Route(NamedTuple):
+    tier: str
+    # Seconds per Ollama request (None = OLLAMA_TIMEOUT)
+    timeout: Optional[float]
+    # Queue wait in seconds above which the task goes to `fallback`
+    slo: float
+    fallback: str
+    options: Dict[str, Any] = {}
+
+
+DEFAULT_ROUTES: Dict[str, Route] = {
+    "rewrite": Route("large", 300.0, 30.0, "small"),
+    "report": Route("large", 300.0, 30.0, "small"),
+    # Map step of a long resume's report
+    "notes": Route("large", 120.0, 15.0, "small"),
+    "aggregate_report": Route("large", 300.0, 30.0, "small"),
+    "questions": Route("large", 120.0, 10.0, "small"),
+    "scoring": Route("small", 120.0, 5.0, "small"),
+}
+
+
+def _parse_route(task: str, override: str, route: Route) -> Route:
+    settings = dict(route._asdict(), options=dict(route.options))
+    for item in filter(None, (part.strip() for part in override.split(","))):
+        name, _, value = item.partition("=")
+        name, value = name.strip(), value.strip()
+        if name in ("tier", "fallback"):
+            settings[name] = value
+        elif name in ("timeout", "slo"):
+            settings[name] = float(value)
+        elif name in OPTION_TYPES:
+            settings["options"][name] = OPTION_TYPES[name](value)
+        else:
+            raise ValueError(f"ROUTE_{task.upper()}: unknown setting {name!r}")
+    for name in ("tier", "fallback"):
+        if settings[name] not in MODEL_TIERS:
+            raise ValueError(f"ROUTE_{task.upper()}: unknown model tier {settings[name]!r}")
+    return Route(**settings)
+
+
+def _routes() -> Dict[str, Route]:
+    routes = {}
+    for task, route in DEFAULT_ROUTES.items():
+        override = os.getenv(f"ROUTE_{task.upper()}")
+        routes[task] = _parse_route(task, override, route) if override else route
+    return routes
+
+
+ROUTES = _routes()
+
+
+def _downgraded(spec: Route, wait: float) -> bool:
+    # A fallback naming the same model (OLLAMA_SMALL_MODEL unset) is no downgrade
+    return MODEL_TIERS[spec.fallback] != MODEL_TIERS[spec.tier] and wait > spec.slo
+
+
+def _queue_wait() -> float:
+    return max(queue_wait(kind) for kind in QUEUE_POOLS)
+
+
+def route(task: str) -> Tuple[str, Route, bool]:
+    """(model, route, downgraded) for the next call of `task`."""
+    spec = ROUTES[task]
+    downgraded = _downgraded(spec, _queue_wait())
+    tier = spec.fallback if downgraded else spec.tier
+    LLM_ROUTED.inc(task=task, tier=tier, downgraded=str(downgraded).lower())
+    return MODEL_TIERS[tier], spec, downgraded
+
+
+def primary_model(task: str) -> str:
+    """The model `task` runs on when it is not downgraded."""
+    return MODEL_TIERS[ROUTES[task].tier]
+
+
+def routed(task: str, prompt_id: str, **options: Any) -> Tuple[Any, str, bool]:
+    """(chain, model, downgraded): prompts.get_chain for `prompt_id` on the model, options and timeout routed for `task`.
+
+    Keyword arguments are generation options, merged over the route's.
+    """
+    model, spec, downgraded = route(task)
+    return get_chain(prompt_id, model, timeout=spec.timeout, **{**spec.options, **options}), model, downgraded
+
+
+def routed_chain(task: str, prompt_id: str, **options: Any) -> Any:
+    """The chain of routed(), for callers that do not care which model it runs on."""
+    return routed(task, prompt_id, **options)[0]
+
+
+def status() -> Dict[str, Any]:
+    wait = _queue_wait()
+    return {
+        "tiers": MODEL_TIERS,
+        "queue_wait_ms": round(wait * 1000, 1),
+        "routes": {
+            task: {**spec._asdict(), "downgraded": _downgraded(spec, wait)}
+            for task, spec in ROUTES.items()
+        },
+    }
@@ -0,0 +1,69 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+from fastapi import FastAPI, Request
+from ai_interviewer import AIInterviewer
+from job_matcher import JobMatcher
+from footprint_scanner import FootprintScanner
+from executors import shutdown_pools
+from jobs import JobManager, JobStore
+import health
+import warmup
+
+
+class ServiceRegistry:
+    """Long-lived service objects shared by every request of a worker process."""
+
+    def __init__(self) -> None:
+        self.job_matcher = JobMatcher()
+        self.interviewer = AIInterviewer()
+        self.footprint_scanner = FootprintScanner()
+        self.jobs = JobManager(JobStore())
+
+    def close(self) -> None:
+        for service in (self.job_matcher, self.footprint_scanner, self.jobs):
+            try:
+                service.close()
+            except Exception as e:
+                print(f"Error closing {type(service).__name__}: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create the service registry at startup and release it at shutdown."""
+    registry = ServiceRegistry()
+    app.state.services = registry
+    health.mark_started()
+    heartbeat = asyncio.create_task(health.heartbeat_loop())
+    # Not awaited: the worker serves (and reports not-ready on /ready) while the model loads
+    warm = asyncio.create_task(warmup.warmup_loop())
+    try:
+        yield
+    finally:
+        for task in (warm, heartbeat):
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        registry.close()
+        shutdown_pools(wait=False)
+
+
+# FastAPI dependencies
+def get_services(request: Request) -> ServiceRegistry:
+    return request.app.state.services
+
+
+def get_job_matcher(request: Request) -> JobMatcher:
+    return get_services(request).job_matcher
+
+
+def get_interviewer(request: Request) -> AIInterviewer:
+    return get_services(request).interviewer
+
+
+def get_footprint_scanner(request: Request) -> FootprintScanner:
+    return get_services(request).footprint_scanner
+
+
+def get_job_manager(request: Request) -> JobManager:
+    return get_services(request).jobs
@@ -0,0 +1,249 @@
+"""Coalescing of identical in-flight work ("single flight").
+
+The first request for a key becomes the leader and runs the work; requests
+for the same key that arrive while it is running await the leader's result
+instead of repeating an LLM generation or a LinkedIn scrape. The work runs in
+its own task with its own cancel event, so a leader whose client disconnects
+does not fail its followers; it is cancelled only once every waiter is gone.
+
+With SINGLEFLIGHT_DIR set, workers on the same host also coalesce: the leader
+holds an flock on a per-key lock file and publishes its result as JSON next
+to it. A worker that had to wait for the lock reuses a result published after
+it started waiting, and otherwise runs the work itself. Failures are not
+shared across workers. Results must be JSON-serializable (bytes are
+base64-encoded); a group whose results are not passes `encode`/`decode` to
+get_group(). The directory must be private to the service user (0700): one
+that others can write to is not used.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from dotenv import load_dotenv
+from cancellation import bound
+from metrics import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process coalescing only
+    fcntl = None
+
+load_dotenv()
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_DIR = os.getenv("SINGLEFLIGHT_DIR") or ""
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL") or 0.2)
+# Followers in other workers give up waiting for the lock after this long and run the work themselves
+SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT") or 300)
+# Published results are only for followers that were already waiting; older files are deleted
+_RESULT_RETENTION_SECONDS = 60.0
+
+COALESCED = Counter("aiservice_singleflight_total", "Coalescable calls by whether they ran the work.", ["group", "role"])
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable key for a request made of JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def content_hash(data: Any) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task, cancel: threading.Event) -> None:
+        self.task = task
+        self.cancel = cancel
+        self.waiters = 0
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _json_object(value: Dict[str, Any]) -> Any:
+    if len(value) == 1 and "__bytes__" in value:
+        return base64.b64decode(value["__bytes__"])
+    return value
+
+
+def _private_dir(path: str) -> bool:
+    """Create `path` with mode 0700, or check an existing one is ours and not writable by others."""
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.stat(path)
+    except OSError as e:
+        print(f"Single-flight: cannot use SINGLEFLIGHT_DIR {path}: {e}")
+        return False
+    if info.st_uid != os.getuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        print(f"Single-flight: SINGLEFLIGHT_DIR {path} is writable by other users, coalescing within this worker only")
+        return False
+    return True
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        name: str,
+        shared_dir: str = SINGLEFLIGHT_DIR,
+        encode: Optional[Callable[[Any], Any]] = None,
+        decode: Optional[Callable[[Any], Any]] = None,
+    ) -> None:
+        self.name = name
+        self.shared_dir = shared_dir if fcntl is not None and shared_dir and _private_dir(shared_dir) else ""
+        # Convert results to and from JSON-serializable values for other workers
+        self.encode = encode
+        self.decode = decode
+        self._inflight: Dict[str, _Flight] = {}
+        self._last_purge = 0.0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Run `func` unless a call with the same key is already running, and return its result."""
+        flight = self._inflight.get(key)
+        if flight is None:
+            COALESCED.inc(group=self.name, role="leader")
+            with bound(threading.Event()) as cancel:
+                task = asyncio.ensure_future(self._run(key, func))
+            flight = _Flight(task, cancel)
+            self._inflight[key] = flight
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            COALESCED.inc(group=self.name, role="follower")
+        flight.waiters += 1
+        try:
+            # shield: a waiter going away must not cancel the work the others wait for
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # The last waiter is gone: nobody will read the result
+                flight.cancel.set()
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        flight = self._inflight.get(key)
+        if flight is not None and flight.task is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter has gone away
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    async def _run(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        if not self.shared_dir:
+            return await func()
+        return await self._run_shared(key, func)
+
+    def _paths(self, key: str) -> tuple:
+        base = os.path.join(self.shared_dir, f"{self.name}-{key}")
+        return f"{base}.lock", f"{base}.result"
+
+    async def _run_shared(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        lock_path, result_path = self._paths(key)
+        waited_since: Optional[float] = None
+        with os.fdopen(os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600), "r+") as lock_file:
+            locked = False
+            deadline = time.monotonic() + SINGLEFLIGHT_WAIT_TIMEOUT
+            while True:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    locked = True
+                    # Lock files are purged by age, so mark this one as in use
+                    os.utime(lock_path)
+                    break
+                except BlockingIOError:
+                    if waited_since is None:
+                        waited_since = time.time()
+                    if time.monotonic() >= deadline:
+                        break
+                    await asyncio.sleep(SINGLEFLIGHT_POLL_INTERVAL)
+            try:
+                if waited_since is not None:
+                    found, result = self._read_result(result_path, waited_since)
+                    if found:
+                        COALESCED.inc(group=self.name, role="follower_shared")
+                        return result
+                result = await func()
+                if locked:
+                    self._write_result(result_path, result)
+                return result
+            finally:
+                if locked:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_result(self, path: str, newer_than: float) -> tuple:
+        try:
+            if os.path.getmtime(path) < newer_than:
+                return False, None
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f, object_hook=_json_object)
+            return True, self.decode(value) if self.decode is not None else value
+        except FileNotFoundError:
+            # The leader failed or could not publish
+            return False, None
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            print(f"Single-flight {self.name}: ignoring unreadable result {path}: {e}")
+            return False, None
+
+    def _write_result(self, path: str, result: Any) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            data = json.dumps(self.encode(result) if self.encode is not None else result, default=_json_default)
+            # O_EXCL: never write through a file (or symlink) someone else put there
+            with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Single-flight {self.name}: could not publish result: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        self._purge_stale()
+
+    def _purge_stale(self) -> None:
+        now = time.time()
+        if now - self._last_purge < _RESULT_RETENTION_SECONDS:
+            return
+        self._last_purge = now
+        prefix = f"{self.name}-"
+        for name in os.listdir(self.shared_dir):
+            if not name.startswith(prefix):
+                continue
+            path = os.path.join(self.shared_dir, name)
+            # A lock file may be held for as long as the work runs
+            max_age = _RESULT_RETENTION_SECONDS + (SINGLEFLIGHT_WAIT_TIMEOUT if name.endswith(".lock") else 0)
+            try:
+                if now - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def get_group(
+    name: str, encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None
+) -> SingleFlight:
+    """The process-wide group `name`; `encode`/`decode` apply when it is created."""
+    group = _groups.get(name)
+    if group is None:
+        group = SingleFlight(name, encode=encode, decode=decode)
+        _groups[name] = group
+    return group
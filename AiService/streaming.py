@@ -0,0 +1,188 @@
+"""Streamed responses for token-by-token LLM generations.
+
+A TokenStream runs a blocking token generator on the "llm" executor and hands
+the tokens to the event loop through an asyncio queue. When the client goes
+away (or never starts reading the body) the stream's cancel event is set; the
+generator checks it between tokens and closes the Ollama stream, which stops
+the generation. Disconnects are detected by StreamingResponse itself (its
+disconnect listener, or the failed send under ASGI spec 2.4), after which the
+frame iterator is closed; nothing here polls the receive channel.
+
+Frames are NDJSON lines ({"token": ...}, then {"done": true} or {"error": ...})
+or the same payloads as Server-Sent Events. event_response streams arbitrary
+(event, payload) pairs the same way, e.g. the stages of the resume pipeline.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import suppress
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from executors import get_pool
+from metrics import ERRORS, STAGE_LATENCY, current_endpoint
+from profiling import track_thread
+from responses import dumps
+
+load_dotenv()
+
+# Generation is cancelled if the response body is not read within this many seconds
+STREAM_START_TIMEOUT = float(os.getenv("STREAM_START_TIMEOUT") or 10)
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+_DONE = object()
+
+
+class TokenStream:
+    """Async iterator over the tokens of `func(*args, cancel=event)` running on the LLM pool."""
+
+    def __init__(self, func: Callable[..., Iterator[str]], *args: Any, on_close: Optional[Callable[[], None]] = None) -> None:
+        self.cancel = threading.Event()
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._on_close = on_close
+        self._started = False
+        ctx = contextvars.copy_context()
+        get_pool("llm").submit(ctx.run, track_thread(functools.partial(self._produce, func, args)))
+        self._loop.call_later(STREAM_START_TIMEOUT, self._cancel_if_unread)
+
+    def _cancel_if_unread(self) -> None:
+        if not self._started:
+            self.cancel.set()
+
+    def _put(self, item: Any) -> None:
+        # The loop may already be closed if the worker is shutting down
+        with suppress(RuntimeError):
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def _produce(self, func: Callable[..., Iterator[str]], args: tuple) -> None:
+        endpoint = current_endpoint.get()
+        start = time.perf_counter()
+        first_token = True
+        try:
+            for token in func(*args, cancel=self.cancel):
+                if first_token:
+                    STAGE_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, stage="llm_first_token")
+                    first_token = False
+                self._put(token)
+                if self.cancel.is_set():
+                    break
+        except Exception as e:
+            print(f"Token stream failed: {e}")
+            ERRORS.inc(endpoint=endpoint, stage="llm_stream")
+            self._put(e)
+        finally:
+            STAGE_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, stage="llm_stream")
+            self._put(_DONE)
+            if self._on_close is not None:
+                with suppress(RuntimeError):
+                    self._loop.call_soon_threadsafe(self._on_close)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self._started = True
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.cancel.set()
+
+    def close(self) -> None:
+        self.cancel.set()
+
+
+def check_stream_format(fmt: str) -> str:
+    if fmt not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format '{fmt}', use one of: {', '.join(STREAM_FORMATS)}")
+    return fmt
+
+
+def _frame(fmt: str, event: str, data: dict) -> str:
+    payload = dumps(data).decode("utf-8")
+    if fmt == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+async def _frames(stream: TokenStream, fmt: str, done: Dict[str, Any]) -> AsyncIterator[str]:
+    try:
+        async for token in stream:
+            yield _frame(fmt, "token", {"token": token})
+    except Exception as e:
+        # Headers are already sent, so the failure is reported in-band
+        yield _frame(fmt, "error", {"error": str(e)})
+        return
+    finally:
+        stream.close()
+    yield _frame(fmt, "done", {"done": True, **done})
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """StreamingResponse that closes its body iterator however the response ends.
+
+    Under ASGI spec 2.4 a disconnect surfaces as a failed send and Starlette
+    leaves the iterator suspended; closing it runs the frames' cleanup (and
+    with it the generation's cancellation) right away.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
+
+
+def stream_response(stream: TokenStream, fmt: str, done: Optional[Dict[str, Any]] = None) -> StreamingResponse:
+    """Wrap a TokenStream in an NDJSON or SSE response; `done` is added to the final frame."""
+    return _ClosingStreamingResponse(
+        _frames(stream, fmt, done or {}),
+        media_type=STREAM_FORMATS[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _event_frames(events: AsyncIterator[Tuple[str, dict]], fmt: str, state: dict) -> AsyncIterator[str]:
+    state["started"] = True
+    try:
+        async for event, data in events:
+            yield _frame(fmt, event, data)
+    except Exception as e:
+        yield _frame(fmt, "error", {"error": str(e)})
+    finally:
+        await events.aclose()
+        if state["on_close"] is not None:
+            state["on_close"]()
+
+
+def event_response(
+    events: AsyncIterator[Tuple[str, dict]],
+    fmt: str,
+    on_close: Optional[Callable[[], None]] = None,
+) -> StreamingResponse:
+    """Stream (event, payload) pairs as NDJSON or SSE.
+
+    `on_close` runs when the stream ends, fails or is abandoned, and also if the
+    body is never read within STREAM_START_TIMEOUT; it must tolerate being called twice.
+    """
+    state = {"started": False, "on_close": on_close}
+    if on_close is not None:
+        asyncio.get_running_loop().call_later(
+            STREAM_START_TIMEOUT, lambda: None if state["started"] else on_close()
+        )
+    return _ClosingStreamingResponse(
+        _event_frames(events, fmt, state),
+        media_type=STREAM_FORMATS[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,5 @@
+"""Shared pytest setup: the service modules live flat in AiService/, so tests import them by name."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
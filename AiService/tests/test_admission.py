@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionLimiter, Overloaded
+
+
+def test_released_slot_goes_to_the_oldest_waiter():
+    async def main():
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=3, queue_timeout=5)
+        await limiter.acquire()
+        order = []
+
+        async def waiter(name):
+            await limiter.acquire()
+            order.append(name)
+
+        tasks = []
+        for name in ("first", "second", "third"):
+            tasks.append(asyncio.ensure_future(waiter(name)))
+            await asyncio.sleep(0)
+        assert limiter.queue_depth == 3
+        for _ in tasks:
+            limiter.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        # Each slot was handed over, never freed for a newcomer to take
+        assert order == ["first", "second", "third"]
+        assert limiter.active == 1
+
+    asyncio.run(main())
+
+
+def test_full_queue_and_queue_timeout_are_rejected():
+    async def main():
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=1, queue_timeout=0.01)
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await limiter.acquire()
+        assert (full.value.reason, full.value.status_code) == ("queue_full", 429)
+        with pytest.raises(Overloaded) as timed_out:
+            await queued
+        assert (timed_out.value.reason, timed_out.value.status_code) == ("queue_timeout", 503)
+        assert limiter.queue_depth == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=2, queue_timeout=5)
+        await limiter.acquire()
+        gone = asyncio.ensure_future(limiter.acquire())
+        staying = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        gone.cancel()
+        await asyncio.sleep(0)
+        limiter.release()
+        await staying
+        assert limiter.active == 1 and limiter.queue_depth == 0
+
+    asyncio.run(main())
+
+
+def test_reserve_release_is_idempotent():
+    async def main():
+        limiter = AdmissionLimiter("test", max_concurrent=2, max_queue=0, queue_timeout=5)
+        release = await limiter.reserve()
+        other = await limiter.reserve()
+        release()
+        release()
+        # A second call must not free the slot still held by `other`
+        assert limiter.active == 1
+        other()
+        assert limiter.active == 0
+
+    asyncio.run(main())
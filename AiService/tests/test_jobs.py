@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from jobs import JobStore
+
+
+def _store(tmp_path, **kwargs):
+    return JobStore(str(tmp_path / "jobs.db"), **kwargs)
+
+
+def test_complete_needs_a_running_job(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.create("report")
+    assert not store.complete(job_id, "application/json", b"{}")
+    assert store.mark_running(job_id)
+    assert store.complete(job_id, "application/json", b"{}")
+    assert store.status(job_id)["status"] == "done"
+
+
+def test_a_failed_job_is_not_completed_or_run(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.create("report")
+    assert store.mark_running(job_id)
+    # Worker shutdown fails its unfinished jobs while the thread is still running
+    assert store.fail_orphaned(only_pid=os.getpid()) == 1
+    assert not store.complete(job_id, "application/json", b"{}")
+    assert store.status(job_id)["status"] == "failed"
+    assert store.result(job_id) is None
+
+    queued = store.create("report")
+    assert store.fail(queued, "stopped")
+    assert not store.mark_running(queued)
+
+
+def test_fail_keeps_a_finished_result(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.create("report")
+    store.mark_running(job_id)
+    store.complete(job_id, "application/json", b"{}")
+    assert not store.fail(job_id, "late")
+    assert store.result(job_id) == ("application/json", b"{}")
+
+
+def test_unfinished_jobs_expire(tmp_path):
+    store = _store(tmp_path, unfinished_ttl_seconds=0)
+    job_id = store.create("report")
+    store.mark_running(job_id)
+    assert store.status(job_id) is None
+    assert store.purge_expired() == 1
+
+
+def test_legacy_unfinished_rows_are_purged_by_age(tmp_path):
+    store = _store(tmp_path, unfinished_ttl_seconds=60)
+    with closing(store._connect()) as conn, conn:
+        conn.executemany(
+            "INSERT INTO jobs (id, kind, status, owner_pid, created_at) VALUES (?, 'report', 'queued', 1, ?)",
+            [("old", time.time() - 120), ("new", time.time())],
+        )
+    assert store.purge_expired() == 1
+    with closing(sqlite3.connect(store.path)) as conn:
+        assert [row[0] for row in conn.execute("SELECT id FROM jobs")] == ["new"]
@@ -0,0 +1,80 @@
+import pytest
+
+from llm_json import LLMJSONError, extract_json, has_keys, list_of, parse_llm_json, valid_json
+
+QUESTIONS = list_of(has_keys("question"))
+
+
+def test_plain_json_is_ok():
+    assert extract_json('[{"question": "Why?"}]', list, QUESTIONS) == ([{"question": "Why?"}], "ok")
+
+
+def test_value_in_prose_is_extracted():
+    text = 'Sure! Here they are:\n[{"question": "Why?"}]\nGood luck.'
+    assert extract_json(text, list, QUESTIONS) == ([{"question": "Why?"}], "extracted")
+
+
+def test_single_key_wrapper_is_unwrapped():
+    assert extract_json('{"questions": [{"question": "Why?"}]}', list, QUESTIONS)[0] == [{"question": "Why?"}]
+
+
+def test_wrong_shape_is_rejected():
+    with pytest.raises(LLMJSONError):
+        extract_json("Here are 8 questions: [8]", list, QUESTIONS)
+
+
+def test_wrong_shape_moves_on_to_the_next_candidate():
+    text = 'Here are [8] questions: [{"question": "Why?"}]'
+    assert extract_json(text, list, QUESTIONS) == ([{"question": "Why?"}], "extracted")
+
+
+def test_empty_list_does_not_match_list_of():
+    with pytest.raises(LLMJSONError):
+        extract_json("[]", list, QUESTIONS)
+
+
+def test_missing_keys_are_rejected():
+    with pytest.raises(LLMJSONError):
+        extract_json('{"overall_score": 7}', dict, has_keys("overall_score", "relevance"))
+
+
+def test_valid_json_predicate_applies_the_shape():
+    accept = valid_json(list, QUESTIONS)
+    assert accept('[{"question": "Why?"}]')
+    assert not accept("[8]")
+    assert not accept("no json at all")
+
+
+def test_parse_llm_json_raises_on_failure():
+    with pytest.raises(LLMJSONError):
+        parse_llm_json("nothing here", dict, "test.prompt@1")
+
+
+def test_trailing_comma_in_fenced_output():
+    assert extract_json('```json\n[{"q":1},]\n```', list) == ([{"q": 1}], "extracted")
+
+
+def test_trailing_comma_in_object():
+    assert extract_json('{"a": [1, 2,], "b": "x",\n}', dict)[0] == {"a": [1, 2], "b": "x"}
+
+
+def test_commas_inside_strings_are_kept():
+    assert extract_json('["a,]", "b",]', list)[0] == ["a,]", "b"]
+
+
+def test_truncated_string_array_keeps_last_complete_element():
+    assert extract_json('["a", "b"', list) == (["a", "b"], "repaired")
+
+
+def test_truncated_string_element_is_dropped():
+    assert extract_json('["a", "b', list) == (["a"], "repaired")
+
+
+def test_truncated_array_keeps_whole_objects():
+    text = '[{"question": "One?"}, {"question": "Two?"}, {"question": "Thr'
+    assert extract_json(text, list, QUESTIONS) == ([{"question": "One?"}, {"question": "Two?"}], "repaired")
+
+
+def test_truncated_object_is_cut_back_to_its_last_whole_member():
+    # Cuts between top-level members win over a partial last member
+    assert extract_json('{"overall_score": 7, "strengths": ["clear", "conc', dict) == ({"overall_score": 7}, "repaired")
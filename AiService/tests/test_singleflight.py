@@ -0,0 +1,80 @@
+import asyncio
+
+from cancellation import current_cancel
+from singleflight import SingleFlight
+
+
+def _group():
+    # No shared directory: coalesce within this process only
+    return SingleFlight("test", shared_dir="")
+
+
+def test_concurrent_calls_share_one_run():
+    async def main():
+        group = _group()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(group.do("key", work) for _ in range(3)))
+        assert results == ["result"] * 3
+        assert len(calls) == 1
+        assert group.in_flight() == 0
+
+    asyncio.run(main())
+
+
+def test_follower_gets_the_result_after_the_leader_disconnects():
+    async def main():
+        group = _group()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "result"
+
+        leader = asyncio.ensure_future(group.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        assert leader.cancelled()
+        release.set()
+        assert await follower == "result"
+
+    asyncio.run(main())
+
+
+def test_last_waiter_leaving_cancels_the_work():
+    async def main():
+        group = _group()
+        started = asyncio.Event()
+        seen = {}
+
+        async def work():
+            seen["cancel"] = current_cancel()
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                seen["cancelled"] = True
+                raise
+
+        first = asyncio.ensure_future(group.do("key", work))
+        second = asyncio.ensure_future(group.do("key", work))
+        await started.wait()
+        first.cancel()
+        await asyncio.sleep(0)
+        # One waiter is left, so the work goes on
+        assert not seen["cancel"].is_set()
+        second.cancel()
+        await asyncio.sleep(0.01)
+        assert seen["cancel"].is_set()
+        assert seen.get("cancelled")
+        assert group.in_flight() == 0
+
+    asyncio.run(main())
@@ -0,0 +1,329 @@
+"""Request tracing with OpenTelemetry-compatible spans.
+
+Every request gets a server span; outbound calls (LinkedIn page fetches,
+GitHub/StackExchange/RapidAPI calls, LLM invocations) and executor hand-offs
+get child spans carrying status, sizes, retries and token counts. The current
+span lives in a context variable, so spans opened in executor threads nest
+under the request that submitted the work.
+
+A W3C `traceparent` header (sent by the NestJS proxy when it is instrumented)
+continues the caller's trace; the trace id is returned in `X-Trace-Id`.
+
+Finished spans are batched by a background thread and written as OTLP/JSON:
+TRACING_EXPORTER=file appends one export request per line to TRACE_FILE (the
+format of the collector's file exporter), TRACING_EXPORTER=otlp posts them to
+OTEL_EXPORTER_OTLP_ENDPOINT/v1/traces. With TRACING_EXPORTER unset, span()
+returns a shared no-op span and nothing is recorded.
+"""
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import re
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from dotenv import load_dotenv
+from metrics import Counter, current_endpoint
+
+load_dotenv()
+
+TRACING_EXPORTER = (os.getenv("TRACING_EXPORTER") or "").lower()
+TRACE_FILE = os.getenv("TRACE_FILE") or os.path.join(tempfile.gettempdir(), "aiservice-traces.jsonl")
+OTLP_ENDPOINT = (os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or "http://127.0.0.1:4318").rstrip("/")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME") or "aiservice"
+# Share of new traces that are recorded; traces started by the caller follow its sampled flag
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO") or 1.0)
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE") or 4096)
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL") or 2.0)
+_BATCH_SIZE = 512
+
+SPANS_DROPPED = Counter("aiservice_trace_spans_dropped_total", "Finished spans dropped because the export queue was full.")
+
+_KINDS = {"internal": 1, "server": 2, "client": 3}
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def enabled() -> bool:
+    return TRACING_EXPORTER in ("file", "otlp")
+
+
+class Span:
+    """One timed operation; attributes and status are set while it is open."""
+
+    recording = True
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _random_id(16)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status_code = 0
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        self.status_code = 2
+        self.status_message = f"{type(error).__name__}: {error}"[:500]
+
+    def end(self) -> None:
+        self.end_ns = time.time_ns()
+        if self.status_code == 0:
+            self.status_code = 1
+        _exporter.submit(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": _KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _any_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status_code, "message": self.status_message} if self.status_message else {"code": self.status_code},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NonRecordingSpan:
+    """Stands in for spans that are not recorded (tracing off or trace not sampled)."""
+
+    recording = False
+
+    def __init__(self, trace_id: str = "", span_id: str = "") -> None:
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, error: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NonRecordingSpan()
+
+_current: contextvars.ContextVar[Optional[Any]] = contextvars.ContextVar("current_span", default=None)
+
+
+def _random_id(hex_digits: int) -> str:
+    return f"{random.getrandbits(hex_digits * 4):0{hex_digits}x}"
+
+
+def _any_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def current_span() -> Any:
+    return _current.get() or NOOP_SPAN
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any) -> Iterator[Any]:
+    """Record the enclosed block as a child of the current span (or a new trace)."""
+    if not enabled():
+        yield NOOP_SPAN
+        return
+    parent = _current.get()
+    if parent is not None and not parent.recording:
+        # Inside an unsampled trace: nothing to record
+        yield parent
+        return
+    if parent is None:
+        if random.random() >= TRACE_SAMPLE_RATIO:
+            yield NOOP_SPAN
+            return
+        new = Span(name, kind, _random_id(32), None, attributes)
+    else:
+        new = Span(name, kind, parent.trace_id, parent.span_id, attributes)
+    token = _current.set(new)
+    try:
+        yield new
+    except BaseException as e:
+        new.set_error(e)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # A generator holding the span was closed from another context
+            pass
+        new.end()
+
+
+def set_http_response(span: Any, response: Any) -> None:
+    """Status, body size and retry count of a requests.Response."""
+    if not span.recording:
+        return
+    span.set_attribute("http.response.status_code", response.status_code)
+    span.set_attribute("http.response.body.size", len(response.content))
+    retries = getattr(getattr(response, "raw", None), "retries", None)
+    history = getattr(retries, "history", None)
+    if history:
+        span.set_attribute("http.request.resend_count", len(history))
+    if response.status_code >= 400:
+        span.status_code = 2
+        span.status_message = f"HTTP {response.status_code}"
+
+
+class _Exporter:
+    """Batches finished spans on a background thread and writes them as OTLP/JSON."""
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._failing = False
+
+    def submit(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            SPANS_DROPPED.inc()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="aiservice-trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take(block=True)
+            if batch:
+                self._export(batch)
+
+    def _take(self, block: bool) -> List[Span]:
+        batch: List[Span] = []
+        deadline = time.monotonic() + TRACE_FLUSH_INTERVAL
+        while len(batch) < _BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self) -> None:
+        while True:
+            batch = self._take(block=False)
+            if not batch:
+                return
+            self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        body = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+                ]},
+                "scopeSpans": [{"scope": {"name": "aiservice.tracing"}, "spans": [span.to_otlp() for span in batch]}],
+            }]
+        }, separators=(",", ":"))
+        try:
+            if TRACING_EXPORTER == "otlp":
+                request = urllib.request.Request(
+                    f"{OTLP_ENDPOINT}/v1/traces", data=body.encode("utf-8"),
+                    headers={"Content-Type": "application/json"}, method="POST",
+                )
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    response.read()
+            else:
+                with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                    f.write(body + "\n")
+            self._failing = False
+        except Exception as e:
+            if not self._failing:
+                print(f"Trace export failed ({len(batch)} spans dropped): {e}")
+            self._failing = True
+            SPANS_DROPPED.inc(len(batch))
+
+
+_exporter = _Exporter()
+atexit.register(lambda: _exporter.flush() if enabled() else None)
+
+
+def _reset_after_fork() -> None:
+    # The exporter thread does not survive fork(); a child starts its own
+    global _exporter
+    _exporter = _Exporter()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _parse_traceparent(value: str) -> Optional[_NonRecordingSpan]:
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    parent = _NonRecordingSpan(match.group(1), match.group(2))
+    # Carries the caller's sampling decision
+    parent.recording = bool(int(match.group(3), 16) & 1)
+    return parent
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the server span of each request."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        remote = _parse_traceparent(headers[b"traceparent"].decode("latin-1")) if b"traceparent" in headers else None
+        endpoint = current_endpoint.get()
+        token = _current.set(remote) if remote is not None else None
+        try:
+            with span(f"{scope['method']} {endpoint}", kind="server", **{
+                "http.request.method": scope["method"],
+                "http.route": endpoint,
+                "url.path": scope["path"],
+            }) as server_span:
+                request_id = headers.get(b"x-request-id")
+                if request_id is not None:
+                    server_span.set_attribute("http.request.id", request_id.decode("latin-1"))
+
+                async def send_wrapper(message) -> None:
+                    if message["type"] == "http.response.start":
+                        server_span.set_attribute("http.response.status_code", message["status"])
+                        if message["status"] >= 500 and server_span.recording:
+                            server_span.status_code = 2
+                        if server_span.trace_id:
+                            message = {**message, "headers": list(message.get("headers", [])) + [(b"x-trace-id", server_span.trace_id.encode("ascii"))]}
+                    await send(message)
+
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                _current.reset(token)
@@ -0,0 +1,146 @@
+"""Model warm-up and readiness.
+
+Each worker loads the Ollama model when it starts and then touches it every
+WARMUP_INTERVAL seconds with OLLAMA_KEEP_ALIVE, so the model stays resident
+and the first real request does not pay the model load time. The warm-up
+goes through the same client as the routes (get_llm), which also opens its
+HTTP connection pool.
+
+GET /ready answers 200 only while the last warm-up succeeded recently, so an
+orchestrator can keep traffic away from cold workers or an unloaded model.
+The models of the other routing tiers (routing.MODEL_TIERS) are kept loaded
+the same way, best effort: they do not affect readiness, but a task
+downgraded under load should not have to wait for its model to load.
+"""
+import asyncio
+import json
+import os
+import time
+import urllib.request
+from typing import Any, Dict, Optional, Set
+from dotenv import load_dotenv
+from executors import run_http
+from llm import DEFAULT_MODEL, OLLAMA_KEEP_ALIVE, OLLAMA_URL, get_llm
+from routing import MODEL_TIERS
+
+load_dotenv()
+
+WARMUP_ENABLED = (os.getenv("WARMUP_ENABLED") or "1").lower() not in ("0", "false", "no")
+# Shorter than OLLAMA_KEEP_ALIVE, so the model is touched again before Ollama unloads it
+WARMUP_INTERVAL = float(os.getenv("WARMUP_INTERVAL") or 240)
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT") or 120)
+# A worker stops being ready when its last successful warm-up is older than this
+READY_MAX_AGE = WARMUP_INTERVAL * 2 + WARMUP_TIMEOUT
+
+_state: Dict[str, Any] = {
+    "model": DEFAULT_MODEL,
+    "state": "disabled" if not WARMUP_ENABLED else "pending",
+    "keep_alive": OLLAMA_KEEP_ALIVE,
+    "last_attempt_at": None,
+    "last_success_at": None,
+    "load_seconds": None,
+    "warmup_seconds": None,
+    "resident": None,
+    "expires_at": None,
+    "error": None,
+}
+# Tier models whose last warm-up failed (logged once until they succeed again)
+_tier_failures: Set[str] = set()
+
+
+def _ollama_base() -> str:
+    return (OLLAMA_URL or "http://127.0.0.1:11434").rstrip("/")
+
+
+def _get_json(path: str) -> Dict[str, Any]:
+    with urllib.request.urlopen(f"{_ollama_base()}{path}", timeout=WARMUP_TIMEOUT) as response:
+        return json.loads(response.read())
+
+
+def _post_json(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    request = urllib.request.Request(
+        f"{_ollama_base()}{path}", data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"}, method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=WARMUP_TIMEOUT) as response:
+        return json.loads(response.read())
+
+
+def _load_model(model: str) -> Dict[str, Any]:
+    """Ask Ollama to load `model` (an empty prompt generates nothing) and keep it for OLLAMA_KEEP_ALIVE."""
+    client = getattr(get_llm(model), "_client", None)
+    if client is not None and hasattr(client, "generate"):
+        # The routes' own client: this also opens its connection pool
+        response = client.generate(model=model, prompt="", keep_alive=OLLAMA_KEEP_ALIVE)
+        return dict(response) if not isinstance(response, dict) else response
+    return _post_json("/api/generate", {"model": model, "prompt": "", "stream": False, "keep_alive": OLLAMA_KEEP_ALIVE})
+
+
+def _resident(model: str) -> Optional[Dict[str, Any]]:
+    for entry in _get_json("/api/ps").get("models") or []:
+        name = entry.get("name") or entry.get("model") or ""
+        if name == model or name.split(":")[0] == model.split(":")[0]:
+            return entry
+    return None
+
+
+def warm_up(model: str = DEFAULT_MODEL) -> Dict[str, Any]:
+    """Load the model and check it is resident; blocking, run it on an executor."""
+    start = time.perf_counter()
+    _state["last_attempt_at"] = time.time()
+    previous = _state["state"]
+    if previous != "ready":
+        _state["state"] = "loading"
+    try:
+        response = _load_model(model)
+        resident = _resident(model)
+    except Exception as e:
+        if previous != "failed":
+            print(f"Model warm-up failed for {model}: {e}")
+        _state.update(state="failed", error=f"{type(e).__name__}: {e}", resident=None)
+        return status()
+    load_duration = response.get("load_duration")
+    _state.update(
+        state="ready",
+        error=None,
+        last_success_at=time.time(),
+        warmup_seconds=round(time.perf_counter() - start, 3),
+        # Non-zero only when Ollama actually had to (re)load the model
+        load_seconds=round(load_duration / 1e9, 3) if isinstance(load_duration, (int, float)) else None,
+        resident=resident is not None,
+        expires_at=(resident or {}).get("expires_at"),
+    )
+    return status()
+
+
+def warm_up_tiers() -> None:
+    """Load the other tiers' models; failures are logged once per model, not fatal."""
+    for model in sorted(set(MODEL_TIERS.values()) - {DEFAULT_MODEL}):
+        try:
+            _load_model(model)
+            _tier_failures.discard(model)
+        except Exception as e:
+            if model not in _tier_failures:
+                print(f"Model warm-up failed for tier model {model}: {e}")
+            _tier_failures.add(model)
+
+
+def is_ready() -> bool:
+    if not WARMUP_ENABLED:
+        return True
+    last = _state["last_success_at"]
+    return _state["state"] == "ready" and last is not None and time.time() - last <= READY_MAX_AGE
+
+
+def status() -> Dict[str, Any]:
+    return {**_state, "ready": is_ready()}
+
+
+async def warmup_loop() -> None:
+    """Warm the model up now and then every WARMUP_INTERVAL seconds until cancelled."""
+    if not WARMUP_ENABLED:
+        return
+    while True:
+        await run_http(warm_up)
+        await run_http(warm_up_tiers)
+        await asyncio.sleep(WARMUP_INTERVAL if _state["state"] == "ready" else min(WARMUP_INTERVAL, 10))